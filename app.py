@@ -1,54 +1,152 @@
 import streamlit as st
 import datetime
-from twilio.rest import Client  # For SMS
-
-# Twilio setup (replace with your real credentials)
-TWILIO_ACCOUNT_SID = 'your_account_sid_here'  # From Twilio dashboard
-TWILIO_AUTH_TOKEN = 'your_auth_token_here'    # From Twilio dashboard
-TWILIO_PHONE_NUMBER = '+1234567890'          # Your Twilio virtual number
-YOUR_PHONE_NUMBER = '+0987654321'            # Your real phone number to receive SMS
-
-# Sample menu items (you can customize)
-menu = {
-    "Gulab Jamun": 50,  # Price in INR
-    "Ras Malai": 60,
-    "Jalebi": 40,
-    "Ladoo": 30,
-    "Barfi": 70
-}
-
-# Function to calculate total
+import hmac
+import os
+import time
+from sms_queue import SmsQueue  # For SMS
+from sms_digest import OrderDigest
+from sms_compact import compact_order_sms, gsm7_if_lossless
+from catalog import DEFAULT_CATALOG, Catalog, OutOfStock
+from order_store import IdempotencyCache, OrderStore, OrderWriter, new_order_id, order_fingerprint
+from sales_tail import SalesTail
+from perf_trace import span, traced, start_exporters, show_perf_panel
+
+# Twilio setup (replace with your real credentials, or set them in the environment)
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', 'your_account_sid_here')  # From Twilio dashboard
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', 'your_auth_token_here')      # From Twilio dashboard
+TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER', '+1234567890')            # Your Twilio virtual number
+YOUR_PHONE_NUMBER = os.getenv('YOUR_PHONE_NUMBER', '+0987654321')                # Your real phone number to receive SMS
+TWILIO_API_BASE = os.getenv('TWILIO_API_BASE')  # e.g. http://127.0.0.1:8099 to use fake_twilio.py offline
+
+# SMS digest mode: batch orders into one message per time/count window (urgent orders still go out at once)
+SMS_DIGEST_MODE = os.getenv('SMS_DIGEST_MODE', 'off') == 'on'
+SMS_DIGEST_WINDOW_SECONDS = float(os.getenv('SMS_DIGEST_WINDOW_SECONDS', '120'))
+SMS_DIGEST_MAX_ORDERS = int(os.getenv('SMS_DIGEST_MAX_ORDERS', '10'))
+
+# Compact SMS: GSM-7 text within SMS_MAX_SEGMENTS segments (off: the full order summary, in UCS-2 because of ₹)
+SMS_COMPACT = os.getenv('SMS_COMPACT', 'on') == 'on'
+SMS_MAX_SEGMENTS = int(os.getenv('SMS_MAX_SEGMENTS', '1'))
+ORDER_LINK_BASE = os.getenv('ORDER_LINK_BASE')  # e.g. https://shop.example/orders/ (order ID appended)
+
+# The same order submitted again within this window is not saved or notified again
+ORDER_DEDUP_WINDOW_SECONDS = float(os.getenv('ORDER_DEDUP_WINDOW_SECONDS', '300'))
+
+# Menu and stock (edit the file to change prices or restock; picked up without a restart)
+CATALOG_PATH = os.getenv('CATALOG_PATH', DEFAULT_CATALOG)
+CATALOG_SECTION = 'sweets'
+
+# Timings (PERF_TRACE=on, see perf_trace.py); the Performance page is shown only when a PIN is set
+PERF_ADMIN_PIN = os.getenv('PERF_ADMIN_PIN')
+start_exporters()
+
+# Owner's Sales page, shown only when a PIN is set (defaults to the Performance PIN)
+OWNER_PIN = os.getenv('OWNER_PIN') or PERF_ADMIN_PIN
+SALES_REFRESH_SECONDS = float(os.getenv('SALES_REFRESH_SECONDS', '10'))
+
+# One catalog per process, shared by every session (stock is reserved from it)
+@st.cache_resource
+def get_catalog():
+    return Catalog(CATALOG_PATH)
+
+# Menu items and prices in INR, from catalog.json
+menu = get_catalog().prices(CATALOG_SECTION)
+
+# Function to calculate total (current prices, also for digests built across reruns)
+@traced("order.calculate_total")
 def calculate_total(order):
-    return sum(menu[item] * qty for item, qty in order.items() if qty > 0)
+    prices = get_catalog().prices(CATALOG_SECTION)
+    return sum(prices.get(item, 0) * qty for item, qty in order.items() if qty > 0)
+
+# One outbound queue (and one Twilio client) shared by every session
+@st.cache_resource
+def get_sms_queue():
+    return SmsQueue(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, api_base=TWILIO_API_BASE).start()
+
+# One digest buffer shared by every session
+@st.cache_resource
+def get_order_digest():
+    queue = get_sms_queue()
+    def send(body, orders):
+        return queue.enqueue(gsm7_if_lossless(body) if SMS_COMPACT else body, YOUR_PHONE_NUMBER)
+    return OrderDigest(send, calculate_total,
+                       window_seconds=SMS_DIGEST_WINDOW_SECONDS, max_orders=SMS_DIGEST_MAX_ORDERS,
+                       db_path=queue.db_path)
+
+# Indexed, append-only order log (orders.log + orders.idx)
+@st.cache_resource
+def get_order_store():
+    return OrderStore()
+
+# Single writer that group-commits orders from every session
+@st.cache_resource
+def get_order_writer():
+    return OrderWriter(get_order_store())
+
+# Duplicate-submission guard shared by every session, backed by the order log
+@st.cache_resource
+def get_order_idempotency():
+    return IdempotencyCache(get_order_store(), ttl=ORDER_DEDUP_WINDOW_SECONDS)
+
+# Sales figures kept up to date by reading only what was appended to the order log
+@st.cache_resource
+def get_sales_tail():
+    return SalesTail(get_order_store().log_path)
+
+# Owner's dashboard; reruns on its own every SALES_REFRESH_SECONDS
+@st.fragment(run_every=SALES_REFRESH_SECONDS)
+def show_sales_dashboard():
+    tail = get_sales_tail()
+    with span("sales.refresh"):
+        tail.refresh(menu)
+    sales = tail.snapshot(menu, hours=24)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Orders", sales["orders"])
+    c2.metric("Revenue", f"₹{sales['revenue']:,}")
+    c3.metric("Average Order", f"₹{sales['revenue'] / sales['orders']:,.0f}" if sales["orders"] else "—")
+    if sales["behind_bytes"]:
+        st.caption(f"Catching up with the order log ({sales['behind_bytes'] / 1e6:.1f} MB to go)…")
 
-# Function to send SMS
-def send_sms(message):
+    st.markdown("<h3 style='color: #9C27B0;'>Orders per Hour (last 24 hours)</h3>", unsafe_allow_html=True)
+    st.bar_chart(sales["per_hour"], x="hour", y="orders")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("<h3 style='color: #9C27B0;'>Revenue per Item</h3>", unsafe_allow_html=True)
+        st.dataframe([{"Item": r["item"], "Sold": r["qty"], "Revenue (₹)": r["revenue"]} for r in sales["items"]],
+                     use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("<h3 style='color: #9C27B0;'>Top Customers</h3>", unsafe_allow_html=True)
+        st.dataframe([{"Name": c["name"], "Phone": c["phone"], "Orders": c["orders"], "Spent (₹)": c["spent"]}
+                      for c in sales["top_customers"]], use_container_width=True, hide_index=True)
+
+# Function to send SMS (queued; returns the message id, or None if it could not be queued)
+@traced("sms.send")
+def send_sms(message, to=YOUR_PHONE_NUMBER):
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=YOUR_PHONE_NUMBER
-        )
-        return True
+        return get_sms_queue().enqueue(message, to)
     except Exception as e:
         st.error(f"SMS failed: {e}")
-        return False
+        return None
 
 # Sidebar for navigation (with colored title)
 st.sidebar.markdown("<h2 style='color: #FF6B35;'>Sweet Waveside SK Shop</h2>", unsafe_allow_html=True)
 st.sidebar.image("https://via.placeholder.com/150x100?text=Shop+Logo", caption="Our Logo")  # Replace with your image URL
-page = st.sidebar.radio("Navigate", ["Browse Menu", "Place Order"])
+page = st.sidebar.radio("Navigate", ["Browse Menu", "Place Order"] + (["Sales"] if OWNER_PIN else [])
+                        + (["Performance"] if PERF_ADMIN_PIN else []))
 
-if page == "Browse Menu":
+# One function per page; each rerun is one span, named after the page (PERF_TRACE=on)
+@traced("rerun.browse_menu")
+def show_menu_page():
     # Colored title for Menu
     st.markdown("<h1 style='color: #4CAF50;'>Our Delicious Sweets Menu</h1>", unsafe_allow_html=True)
     st.write("Explore our handcrafted sweets!")
-    for item, price in menu.items():
-        st.write(f"**{item}**: ₹{price} per piece")
+    for entry in get_catalog().items(CATALOG_SECTION):
+        left = entry["remaining"]
+        stock_note = "" if left is None else " · Sold out" if left <= 0 else f" · {left} left"
+        st.write(f"**{entry['name']}**: ₹{entry['price']} per piece{stock_note}")
     st.info("Head to 'Place Order' to select and order items.")
 
-elif page == "Place Order":
+@traced("rerun.place_order")
+def show_order_page():
     # Colored title for Order
     st.markdown("<h1 style='color: #2196F3;'>Place Your Order</h1>", unsafe_allow_html=True)
     st.write("Select your sweets, enter details, and click 'Order Now'!")
@@ -56,13 +154,31 @@ elif page == "Place Order":
     # Colored subheader for Select Items group
     st.markdown("<h3 style='color: #9C27B0;'>Select Items</h3>", unsafe_allow_html=True)
     order = {}
+    # Names, prices and stock from one read, so a reload in between cannot
+    # drop an item from one and not the other
+    entries = get_catalog().items(CATALOG_SECTION)
+    menu = {entry["name"]: entry["price"] for entry in entries}
+    stock = {entry["name"]: entry["remaining"] for entry in entries}
+    # Items lowered on any rerun stay listed until the next "Order Now"
+    lowered = st.session_state.setdefault('lowered', [])
     cols = st.columns(2)
     for i, (item, price) in enumerate(menu.items()):
         with cols[i % 2]:
-            qty = st.number_input(f"{item} (₹{price})", min_value=0, max_value=10, step=1, key=item)
+            # At most 10 per order, and no more than is left
+            max_qty = 10 if stock[item] is None else max(0, min(10, stock[item]))
+            if st.session_state.get(item, 0) > max_qty:
+                st.session_state[item] = max_qty  # sold while this page was open
+                if item not in lowered:
+                    lowered.append(item)
+            qty = st.number_input(f"{item} (₹{price})", min_value=0, max_value=max_qty, step=1, key=item,
+                                  disabled=max_qty == 0)
+            if stock[item] is not None and stock[item] <= 10:
+                st.caption("Sold out" if stock[item] <= 0 else f"Only {stock[item]} left")
             order[item] = qty
 
+    calc_started = time.perf_counter()
     total = calculate_total(order)
+    calc_seconds = time.perf_counter() - calc_started
     if total > 0:
         st.markdown(f"<h4 style='color: #FF9800;'>Total Cost: ₹{total}</h4>", unsafe_allow_html=True)
     else:
@@ -79,26 +195,130 @@ elif page == "Place Order":
 
     # Handle order submission
     if order_now:
-        if total > 0 and name and phone and address:
+        # Stage timings of this submission (ms), kept in the session for load tests
+        stage_started = time.perf_counter()
+        if lowered:
+            st.warning(f"Stock ran low while you were ordering, so we lowered: {', '.join(lowered)}. "
+                       "Please check your order and click 'Order Now' again.")
+            st.session_state['lowered'] = []
+        elif total > 0 and name and phone and address:
             # Create order summary
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Save to the order log; the id is derived from the order's content, so a
+            # resubmitted form (double-click, reconnect) maps to the order already placed
+            record = {
+                "timestamp": timestamp, "name": name, "phone": phone, "address": address,
+                "special_notes": special_notes, "total": total,
+                "items": [{"name": item, "qty": qty, "price": menu[item]} for item, qty in order.items() if qty > 0],
+            }
+            record["fingerprint"] = order_fingerprint(record)
+            record["order_id"] = new_order_id(timestamp, record["fingerprint"])
             order_items = "\n".join([f"- {item}: {qty} pcs" for item, qty in order.items() if qty > 0])
-            summary = f"[{timestamp}]\nName: {name}\nPhone: {phone}\nAddress: {address}\nSpecial Notes: {special_notes}\nOrder:\n{order_items}\nTotal: ₹{total}\n\n"
-            
-            # Display success and summary
-            st.success("Order placed successfully! Thank you for choosing Sweet Waveside SK Shop.")
-            st.text_area("Order Summary", summary, height=200)
-            
-            # Save to file (with UTF-8 encoding)
-            with open("customer_orders.txt", "a", encoding="utf-8") as f:
-                f.write(summary)
-            st.info("Order saved to 'customer_orders.txt' for processing.")
-            
-            # Send SMS with customer details
-            sms_message = f"New Order from Sweet Waveside SK Shop:\n{summary}"
-            if send_sms(sms_message):
-                st.info("SMS notification sent to your phone!")
+
+            def summary_for(order_id):
+                return f"[{timestamp}]\nOrder ID: {order_id}\nName: {name}\nPhone: {phone}\nAddress: {address}\nSpecial Notes: {special_notes}\nOrder:\n{order_items}\nTotal: ₹{total}\n\n"
+            validated = time.perf_counter()
+            stages = {}
+
+            def place():
+                # Runs once per distinct order within ORDER_DEDUP_WINDOW_SECONDS. Stock is
+                # taken first and given back if the order cannot be saved
+                with span("order.reserve_stock"):
+                    get_catalog().reserve(CATALOG_SECTION, order)
+                try:
+                    with span("order.persist"):
+                        order_id = get_order_writer().submit(record)
+                except Exception:
+                    get_catalog().release(CATALOG_SECTION, order)
+                    raise
+                stages["persisted"] = time.perf_counter()
+
+                # Send SMS with customer details (delivered in the background)
+                if SMS_DIGEST_MODE:
+                    digest_order = {"timestamp": timestamp, "name": name, "phone": phone, "items": dict(order),
+                                    "total": total, "special_notes": special_notes}
+                    with span("sms.digest_add"):
+                        sms_id = get_order_digest().add(digest_order)
+                else:
+                    if SMS_COMPACT:
+                        link = f"{ORDER_LINK_BASE}{order_id}" if ORDER_LINK_BASE else None
+                        sms_message = compact_order_sms(order_id, name, phone, address, special_notes, order,
+                                                        total, menu, SMS_MAX_SEGMENTS, link)
+                    else:
+                        sms_message = f"New Order from Sweet Waveside SK Shop:\n{summary_for(order_id)}"
+                    sms_id = send_sms(sms_message)
+                stages["notified"] = time.perf_counter()
+                return {"order_id": order_id, "sms_id": sms_id}
+
+            try:
+                placement, first = get_order_idempotency().run(record["fingerprint"], place)
+            except OutOfStock as e:
+                short = ", ".join(f"{item} ({left} left)" for item, left in e.shortages.items())
+                st.error(f"Sorry, not enough stock: {short}. Please lower the quantity and order again.")
             else:
-                st.warning("Order saved, but SMS failed—check Twilio setup.")
+                order_id, sms_id = placement["order_id"], placement.get("sms_id")
+                summary = summary_for(order_id)
+
+                # Display success and summary
+                if first:
+                    st.success("Order placed successfully! Thank you for choosing Sweet Waveside SK Shop.")
+                else:
+                    st.info("This order was already placed. It was not saved or sent again.")
+                st.text_area("Order Summary", summary, height=200)
+                st.info(f"Order {order_id} saved for processing.")
+
+                if first:
+                    if SMS_DIGEST_MODE and not sms_id:
+                        st.info("Order added to the next SMS digest.")
+                    if sms_id:
+                        st.session_state.setdefault('sms_ids', []).append(sms_id)
+                        st.info("SMS notification queued for your phone!")
+                    elif not SMS_DIGEST_MODE:
+                        st.warning("Order saved, but SMS failed—check Twilio setup.")
+                    st.session_state['order_timings'] = {
+                        "order_id": order_id,
+                        "validation_ms": (calc_seconds + validated - stage_started) * 1000,
+                        "persistence_ms": (stages["persisted"] - validated) * 1000,
+                        "notification_ms": (stages["notified"] - stages["persisted"]) * 1000,
+                        "sms_id": sms_id,
+                    }
         else:
             st.error("Please select items and fill in all required details (Name, Phone, Address).")
+
+    # Delivery status of this session's SMS notifications
+    if st.session_state.get('sms_ids'):
+        st.markdown("<h3 style='color: #9C27B0;'>SMS Notifications</h3>", unsafe_allow_html=True)
+        statuses = get_sms_queue().statuses(st.session_state['sms_ids'][-10:])
+        st.dataframe(
+            [{"Message": s["id"], "Status": s["status"], "Attempts": s["attempts"], "Last Error": s["last_error"] or ""}
+             for s in reversed(statuses)],
+            use_container_width=True, hide_index=True
+        )
+        st.button("Refresh Status")
+
+@traced("rerun.sales")
+def show_sales_page():
+    pin = st.sidebar.text_input("Owner PIN", type="password")
+    if pin and hmac.compare_digest(pin.encode(), OWNER_PIN.encode()):
+        st.markdown("<h1 style='color: #4CAF50;'>Sales</h1>", unsafe_allow_html=True)
+        show_sales_dashboard()
+    elif pin:
+        st.error("Wrong PIN.")
+    else:
+        st.info("Enter the owner PIN in the sidebar to see sales.")
+
+@traced("rerun.performance")
+def show_performance_page():
+    pin = st.sidebar.text_input("Owner PIN", type="password")
+    if pin and hmac.compare_digest(pin.encode(), PERF_ADMIN_PIN.encode()):
+        show_perf_panel()
+    elif pin:
+        st.error("Wrong PIN.")
+    else:
+        st.info("Enter the owner PIN in the sidebar to see the timings.")
+
+# Show the selected page
+PAGES = {"Browse Menu": show_menu_page, "Place Order": show_order_page, "Sales": show_sales_page,
+         "Performance": show_performance_page}
+PAGES[page]()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --------------------------------------------------------------------------------
+# Analytics tab: trends from the raw history vs daily rollups + cache
+# --------------------------------------------------------------------------------
+# One user with --rows transactions over --years years. "raw" is the pre-rollup
+# approach (load every transaction into pandas, then group); "cold" builds
+# SpendAnalytics from spend_daily; "warm" is the next rerun, served from the
+# cache. Each pass computes the three trends, the month-over-month table and
+# the projection, and builds the plotly figures the tab renders.
+#
+#   python benchmarks/bench_analytics.py --rows 1000000
+
+CATEGORIES = ["Food & Beverages", "Travel", "Bills & Utilities", "Shopping", "Groceries", "Entertainment",
+              "Health & Fitness", "Education", "Rent & EMIs", "Personal Care"]
+
+
+def populate(expense_db, rows, years):
+    rng = random.Random(5)
+    end = time.time()
+    for i in range(0, rows, 100000):
+        batch = [(f"item {j}", rng.randint(10, 5000), rng.choice(CATEGORIES),
+                  time.strftime("%Y-%m-%d", time.localtime(end - rng.random() * years * 365 * 86400)))
+                 for j in range(i, min(rows, i + 100000))]
+        expense_db.add_expenses_bulk("bench", batch)
+
+
+def raw_pass(expense_db, px):
+    df = expense_db.get_recent_transactions("bench")
+    df["date"] = df["date"].astype("datetime64[ns]")
+    for rule in ("D", "W-MON", "MS"):
+        grouped = df.groupby([df["date"].dt.to_period(rule[0]).dt.start_time, "category"])["amount"].sum()
+        px.bar(grouped.reset_index(), x="date", y="amount", color="category")
+
+
+def rollup_pass(expense_analytics, px, spend_limit):
+    analytics = expense_analytics.get_spend_analytics("bench")
+    for period in expense_analytics.TREND_RULES:
+        px.bar(analytics.trend_long(period), x="period", y="amount", color="category")
+    analytics.category_deltas()
+    analytics.projection(spend_limit)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    import plotly.express as px
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import expense_db
+        expense_db.DB_NAME = os.path.join(tmp, "bench.db")
+        expense_db.DB_URL = None
+        expense_db.init_db()
+        import expense_analytics
+
+        start = time.perf_counter()
+        populate(expense_db, args.rows, args.years)
+        print(f"{args.rows} transactions over {args.years} years loaded in {time.perf_counter() - start:.1f}s")
+
+        raw = timed(lambda: raw_pass(expense_db, px))
+        cold = timed(lambda: rollup_pass(expense_analytics, px, 50000))
+        warm = min(timed(lambda: rollup_pass(expense_analytics, px, 50000)) for _ in range(5))
+        print(f"raw history + groupby : {raw:8.1f} ms")
+        print(f"rollups, cold cache   : {cold:8.1f} ms")
+        print(f"rollups, warm cache   : {warm:8.1f} ms  (figures only; data from cache)")
+        expense_db.get_backend().close()
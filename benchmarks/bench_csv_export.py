@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# --------------------------------------------------------------------------------
+# CSV export: full DataFrame vs chunked streaming
+# --------------------------------------------------------------------------------
+# Each export runs in a fresh subprocess so ru_maxrss is that path's own peak;
+# "export" is how far the peak rose during the export itself (after imports).
+# "button" is what the Analytics download button does: the export into a
+# temporary file (export_transactions_tempfile), then Streamlit's own
+# conversion of that file to the bytes it serves. Those bytes (the output
+# size) are held by st.download_button whatever the source; "join" is the
+# previous button path, which also held every chunk while joining them.
+#
+#   python benchmarks/bench_csv_export.py --rows 200000 500000
+
+CATEGORIES = ["Food & Beverages", "Travel", "Bills & Utilities", "Shopping", "Groceries", "Entertainment"]
+
+
+def populate(path, rows):
+    import expense_db
+    expense_db.DB_NAME = path
+    expense_db.DB_URL = None
+    expense_db.init_db()
+    rng = random.Random(3)
+    with expense_db.get_backend().connection() as conn, conn:
+        conn.executemany('INSERT INTO transactions (username, name, amount, category, date) VALUES (?,?,?,?,?)',
+                         (("bench", f"purchase number {i} at some shop", rng.randint(10, 5000), rng.choice(CATEGORIES),
+                           f"20{rng.randint(15, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+                          for i in range(rows)))
+
+
+def run_export(path, mode):
+    import expense_db
+    expense_db.DB_NAME = path
+    expense_db.DB_URL = None
+    # mmap'd database pages are file-backed but still count towards RSS; leave
+    # them out so the numbers reflect the export's own memory
+    import expense_storage
+    expense_storage.PRAGMAS = tuple(p for p in expense_storage.PRAGMAS if "mmap_size" not in p)
+    if mode.startswith("button"):
+        from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+    before_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    if mode == "dataframe":
+        # The old Analytics path: full DataFrame -> one CSV string -> bytes
+        df = expense_db.get_recent_transactions("bench")
+        size = len(df.to_csv(index=False).encode("utf-8"))
+    elif mode == "join":
+        size = len(b"".join(expense_db.iter_transactions_csv("bench")))
+    elif mode.startswith("button"):
+        with expense_db.export_transactions_tempfile("bench", compress=(mode == "button+gzip")) as f:
+            size = len(convert_data_to_bytes_and_infer_mime(f, ValueError("unsupported"))[0])
+    else:
+        with open(os.devnull, "wb") as f:
+            size = expense_db.export_transactions_csv("bench", f, compress=(mode == "stream+gzip"))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.3f} {peak_mb:.1f} {peak_mb - before_mb:.1f} {size}")
+
+
+def baseline_rss(path):
+    # Interpreter + pandas + expense_db with nothing exported
+    out = subprocess.run([sys.executable, "-c",
+                          "import resource, expense_db; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)"],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_export(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"baseline RSS (imports only): {baseline_rss(tmp):.1f} MB")
+        print(f"{'rows':>8}  {'path':<12} {'time':>8} {'peak RSS':>10} {'export':>10} {'output':>10}")
+        for rows in args.rows:
+            path = os.path.join(tmp, f"bench_{rows}.db")
+            subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); "
+                            f"from benchmarks.bench_csv_export import populate; populate({path!r}, {rows})"],
+                           cwd=ROOT, check=True)
+            for mode in ("dataframe", "join", "button", "button+gzip", "stream", "stream+gzip"):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, mode],
+                                     capture_output=True, text=True, check=True)
+                elapsed, peak, grown, size = out.stdout.split()
+                print(f"{rows:>8}  {mode:<12} {float(elapsed):7.2f}s {float(peak):8.1f}MB {float(grown):8.1f}MB "
+                      f"{int(size) / 1e6:8.1f}MB")
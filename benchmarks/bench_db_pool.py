@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import expense_db  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Per-rerun DB overhead: connect-per-call vs pooled connections
+# --------------------------------------------------------------------------------
+# One "rerun" is what a dashboard render + profile edit costs: get_profile_db,
+# get_total_expenses, update_profile_db (which reads the profile again) and
+# get_recent_transactions.
+#
+#   python benchmarks/bench_db_pool.py --reruns 300 --rows 2000
+
+
+def legacy_rerun(path, username):
+    # The pre-pool helpers: a fresh sqlite3.connect() per call
+    with sqlite3.connect(path) as conn:
+        profile = conn.execute('SELECT * FROM profiles WHERE username = ?', (username,)).fetchone()
+    with sqlite3.connect(path) as conn:
+        conn.execute('SELECT SUM(amount) FROM transactions WHERE username = ?', (username,)).fetchone()
+    with sqlite3.connect(path) as conn:
+        with sqlite3.connect(path) as inner:
+            current = inner.execute('SELECT * FROM profiles WHERE username = ?', (username,)).fetchone()
+        conn.execute('INSERT OR REPLACE INTO profiles VALUES (?,?,?,?,?,?,?,?,?)', current)
+        conn.commit()
+    with sqlite3.connect(path) as conn:
+        conn.execute("SELECT date, name, category, amount FROM transactions WHERE username = ? "
+                     "ORDER BY date DESC LIMIT 10", (username,)).fetchall()
+    return profile
+
+
+def pooled_rerun(username):
+    profile = expense_db.get_profile_db(username)
+    expense_db.get_total_expenses(username)
+    expense_db.update_profile_db(username, profile[4], profile[6], profile[7])
+    with expense_db.get_backend().connection() as conn:
+        conn.execute("SELECT date, name, category, amount FROM transactions WHERE username = ? "
+                     "ORDER BY date DESC LIMIT 10", (username,)).fetchall()
+    return profile
+
+
+def timed(fn, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        fn()
+    return (time.perf_counter() - start) / reruns * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        expense_db.DB_NAME = path
+        expense_db.DB_URL = None
+        expense_db.init_db()
+        expense_db.register_user_db("bench", "pw", "Bench User", "b@example.com", "+910000000000", "₹ INR", 5000)
+        expense_db.save_profile_db(("bench", "Job", 50000, 50000, 20000, 10000, 5000, 2000, 0))
+        rng = random.Random(1)
+        for i in range(args.rows):
+            expense_db.add_expense_db("bench", f"item {i}", rng.randint(10, 500), "Food & Beverages",
+                                      f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+
+        legacy = timed(lambda: legacy_rerun(path, "bench"), args.reruns)
+        pooled = timed(lambda: pooled_rerun("bench"), args.reruns)
+        print(f"connect per call : {legacy:7.3f} ms/rerun")
+        print(f"pooled           : {pooled:7.3f} ms/rerun  ({legacy / pooled:.1f}x faster)")
+        expense_db.get_backend().close()
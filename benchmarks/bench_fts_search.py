@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --------------------------------------------------------------------------------
+# Transaction search: FTS5 index vs LIKE scan
+# --------------------------------------------------------------------------------
+# Fills a fresh database with --rows transactions spread over --users users
+# (descriptions built from a merchant/item vocabulary), then times each query
+# through search_transactions() and through the LIKE scan it replaces. The
+# index ranks every match (bm25); the LIKE scan returns the newest matches
+# unranked and stops at the limit, so it is cheap for common words and pays
+# for a full scan of the user's rows on rare ones.
+#
+#   python benchmarks/bench_fts_search.py --rows 2000000 --users 20
+
+MERCHANTS = ["KFC", "Amazon", "Swiggy", "Zomato", "Uber", "Ola", "BigBasket", "Flipkart", "Netflix", "Apollo",
+             "Indian Oil", "Airtel", "Jio", "Myntra", "Dominos", "Starbucks", "IRCTC", "BookMyShow", "Decathlon"]
+ITEMS = ["meal", "purchase", "order", "ride", "groceries", "recharge", "subscription", "pharmacy", "fuel",
+         "tickets", "coffee", "pizza", "shoes", "books", "electricity bill", "monthly rent", "gym membership"]
+CATEGORIES = ["Food & Beverages", "Travel", "Bills & Utilities", "Shopping", "Groceries", "Entertainment"]
+
+QUERIES = [
+    ("word", "kfc", {}),
+    ("two words", "amazon books", {}),
+    ("phrase", '"electricity bill"', {}),
+    ("prefix", "subscr*", {}),
+    ("rare word", "decathlon shoes", {}),
+    ("word + filters", "coffee", {"categories": ["Food & Beverages"], "start": "2025-01-01"}),
+    ("no match", "refund", {}),
+]
+
+
+def populate(expense_db, rows, users):
+    rng = random.Random(11)
+    per_user = rows // users
+    for u in range(users):
+        batch = [(f"{rng.choice(MERCHANTS)} {rng.choice(ITEMS)} #{rng.randint(1, 99999)}", rng.randint(10, 5000),
+                  rng.choice(CATEGORIES), f"20{rng.randint(20, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+                 for _ in range(per_user)]
+        for i in range(0, len(batch), 50000):
+            expense_db.add_expenses_bulk(f"user{u}", batch[i:i + 50000])
+
+
+def like_search(expense_db, username, text, start=None, end=None, categories=None, limit=50):
+    # The pre-index approach: substring match on every row of the user
+    sql = 'SELECT id, date, name, category, amount FROM transactions WHERE username = ?'
+    params = [username]
+    for term, _ in expense_db.parse_search(text):
+        sql += ' AND name LIKE ?'
+        params.append(f"%{term}%")
+    if start:
+        sql += ' AND date >= ?'
+        params.append(start)
+    if categories:
+        sql += f' AND category IN ({",".join("?" * len(categories))})'
+        params += categories
+    with expense_db.get_backend().connection() as conn:
+        return conn.execute(sql + ' ORDER BY date DESC, id DESC LIMIT ?', params + [limit]).fetchall()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import expense_db
+        expense_db.DB_NAME = os.path.join(tmp, "bench.db")
+        expense_db.DB_URL = None
+        expense_db.init_db()
+        start = time.perf_counter()
+        populate(expense_db, args.rows, args.users)
+        print(f"{args.rows} rows over {args.users} users loaded in {time.perf_counter() - start:.1f}s "
+              f"({args.rows // args.users} rows per user)")
+        start = time.perf_counter()
+        with expense_db.get_backend().connection() as conn:
+            expense_db.optimize_search_index(conn)
+        print(f"search index optimized in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'query':<16} {'hits':>5} {'fts p50':>9} {'fts p95':>9} {'like p50':>9} {'like p95':>9}")
+        for label, text, filters in QUERIES:
+            hits = len(expense_db.search_transactions("user0", text, **filters))
+            fts = timed(lambda: expense_db.search_transactions("user0", text, **filters), args.repeat)
+            like = timed(lambda: like_search(expense_db, "user0", text, **filters), max(3, args.repeat // 10))
+            print(f"{label:<16} {hits:>5} {fts[0]:7.2f}ms {fts[1]:7.2f}ms {like[0]:7.2f}ms {like[1]:7.2f}ms")
+        expense_db.get_backend().close()
@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_store import IdempotencyCache, OrderStore, OrderWriter, new_order_id, order_fingerprint  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Duplicate submissions: the same order from many threads at once
+# --------------------------------------------------------------------------------
+# Each round builds one order and fires it from --threads threads released
+# together by a barrier, the way app.py places it: fingerprint, then
+# IdempotencyCache.run() around OrderWriter.submit() and a (counting) SMS send.
+# Every thread gets a slightly different spelling of the customer's details
+# (case, spaces, phone formatting), which must not matter. After the rounds
+# the cache is thrown away and every order is submitted again, as after an app
+# restart: those must be answered from the order log.
+#
+# Exits non-zero unless every round stored exactly one record and sent exactly
+# one SMS.
+#
+#   python benchmarks/bench_idempotency.py --threads 64 --rounds 50
+
+ITEMS = [("Gulab Jamun", 50), ("Ras Malai", 60), ("Jalebi", 40)]
+
+
+def make_record(n, variant):
+    name, phone, address = f"Customer {n}", f"+91 98{n:08d}", f"House {n}, Waveside Beach Road"
+    if variant % 3 == 1:
+        name, phone, address = name.upper(), phone.replace(" ", ""), address.replace(" ", "  ")
+    elif variant % 3 == 2:
+        name, phone, address = f" {name.lower()} ", f"+91-98-{n:08d}", f"{address}\n"
+    items = [{"name": item, "qty": 1 + (n + i) % 4, "price": price} for i, (item, price) in enumerate(ITEMS)]
+    return {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "name": name, "phone": phone,
+            "address": address, "special_notes": "", "items": items,
+            "total": sum(i["qty"] * i["price"] for i in items)}
+
+
+def place_all(cache, writer, n, threads, sent):
+    barrier = threading.Barrier(threads)
+    results, errors, latencies = [], [], []
+    lock = threading.Lock()
+
+    def worker(variant):
+        record = make_record(n, variant)
+        record["fingerprint"] = order_fingerprint(record)
+        record["order_id"] = new_order_id(record["timestamp"], record["fingerprint"])
+
+        def place():
+            order_id = writer.submit(record)
+            with lock:
+                sent.append(order_id)
+            return {"order_id": order_id}
+
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            placement, first = cache.run(record["fingerprint"], place)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+            return
+        with lock:
+            results.append((placement["order_id"], first))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    pool = [threading.Thread(target=worker, args=(v,)) for v in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results, errors, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OrderStore(os.path.join(tmp, "orders.log"), os.path.join(tmp, "orders.idx"))
+        writer = OrderWriter(store)
+        cache = IdempotencyCache(store)
+        sent, latencies = [], []
+        for n in range(args.rounds):
+            results, errors, round_latencies = place_all(cache, writer, n, args.threads, sent)
+            latencies += round_latencies
+            firsts = sum(1 for _, first in results if first)
+            if errors or firsts != 1 or len({order_id for order_id, _ in results}) != 1:
+                failures.append(f"round {n}: {firsts} placed, {len(errors)} errors, "
+                                f"{len({order_id for order_id, _ in results})} order IDs")
+
+        # Restart: a fresh cache must find every order in the log
+        restarted = IdempotencyCache(store)
+        for n in range(args.rounds):
+            results, errors, _ = place_all(restarted, writer, n, args.threads, sent)
+            if errors or any(first for _, first in results):
+                failures.append(f"after restart, round {n}: placed again")
+        writer.close()
+
+        stored = store.count()
+        if stored != args.rounds:
+            failures.append(f"{stored} records stored for {args.rounds} orders")
+        if len(sent) != args.rounds:
+            failures.append(f"{len(sent)} SMS sent for {args.rounds} orders")
+
+    latencies.sort()
+    print(f"{args.rounds} orders x {args.threads} threads x 2 (before and after restart)")
+    print(f"stored {stored} records, sent {len(sent)} SMS; cache {cache.misses} placed, {cache.hits} repeats")
+    print(f"run() latency p50 {latencies[len(latencies) // 2]:.2f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f}ms, max {latencies[-1]:.2f}ms")
+    for line in failures:
+        print(f"FAIL {line}")
+    sys.exit(1 if failures else 0)
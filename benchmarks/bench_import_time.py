@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --------------------------------------------------------------------------------
+# Cold start: imports paid by the first render of each page
+# --------------------------------------------------------------------------------
+# Every scenario runs in a fresh interpreter under `python -X importtime`. The
+# driver imports Streamlit and AppTest first and then prints a marker, so the
+# import time counted is only the time of modules the app pulled in
+# (the cumulative time of the outermost imports after the marker). The first
+# render is also timed, and the driver checks that pages do not load modules
+# they have no use for (e.g. pandas on the login page).
+#
+#   ex_auth        ex.py login page
+#   ex_dashboard   ex.py Overview tab of a seeded user
+#   app_browse     app.py Browse Menu
+#   app_order      app.py Place Order (form only, nothing submitted)
+#
+# Exits non-zero if a scenario's median import time exceeds its budget or a
+# forbidden module is loaded.
+#
+#   python benchmarks/bench_import_time.py
+#   python benchmarks/bench_import_time.py --repeat 5 --budget ex_auth=150 --report imports.json
+
+SCENARIOS = {
+    "ex_auth": ("ex.py", None),
+    "ex_dashboard": ("ex.py", "Overview"),
+    "app_browse": ("app.py", None),
+    "app_order": ("app.py", "Place Order"),
+}
+
+# Median app import time allowed per scenario, in ms
+BUDGETS_MS = {"ex_auth": 250, "ex_dashboard": 1200, "app_browse": 250, "app_order": 250}
+
+# Modules a scenario must not load
+FORBIDDEN = {
+    "ex_auth": ("pandas", "plotly.express", "streamlit_option_menu", "expense_analytics", "pyarrow.parquet"),
+    "ex_dashboard": ("plotly.express", "expense_analytics", "pyarrow.parquet"),
+    "app_browse": ("twilio",),
+    "app_order": ("twilio",),
+}
+
+MARKER = "### app imports start"
+
+DRIVER = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+script, choice = sys.argv[1], sys.argv[2]
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+at = AppTest.from_file(script, default_timeout=120)
+if script.endswith("ex.py") and choice:
+    import streamlit_option_menu
+    streamlit_option_menu.option_menu = lambda *a, **k: choice
+    at.session_state["logged_in"] = True
+    at.session_state["page"] = "dashboard"
+    at.session_state["user_info"] = {{"username": "user00000", "name": "Load User 0", "currency": "₹ INR"}}
+at.run()
+if choice and script.endswith("app.py"):
+    at.sidebar.radio[0].set_value(choice).run()
+print(json.dumps({{"render_ms": (time.perf_counter() - start) * 1000, "modules": sorted(sys.modules),
+                  "exception": [e.message for e in at.exception]}}))
+"""
+
+
+def parse_importtime(stderr):
+    # Returns {module: cumulative_us} for the outermost imports after MARKER
+    _, _, after = stderr.partition(MARKER)
+    imports = {}
+    for line in after.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # nested import, or the header line
+        imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def run_scenario(name, workdir, env):
+    script, choice = SCENARIOS[name]
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", DRIVER, os.path.join(ROOT, script), choice or ""],
+                          cwd=workdir, env=env, capture_output=True, text=True, timeout=300)
+    if proc.returncode:
+        raise RuntimeError(f"{name}: driver failed\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if result["exception"]:
+        raise RuntimeError(f"{name}: {result['exception'][0]}")
+    imports = parse_importtime(proc.stderr)
+    loaded = set(result["modules"])
+    return {
+        "import_ms": sum(imports.values()) / 1000,
+        "render_ms": result["render_ms"],
+        "top_imports": sorted(imports.items(), key=lambda i: i[1], reverse=True)[:5],
+        "forbidden_loaded": [m for m in FORBIDDEN.get(name, ()) if m in loaded],
+    }
+
+
+def parse_budget(value):
+    name, _, ms = value.partition("=")
+    if name not in SCENARIOS or not ms:
+        raise argparse.ArgumentTypeError(f"expected SCENARIO=MS with SCENARIO in {', '.join(SCENARIOS)}")
+    return name, float(ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per scenario (median reported)")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[],
+                        help="override a budget, e.g. ex_auth=150 (ms of app imports)")
+    parser.add_argument("--report", help="write the results as JSON")
+    args = parser.parse_args()
+    budgets = dict(BUDGETS_MS, **dict(args.budget))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, EXPENSE_DB_PATH=os.path.join(tmp, "cold.db"), BUDGET_ALERT_SMS="off",
+                   PERF_TRACE="off", PYTHONPATH=ROOT)
+        env.pop("EXPENSE_DB_URL", None)
+        subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "seed_data.py"), "--users", "1",
+                        "--transactions", "500"], env=env, check=True, capture_output=True)
+
+        report, failures = {}, []
+        print(f"{'scenario':<14} {'imports':>10} {'render':>10} {'budget':>8}  slowest imports")
+        for name in args.scenarios:
+            runs = [run_scenario(name, tmp, env) for _ in range(args.repeat)]
+            result = {
+                "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+                "render_ms": round(statistics.median(r["render_ms"] for r in runs), 1),
+                "budget_ms": budgets[name],
+                "top_imports": [(m, round(us / 1000, 1)) for m, us in runs[-1]["top_imports"]],
+                "forbidden_loaded": sorted({m for r in runs for m in r["forbidden_loaded"]}),
+            }
+            report[name] = result
+            slowest = ", ".join(f"{m} {ms:.0f}ms" for m, ms in result["top_imports"][:3])
+            print(f"{name:<14} {result['import_ms']:8.1f}ms {result['render_ms']:8.1f}ms {budgets[name]:6.0f}ms  "
+                  f"{slowest}")
+            if result["import_ms"] > budgets[name]:
+                failures.append(f"{name}: imports took {result['import_ms']}ms, budget {budgets[name]}ms")
+            if result["forbidden_loaded"]:
+                failures.append(f"{name}: loaded {', '.join(result['forbidden_loaded'])}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    for line in failures:
+        print(f"OVER BUDGET {line}")
+    sys.exit(1 if failures else 0)
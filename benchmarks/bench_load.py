@@ -0,0 +1,253 @@
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# --------------------------------------------------------------------------------
+# Load test: ex.py pages rendered headlessly with Streamlit's AppTest
+# --------------------------------------------------------------------------------
+# Seeds a database (benchmarks/seed_data.py), then runs the real script in
+# this process for each page, cycling through the seeded users so the per-user
+# caches behave as with many people logged in:
+#
+#   auth       login/register page (show_auth), new session
+#   login      "Log In" clicked with valid credentials -> first dashboard render
+#   overview   dashboard (show_dashboard), Overview tab
+#   analytics  dashboard, Analytics tab (pie, activity page, trends, projection)
+#   search     Analytics tab rerun with a search query
+#
+# Each page reports p50/p95/p99 render time, SQL statements per render (from a
+# sqlite3 trace callback on the pooled connections) and peak Python allocation
+# during one extra traced render with an empty cache. The JSON report can be compared with an
+# earlier one; regressions beyond --tolerance exit non-zero.
+#
+#   python benchmarks/bench_load.py --users 20 --transactions 20000 --report before.json
+#   python benchmarks/bench_load.py --users 20 --transactions 20000 --baseline before.json
+
+PAGES = ("auth", "login", "overview", "analytics", "search")
+SCRIPT = os.path.join(ROOT, "ex.py")
+QUERY_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# The option_menu component cannot be clicked headlessly; the dashboard tab is
+# chosen by replacing it (ex.py looks it up again on every run)
+menu = {"selected": "Overview"}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement):
+        # Statements run by triggers are reported with a "--" prefix
+        if statement.lstrip().upper().startswith(QUERY_PREFIXES):
+            self.count += 1
+
+
+def percentile(samples, p):
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def instrument(expense_db, counter):
+    backend = expense_db.get_backend()
+    backend.close()  # reopen connections with the trace callback
+    connect = backend._connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(counter)
+        return conn
+    backend._connect = traced_connect
+
+
+def new_session(username=None, tab=None):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(SCRIPT, default_timeout=60)
+    if username:
+        at.session_state["logged_in"] = True
+        at.session_state["page"] = "dashboard"
+        at.session_state["user_info"] = {"username": username, "name": username, "currency": "₹ INR"}
+        menu["selected"] = tab
+    return at
+
+
+def render(page, username, password):
+    # Returns the AppTest prepared for `page` and the callable to time
+    if page == "auth":
+        at = new_session()
+        return at, at.run
+    if page == "login":
+        at = new_session()
+        at.run()
+        at.text_input(key="l_user").input(username)
+        at.text_input(key="l_pass").input(password)
+        menu["selected"] = "Overview"
+        button = next(b for b in at.button if b.label == "Log In")
+        return at, lambda: button.click().run()
+    if page == "search":
+        at = new_session(username, "Analytics")
+        at.run()
+        box = at.text_input(key="search_q")
+        return at, lambda: box.input("kfc meal").run()
+    at = new_session(username, page.title())
+    return at, at.run
+
+
+def run_page(expense_db, page, users, runs, password, counter):
+    # Every page starts from an empty cache so its query counts do not depend
+    # on the pages run before it
+    expense_db.cache.clear()
+    times, queries = [], []
+    for i in range(runs + 1):
+        at, fn = render(page, users[i % len(users)], password)
+        before = counter.count
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+        if i:  # the first render warms imports and bytecode
+            times.append(elapsed)
+            queries.append(counter.count - before)
+
+    # Peak allocation of a render that has to load the user's data
+    at, fn = render(page, users[runs % len(users)], password)
+    expense_db.cache.clear()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(times, 50), 2),
+        "p95_ms": round(percentile(times, 95), 2),
+        "p99_ms": round(percentile(times, 99), 2),
+        "mean_ms": round(sum(times) / len(times), 2),
+        "queries_per_render": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def harness_overhead(runs):
+    # p50 of a first run of an empty script: AppTest's own cost, included in
+    # the auth/overview/analytics timings (login and search time a rerun)
+    from streamlit.testing.v1 import AppTest
+    times = []
+    for _ in range(runs):
+        at = AppTest.from_string("import streamlit as st", default_timeout=60)
+        start = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(percentile(times, 50), 2)
+
+
+def compare(report, baseline, tolerance, min_ms):
+    # Returns a list of regression descriptions
+    regressions = []
+    for page, now in report["pages"].items():
+        before = baseline.get("pages", {}).get(page)
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if now[key] > before[key] * (1 + tolerance) and now[key] - before[key] > min_ms:
+                regressions.append(f"{page}.{key}: {before[key]} -> {now[key]}")
+        if now["queries_per_render"] > before["queries_per_render"] + 0.01:
+            regressions.append(f"{page}.queries_per_render: {before['queries_per_render']} -> "
+                               f"{now['queries_per_render']}")
+        if now["peak_alloc_kb"] > before["peak_alloc_kb"] * (1 + tolerance) + 1024:
+            regressions.append(f"{page}.peak_alloc_kb: {before['peak_alloc_kb']} -> {now['peak_alloc_kb']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="use an existing database instead of seeding a temporary one")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=5000, help="per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--runs", type=int, default=30, help="measured renders per page")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=list(PAGES))
+    parser.add_argument("--report", default="load_report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db:
+        db = args.db
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        db = os.path.join(tmp.name, "load.db")
+    os.environ["EXPENSE_DB_PATH"] = db
+    os.environ.pop("EXPENSE_DB_URL", None)
+    os.environ["BUDGET_ALERT_SMS"] = "off"
+
+    import streamlit_option_menu
+    streamlit_option_menu.option_menu = lambda *a, **k: menu["selected"]
+
+    from benchmarks import seed_data
+    import expense_db
+
+    start = time.perf_counter()
+    created = seed_data.seed(args.users, args.transactions, args.seed, end_date=args.end_date)
+    seed_seconds = time.perf_counter() - start
+    print(f"seeded {created} users x {args.transactions} transactions in {seed_seconds:.1f}s")
+
+    counter = QueryCounter()
+    instrument(expense_db, counter)
+    users = [seed_data.username_for(i) for i in range(args.users)]
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "users": args.users,
+            "transactions_per_user": args.transactions,
+            "seed": args.seed,
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "harness_p50_ms": harness_overhead(args.runs),
+        },
+        "pages": {},
+    }
+    print(f"AppTest overhead per new session: {report['meta']['harness_p50_ms']:.1f}ms (p50)")
+    print(f"{'page':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'peak alloc':>11}")
+    for page in args.pages:
+        result = run_page(expense_db, page, users, args.runs, seed_data.PASSWORD, counter)
+        report["pages"][page] = result
+        print(f"{page:<10} {result['p50_ms']:7.1f}ms {result['p95_ms']:7.1f}ms {result['p99_ms']:7.1f}ms "
+              f"{result['queries_per_render']:8.1f} {result['peak_alloc_kb'] / 1024:9.1f}MB")
+    report["process_peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    report["cache"] = {"hits": expense_db.cache.hits, "misses": expense_db.cache.misses}
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"process peak RSS {report['process_peak_rss_mb']} MB; report written to {args.report}")
+
+    expense_db.get_backend().close()
+    if tmp:
+        tmp.cleanup()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1 if regressions else 0)
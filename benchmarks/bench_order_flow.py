@@ -0,0 +1,176 @@
+import argparse
+import json
+import math
+import os
+import random
+import multiprocessing
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_twilio import start_fake_twilio  # noqa: E402
+from sms_queue import SmsQueue  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Order flow end to end: app.py "Place Order" against a local Twilio stand-in
+# --------------------------------------------------------------------------------
+# Starts fake_twilio with the given latency / error rate / rate limit, then
+# places --orders orders through the real app.py with Streamlit's AppTest,
+# --concurrency sessions at a time. AppTest swaps process-wide state on every
+# run, so concurrent sessions cannot share a process: each concurrent stream
+# is a worker process with its own working directory (order log, index and
+# SMS outbox), all sending to the one fake API. For each order the "Order Now"
+# rerun is timed and split into the stages app.py records in
+# st.session_state['order_timings']:
+#
+#   validation    calculate_total + form checks + building the record
+#   persistence   OrderWriter.submit (group-committed, fsync'd)
+#   notification  queueing the SMS (or adding to the digest)
+#
+# end_to_end is the whole rerun, so it also includes AppTest's own overhead
+# and rendering the page.
+#
+# Stock is not limited (a catalog without counts), so no order is turned away.
+#
+# After its last order each worker waits for its outbox to drain, so the
+# report also has delivery latency (queued -> accepted by the fake API,
+# retries included).
+#
+#   python benchmarks/bench_order_flow.py --orders 200 --concurrency 8 --latency-ms 150 --error-rate 0.05
+#   python benchmarks/bench_order_flow.py --orders 200 --concurrency 16 --rate-limit 5 --report flow.json
+
+APP = os.path.join(ROOT, "app.py")
+ITEMS = ["Gulab Jamun", "Ras Malai", "Jalebi", "Ladoo", "Barfi"]
+STAGES = ("end_to_end", "validation", "persistence", "notification")
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] if ordered else 0.0
+
+
+def summarize(samples):
+    return {"p50_ms": round(percentile(samples, 50), 2), "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "mean_ms": round(sum(samples) / len(samples), 2) if samples else 0.0, "count": len(samples)}
+
+
+def place_order(n):
+    # One new session: open "Place Order", fill the form, time the submit rerun
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(n)
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    at.sidebar.radio[0].set_value("Place Order").run()
+    for item in rng.sample(ITEMS, rng.randint(1, 3)):
+        at.number_input(key=item).set_value(rng.randint(1, 10))
+    at.text_input[0].input(f"Customer {n}")
+    at.text_input[1].input(f"+9198{n:08d}")
+    at.text_area[0].input(f"House {n}, Waveside Beach Road")
+    at.text_area[1].input("urgent, party tonight" if n % 20 == 0 else "")
+    submit = next(b for b in at.button if b.label == "Order Now")
+    start = time.perf_counter()
+    submit.click().run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    timings = dict(at.session_state["order_timings"])
+    timings["end_to_end_ms"] = elapsed
+    return timings
+
+
+def wait_for_outbox(outbox, sms_ids, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        statuses = outbox.statuses(sms_ids)
+        if all(s["status"] in ("sent", "failed") for s in statuses) or time.monotonic() > deadline:
+            return statuses
+        time.sleep(0.1)
+
+
+def run_worker(job):
+    # One concurrent stream: warm up, place its orders one session after
+    # another, then wait for its SMS outbox to drain
+    workdir, env, numbers, drain_timeout = job
+    os.chdir(workdir)  # orders.log, orders.idx and sms_outbox.db are relative to the working directory
+    os.environ.update(env)
+    place_order(-1 - numbers[0])  # imports, cached resources, first log/index writes
+    started = time.time()
+    results = [place_order(n) for n in numbers]
+    finished = time.time()
+    outbox = SmsQueue(env["TWILIO_ACCOUNT_SID"], env["TWILIO_AUTH_TOKEN"], env["TWILIO_PHONE_NUMBER"])
+    drain_start = time.perf_counter()
+    statuses = wait_for_outbox(outbox, [r["sms_id"] for r in results if r["sms_id"]], drain_timeout)
+    return results, statuses, started, finished, time.perf_counter() - drain_start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fake API sends per second (0: no limit)")
+    parser.add_argument("--digest", action="store_true", help="run app.py with SMS_DIGEST_MODE=on")
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--report", help="write the results as JSON")
+    args = parser.parse_args()
+
+    server = start_fake_twilio(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                               rate_limit=args.rate_limit, seed=1)
+    env = {"TWILIO_ACCOUNT_SID": "ACbench", "TWILIO_AUTH_TOKEN": "token", "TWILIO_PHONE_NUMBER": "+15550000000",
+           "YOUR_PHONE_NUMBER": "+15551111111", "TWILIO_API_BASE": server.base_url,
+           "SMS_DIGEST_MODE": "on" if args.digest else "off"}
+    tmp = tempfile.TemporaryDirectory()
+    env["CATALOG_PATH"] = os.path.join(tmp.name, "catalog.json")
+    with open(env["CATALOG_PATH"], "w") as f:
+        json.dump({"sweets": {"unit": "piece", "items": [{"name": item, "price": 50} for item in ITEMS]}}, f)
+    jobs = []
+    for w in range(args.concurrency):
+        workdir = os.path.join(tmp.name, f"worker{w}")
+        os.mkdir(workdir)
+        jobs.append((workdir, env, list(range(w, args.orders, args.concurrency)), args.drain_timeout))
+
+    with multiprocessing.get_context("spawn").Pool(args.concurrency) as pool:
+        outcomes = pool.map(run_worker, jobs)
+    results = [r for worker in outcomes for r in worker[0]]
+    statuses = [s for worker in outcomes for s in worker[1]]
+    wall = max(o[3] for o in outcomes) - min(o[2] for o in outcomes)
+    drain = max(o[4] for o in outcomes)
+    sms_ids = [r["sms_id"] for r in results if r["sms_id"]]
+    delivered = [(s["updated_at"] - s["created_at"]) * 1000 for s in statuses if s["status"] == "sent"]
+
+    report = {
+        "config": vars(args),
+        "orders": len(results),
+        "throughput_orders_per_s": round(len(results) / wall, 2),
+        "stages": {stage: summarize([r[f"{stage}_ms"] for r in results]) for stage in STAGES},
+        "delivery": summarize(delivered),
+        "sms": {
+            "messages": len(sms_ids),
+            "outcomes": {status: sum(1 for s in statuses if s["status"] == status)
+                         for status in ("sent", "failed", "queued", "sending")},
+            "attempts": sum(s["attempts"] for s in statuses),
+            "drain_seconds": round(drain, 2),
+            "fake_api": dict(server.stats),
+        },
+    }
+    server.shutdown()
+
+    print(f"{report['orders']} orders at concurrency {args.concurrency}: "
+          f"{report['throughput_orders_per_s']} orders/s")
+    print(f"{'stage':<14} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9}")
+    for stage, s in list(report["stages"].items()) + [("delivery", report["delivery"])]:
+        print(f"{stage:<14} {s['p50_ms']:7.1f}ms {s['p95_ms']:7.1f}ms {s['p99_ms']:7.1f}ms {s['mean_ms']:7.1f}ms")
+    sms = report["sms"]
+    print(f"sms: {sms['messages']} messages, {sms['outcomes']}, {sms['attempts']} attempts, "
+          f"fake API {sms['fake_api']}, drained in {sms['drain_seconds']}s")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    tmp.cleanup()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_store import OrderStore, OrderWriter  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Concurrent order persistence stress test
+# --------------------------------------------------------------------------------
+# Hammers the order log from many threads, once with a per-order fsync'd append
+# and once through the group-commit OrderWriter, then checks that every
+# acknowledged order is in the log exactly once, every line parses and the index
+# agrees with the log. Exits non-zero if any check fails.
+#
+#   python benchmarks/bench_order_writer.py --threads 32 --orders 50
+
+
+def make_record(thread_no, i):
+    return {"name": f"Customer {thread_no}", "phone": f"+91{thread_no:05d}{i:05d}",
+            "address": "Waveside Beach Road\nFlat " + str(i), "special_notes": "x" * (i % 200),
+            "items": [{"name": "Jalebi", "qty": 1 + i % 5, "price": 40}], "total": 40 * (1 + i % 5)}
+
+
+def hammer(submit, threads, per_thread):
+    acked = [[] for _ in range(threads)]
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(per_thread):
+                acked[n].append(submit(make_record(n, i)))
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return [oid for ids in acked for oid in ids], errors, elapsed
+
+
+def verify(store, acked):
+    problems = []
+    seen = []
+    with open(store.log_path, "rb") as f:
+        for n, line in enumerate(f, 1):
+            try:
+                seen.append(json.loads(line)["order_id"])
+            except ValueError:
+                problems.append(f"line {n} is torn or interleaved")
+    if len(seen) != len(set(seen)):
+        problems.append("duplicate orders in log")
+    missing = set(acked) - set(seen)
+    if missing:
+        problems.append(f"{len(missing)} acknowledged orders missing from log")
+    if store.count() != len(seen):
+        problems.append(f"index has {store.count()} orders, log has {len(seen)}")
+    for order_id in acked[:: max(1, len(acked) // 100)]:
+        if not store.get(order_id):
+            problems.append(f"index lookup failed for {order_id}")
+            break
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--orders", type=int, default=50, help="orders per thread")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("per-order append", "group commit"):
+            store = OrderStore(os.path.join(tmp, f"{label[0]}.log"), os.path.join(tmp, f"{label[0]}.idx"))
+            writer = OrderWriter(store) if label == "group commit" else None
+            acked, errors, elapsed = hammer(writer.submit if writer else store.append, args.threads, args.orders)
+            if writer:
+                writer.close()
+            problems = [str(e) for e in errors] + verify(store, acked)
+            print(f"{label:<17} orders={len(acked):<6} {len(acked) / elapsed:8.0f} orders/s  "
+                  f"{'OK' if not problems else 'FAILED: ' + '; '.join(problems)}")
+            failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
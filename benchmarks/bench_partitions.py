@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# --------------------------------------------------------------------------------
+# Hot table + monthly archive: same answers, less to read
+# --------------------------------------------------------------------------------
+# Seeds --users x --transactions over --years into a fresh database, records
+# what every read path returns (the whole history page by page in both
+# directions, the CSV export, searches, the rollup check), archives everything
+# before the last EXPENSE_HOT_MONTHS months and reads it all again. The answers
+# must be identical, and the dashboard's first history page must not touch the
+# archive. Reports timings and file sizes before and after. Exits non-zero if
+# anything differs.
+#
+#   python benchmarks/bench_partitions.py --users 2 --transactions 50000 --years 5
+
+END_DATE = date(2026, 6, 15)
+SEARCHES = [("kfc meal", None, None), ('"monthly rent"', None, None), ("amaz*", "2025-01-01", "2025-03-31"),
+            ("uber ride", "2026-05-01", None)]
+
+
+def timed(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def walk_pages(expense_db, username):
+    # Every page from newest to oldest, then back up to the newest
+    pages, cursor = [], None
+    while True:
+        df, has_older, _ = expense_db.get_transactions_page(username, after=cursor)
+        pages.append(df.values.tolist())
+        if not has_older:
+            break
+        cursor = (df["date"].iloc[-1], int(df["id"].iloc[-1]))
+    back = [pages[-1]]
+    while True:
+        first = back[-1][0]
+        df, _, has_newer = expense_db.get_transactions_page(username, before=(first[1], first[0]))
+        back.append(df.values.tolist())
+        if not has_newer:
+            break
+    return pages, back[::-1]
+
+
+def snapshot(expense_db, username):
+    with expense_db.get_backend().connection() as conn:
+        diffs = expense_db.check_rollups(conn)
+    # Every match, compared as a set: each archived month is ranked against its
+    # own rows, so scores (and the order) change when rows move to the archive
+    searches = [sorted(expense_db.search_transactions(username, q, start=s, end=e, limit=10 ** 9).values.tolist())
+                for q, s, e in SEARCHES]
+    return {
+        "pages": walk_pages(expense_db, username),
+        "export": b"".join(expense_db.iter_transactions_csv(username)),
+        "export_2025": b"".join(expense_db.iter_transactions_csv(username, start="2025-01-01", end="2025-12-31")),
+        "searches": searches,
+        "rollup_diffs": diffs,
+    }
+
+
+def timings(expense_db, username):
+    deep = (f"{END_DATE.year - 2}-01-01", 0)
+    return {
+        "first page": timed(lambda: expense_db.get_transactions_page(username))[1],
+        "page 2 years back": timed(lambda: expense_db.get_transactions_page(username, after=deep))[1],
+        "search (all time)": timed(lambda: expense_db.search_transactions(username, "kfc meal"))[1],
+        "CSV export (all)": timed(lambda: b"".join(expense_db.iter_transactions_csv(username)), 3)[1],
+    }
+
+
+def db_size(expense_db):
+    # Main database file size, WAL checkpointed first
+    with expense_db.get_backend().connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(expense_db.DB_NAME)
+
+
+def statements_for(expense_db, fn):
+    # SQL run by fn() on the pooled connection it checks out (the pool is LIFO)
+    statements = []
+    with expense_db.get_backend().connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        with expense_db.get_backend().connection() as conn:
+            conn.set_trace_callback(None)
+    return statements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2)
+    parser.add_argument("--transactions", type=int, default=20000, help="per user")
+    parser.add_argument("--years", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["EXPENSE_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+    os.environ["EXPENSE_ARCHIVE_PATH"] = os.path.join(tmp.name, "bench-archive.db")
+    os.environ["BUDGET_ALERT_SMS"] = "off"
+    import expense_db  # noqa: E402
+    from benchmarks import seed_data  # noqa: E402
+
+    start = time.perf_counter()
+    seed_data.seed(args.users, args.transactions, years=args.years, end_date=END_DATE)
+    print(f"seeded {args.users} x {args.transactions} transactions over {args.years} years "
+          f"in {time.perf_counter() - start:.1f}s")
+    username = seed_data.username_for(0)
+
+    before = snapshot(expense_db, username)
+    before_ms = timings(expense_db, username)
+    main_size = db_size(expense_db)
+
+    start = time.perf_counter()
+    moved = expense_db.archive_transactions(expense_db.hot_window_start(END_DATE))
+    with expense_db.get_backend().connection() as conn:
+        expense_db.optimize_search_index(conn)
+        conn.execute("VACUUM")
+        hot_rows = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    print(f"archived {sum(moved.values())} rows into {len(moved)} months in {time.perf_counter() - start:.1f}s; "
+          f"{hot_rows} rows stay hot")
+
+    after = snapshot(expense_db, username)
+    after_ms = timings(expense_db, username)
+    first_page_sql = statements_for(expense_db, lambda: expense_db.get_transactions_page(username))
+
+    print(f"{'':<20} {'before':>10} {'after':>10}")
+    for name in before_ms:
+        print(f"{name:<20} {before_ms[name]:8.2f}ms {after_ms[name]:8.2f}ms")
+    print(f"{'main db':<20} {main_size / 1e6:8.1f}MB {db_size(expense_db) / 1e6:8.1f}MB "
+          f"(archive {os.path.getsize(expense_db.ARCHIVE_PATH) / 1e6:.1f}MB)")
+
+    failures = [f"{key} differs after archiving" for key in before if before[key] != after[key]]
+    if before["rollup_diffs"]:
+        failures.append(f"{len(before['rollup_diffs'])} rollup rows differ")
+    if not first_page_sql or any("archive." in sql for sql in first_page_sql):
+        failures.append("the first history page read the archive")
+    if not moved:
+        failures.append("nothing was archived")
+    tmp.cleanup()
+    for line in failures:
+        print(f"FAIL {line}")
+    sys.exit(1 if failures else 0)
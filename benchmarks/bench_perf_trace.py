@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perf_trace import Tracer  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Cost of perf_trace spans per call, tracing off vs on
+# --------------------------------------------------------------------------------
+# A traced no-op function and a `with span()` block, against the bare call.
+# With tracing off both should add well under a microsecond, so the spans can
+# stay in the DB helpers and pages permanently.
+#
+#   python benchmarks/bench_perf_trace.py --calls 1000000
+
+
+def noop():
+    return None
+
+
+def per_call_ns(stmt, calls, namespace):
+    return min(timeit.repeat(stmt, number=calls, repeat=5, globals=namespace)) / calls * 1e9
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000000)
+    args = parser.parse_args()
+
+    bare = per_call_ns("noop()", args.calls, {"noop": noop})
+    print(f"bare call              : {bare:7.1f} ns")
+    for enabled in (False, True):
+        tracer = Tracer(enabled=enabled)
+        namespace = {"traced_noop": tracer.traced("noop")(noop), "span": tracer.span, "noop": noop}
+        decorated = per_call_ns("traced_noop()", args.calls, namespace)
+        block = per_call_ns("with span('noop'): noop()", args.calls, namespace)
+        state = "on " if enabled else "off"
+        print(f"tracing {state}: @traced     : {decorated:7.1f} ns  (+{decorated - bare:.1f})")
+        print(f"tracing {state}: with span() : {block:7.1f} ns  (+{block - bare:.1f})")
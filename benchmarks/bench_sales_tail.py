@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sales_tail import SalesTail  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Sales dashboard refresh cost as the order log grows
+# --------------------------------------------------------------------------------
+# Grows an order log (records in the order_store format) to each --sizes total,
+# keeping one SalesTail that follows it. At each size another --append orders
+# are written and the time of one refresh() is measured. The same figures are
+# then computed the old way, by reading the whole log into a fresh SalesTail in
+# one pass, and both snapshots must agree.
+#
+#   python benchmarks/bench_sales_tail.py --sizes 10000 100000 1000000 --append 50
+
+MENU = {"Gulab Jamun": 50, "Ras Malai": 60, "Jalebi": 40, "Ladoo": 30, "Barfi": 70}
+
+
+def write_orders(path, start, count, rng):
+    first = datetime(2026, 1, 1, 9, 0)
+    lines = []
+    for n in range(start, start + count):
+        timestamp = (first + timedelta(seconds=20 * n)).strftime("%Y-%m-%d %H:%M:%S")
+        items = [{"name": item, "qty": rng.randint(1, 5), "price": MENU[item]}
+                 for item in rng.sample(list(MENU), rng.randint(1, 3))]
+        customer = rng.randrange(5000)
+        lines.append(json.dumps({
+            "order_id": f"{n:012d}", "timestamp": timestamp, "name": f"Customer {customer}",
+            "phone": f"+9198{customer:08d}", "address": f"House {customer}, Waveside Beach Road",
+            "special_notes": "", "items": items, "total": sum(i["qty"] * i["price"] for i in items),
+        }) + "\n")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--append", type=int, default=50, help="orders added before each timed refresh")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "orders.log")
+        tail = SalesTail(path)
+        written = 0
+        print(f"{'orders':>9} {'log MB':>8} {'refresh':>10} {'full read':>10}")
+        for size in sorted(args.sizes):
+            write_orders(path, written, size - args.append - written, rng)
+            written = size - args.append
+            while tail.refresh(MENU):
+                pass  # catch up to this size (not timed)
+            write_orders(path, written, args.append, rng)
+            written = size
+
+            start = time.perf_counter()
+            added = tail.refresh(MENU)
+            refresh_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            full = SalesTail(path)
+            while full.refresh(MENU):
+                pass
+            full_ms = (time.perf_counter() - start) * 1000
+
+            now = datetime(2026, 1, 1, 9, 0) + timedelta(seconds=20 * size)
+            if added != args.append or tail.snapshot(MENU, now=now) != full.snapshot(MENU, now=now):
+                failures.append(f"{size} orders: incremental figures differ from a full read")
+            print(f"{size:9d} {os.path.getsize(path) / 1e6:8.1f} {refresh_ms:8.2f}ms {full_ms:8.0f}ms")
+    for line in failures:
+        print(f"FAIL {line}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sms_digest import OrderDigest  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# One-SMS-per-order vs digest mode
+# --------------------------------------------------------------------------------
+# Simulates an order burst against a sender with fixed API latency and a small
+# worker pool (like sms_queue.SmsQueue) and reports API calls and the delay from
+# order placement until its notification has been delivered.
+#
+#   python benchmarks/bench_sms_digest.py --orders 200 --latency 0.05
+
+PRICES = {"Gulab Jamun": 50, "Ras Malai": 60, "Jalebi": 40, "Ladoo": 30, "Barfi": 70}
+
+
+def calculate_total(order):
+    return sum(PRICES[item] * qty for item, qty in order.items() if qty > 0)
+
+
+def make_orders(n, seed):
+    rng = random.Random(seed)
+    orders = []
+    for i in range(n):
+        items = {item: rng.randint(1, 3) for item in rng.sample(sorted(PRICES), rng.randint(1, 3))}
+        notes = "nut allergy" if rng.random() < 0.05 else ""
+        orders.append({"timestamp": "2026-01-01 12:00:00", "name": f"Customer {i}", "phone": f"+9190000{i:05d}",
+                       "items": items, "total": calculate_total(items), "special_notes": notes})
+    return orders
+
+
+class SimulatedApi:
+    def __init__(self, latency, workers):
+        self.latency = latency
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.calls = 0
+        self.delays = []
+        self.lock = threading.Lock()
+
+    def send(self, orders):
+        self.pool.submit(self._deliver, [o["_placed_at"] for o in orders])
+        return True
+
+    def _deliver(self, placed):
+        time.sleep(self.latency)
+        done = time.perf_counter()
+        with self.lock:
+            self.calls += 1
+            self.delays.extend(done - p for p in placed)
+
+    def wait(self):
+        self.pool.shutdown(wait=True)
+
+
+def run(orders, interarrival, api, digest=None):
+    for order in orders:
+        order = dict(order, _placed_at=time.perf_counter())
+        if digest:
+            digest.add(order)
+        else:
+            api.send([order])
+        time.sleep(interarrival)
+    if digest:
+        digest.close()
+    api.wait()
+
+
+def report(label, api):
+    d = sorted(api.delays)
+    p95 = d[int(len(d) * 0.95) - 1] if d else 0.0
+    print(f"{label:<22} api_calls={api.calls:<5} delay_mean={statistics.mean(d):.3f}s "
+          f"delay_p95={p95:.3f}s delay_max={d[-1]:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--interarrival", type=float, default=0.005, help="seconds between orders")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated API round trip")
+    parser.add_argument("--workers", type=int, default=2, help="sender worker threads")
+    parser.add_argument("--window", type=float, default=0.25, help="digest window in seconds")
+    parser.add_argument("--max-orders", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders, args.seed)
+
+    api = SimulatedApi(args.latency, args.workers)
+    run(orders, args.interarrival, api)
+    report("one SMS per order", api)
+
+    api = SimulatedApi(args.latency, args.workers)
+    digest = OrderDigest(lambda body, batch: api.send(batch), calculate_total,
+                         window_seconds=args.window, max_orders=args.max_orders)
+    run(orders, args.interarrival, api, digest)
+    report("digest mode", api)
@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sms_compact import compact_order_sms, segment_count  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# SMS segments per order: app.py's full summary vs sms_compact
+# --------------------------------------------------------------------------------
+# A fixed corpus of orders (same --seed, same corpus) mixing what customers type:
+# short and long addresses, empty and chatty notes, curly quotes and dashes
+# from phone keyboards, accented and Devanagari names, emoji. Each order is
+# written the way app.py used to send it ("New Order from ...\n" + summary, with
+# ₹) and compacted for 1 and 2 segment budgets. Reports encoding share and
+# segments per order; --show prints a few messages side by side.
+#
+#   python benchmarks/bench_sms_segments.py --orders 1000
+#   python benchmarks/bench_sms_segments.py --orders 20 --show 5
+
+MENU = {"Gulab Jamun": 50, "Ras Malai": 60, "Jalebi": 40, "Ladoo": 30, "Barfi": 70}
+
+NAMES = ["Priya Sharma", "Rahul Verma", "Anjali Nair", "Mohammed Irfan", "Sneha Kulkarni", "José D’Souza",
+         "Zoë Fernandes", "Venkata Subramanian Ramakrishnan", "प्रिया शर्मा", "राहुल"]
+STREETS = ["Waveside Beach Road", "MG Road", "Linking Road, Bandra West", "Sector 14, Near City Mall",
+           "Behind Shree Ganesh Temple, Old Market Lane", "गांधी नगर"]
+NOTES = ["", "", "", "Please ring the bell twice", "No nuts – my son is allergic!",
+         "Deliver after 6 pm, office hours “strict”", "Extra syrup please 😊", "Birthday party, pack nicely 🎉🎂",
+         "Call on arrival — gate is locked. Leave with the security guard if nobody answers.",
+         "Less sugar for the diabetic uncle; separate box please"]
+
+
+def make_corpus(n, seed):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, 9, 0)
+    corpus = []
+    for i in range(n):
+        timestamp = (start + timedelta(minutes=17 * i)).strftime("%Y-%m-%d %H:%M:%S")
+        items = {item: rng.randint(1, 10) for item in rng.sample(list(MENU), rng.randint(1, 4))}
+        corpus.append({
+            "order_id": f"{timestamp[2:].replace('-', '').replace(' ', '').replace(':', '')}-{rng.getrandbits(40):010x}",
+            "timestamp": timestamp,
+            "name": rng.choice(NAMES),
+            "phone": f"+91 9{rng.randrange(10 ** 8, 10 ** 9)}",
+            "address": f"{rng.choice(['Flat', 'House', 'Shop'])} {rng.randint(1, 999)}, "
+                       + ", ".join(rng.sample(STREETS, rng.randint(1, 3))) + f", Mumbai {rng.randint(400001, 400104)}",
+            "notes": rng.choice(NOTES),
+            "items": items,
+            "total": sum(MENU[item] * qty for item, qty in items.items()),
+        })
+    return corpus
+
+
+def full_message(order):
+    # The body app.py sent before sms_compact (SMS_COMPACT=off)
+    order_items = "\n".join(f"- {item}: {qty} pcs" for item, qty in order["items"].items())
+    summary = (f"[{order['timestamp']}]\nOrder ID: {order['order_id']}\nName: {order['name']}\nPhone: {order['phone']}\n"
+               f"Address: {order['address']}\nSpecial Notes: {order['notes']}\nOrder:\n{order_items}\n"
+               f"Total: ₹{order['total']}\n\n")
+    return f"New Order from Sweet Waveside SK Shop:\n{summary}"
+
+
+def compact_message(order, max_segments):
+    return compact_order_sms(order["order_id"], order["name"], order["phone"], order["address"], order["notes"],
+                             order["items"], order["total"], MENU, max_segments)
+
+
+def describe(label, messages):
+    counts = [segment_count(m) for m in messages]
+    segments = [c[1] for c in counts]
+    gsm = sum(1 for c in counts if c[0] == "GSM-7") / len(counts)
+    print(f"{label:<20} {gsm:7.0%} {statistics.mean(segments):8.2f} {max(segments):5d} {sum(segments):8d}")
+    return sum(segments)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--show", type=int, default=0, help="print this many example messages")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.orders, args.seed)
+    print(f"{args.orders} orders")
+    print(f"{'message':<20} {'GSM-7':>7} {'mean seg':>8} {'max':>5} {'segments':>8}")
+    before = describe("full summary (₹)", [full_message(o) for o in corpus])
+    for budget in (1, 2):
+        after = describe(f"compact, {budget} segment{'s' if budget > 1 else ''}",
+                         [compact_message(o, budget) for o in corpus])
+        print(f"{'':<20} {1 - after / before:.0%} fewer segments")
+
+    for order in corpus[:args.show]:
+        print("\n--- full:", segment_count(full_message(order)))
+        print(full_message(order).rstrip())
+        print("--- compact:", segment_count(compact_message(order, 1)))
+        print(compact_message(order, 1))
@@ -0,0 +1,148 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# --------------------------------------------------------------------------------
+# Parquet snapshot vs CSV export
+# --------------------------------------------------------------------------------
+# Seeds --users x --transactions over --years, then for one user and for every
+# user writes the CSV export (plain and gzip'd) and the Parquet snapshot and
+# compares file size, export time and load time: the whole file, and what the
+# Analytics tab reads (date, category and amount for the last --since-days).
+# CSV has no projection or date pushdown, so it is parsed whole and filtered.
+#
+# Checks that the snapshot holds the same rows (count, amounts, categories)
+# and that snapshot analytics match the rollup-based ones. Exits non-zero if
+# anything differs.
+#
+#   python benchmarks/bench_snapshot.py --users 5 --transactions 200000 --years 5
+
+END_DATE = date(2026, 6, 15)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def write_csv(expense_db, usernames, path, compress):
+    # Every user's CSV export, one after another (header once), gzip'd as the
+    # app's export does
+    gzipper = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    with open(path, "wb") as f:
+        for i, username in enumerate(usernames):
+            for n, chunk in enumerate(expense_db.iter_transactions_csv(username)):
+                if i and not n:
+                    chunk = chunk.split(b"\n", 1)[1]
+                f.write(gzipper.compress(chunk) if gzipper else chunk)
+        if gzipper:
+            f.write(gzipper.flush())
+
+
+def compare(label, expense_db, expense_snapshot, usernames, tmp, since):
+    import pandas as pd
+    csv_path = os.path.join(tmp, f"{label}.csv")
+    gz_path = os.path.join(tmp, f"{label}.csv.gz")
+    parquet_path = os.path.join(tmp, f"{label}.parquet")
+    username = usernames[0] if len(usernames) == 1 else None
+
+    results = {
+        "export": {
+            "csv": timed(lambda: write_csv(expense_db, usernames, csv_path, False), 1)[1],
+            "csv.gz": timed(lambda: write_csv(expense_db, usernames, gz_path, True), 1)[1],
+            "parquet": timed(lambda: expense_snapshot.write_snapshot(username, parquet_path), 1)[1],
+        },
+        "size": {
+            "csv": os.path.getsize(csv_path),
+            "csv.gz": os.path.getsize(gz_path),
+            "parquet": os.path.getsize(parquet_path),
+        },
+    }
+    csv_df, csv_ms = timed(lambda: pd.read_csv(csv_path))
+    parquet_df, parquet_ms = timed(lambda: expense_snapshot.read_snapshot(parquet_path))
+    results["load all"] = {"csv": csv_ms, "csv.gz": timed(lambda: pd.read_csv(gz_path))[1], "parquet": parquet_ms}
+
+    def csv_recent(path):
+        df = pd.read_csv(path, usecols=["date", "category", "amount"])
+        return df[df["date"] >= since]
+    csv_recent_df, csv_recent_ms = timed(lambda: csv_recent(csv_path))
+    parquet_recent_df, parquet_recent_ms = timed(lambda: expense_snapshot.read_snapshot(
+        parquet_path, columns=["date", "category", "amount"], start=since))
+    results["load recent"] = {"csv": csv_recent_ms, "csv.gz": timed(lambda: csv_recent(gz_path))[1],
+                              "parquet": parquet_recent_ms}
+
+    problems = []
+    if len(csv_df) != len(parquet_df) or len(csv_recent_df) != len(parquet_recent_df):
+        problems.append(f"{label}: row counts differ ({len(csv_df)} vs {len(parquet_df)}, "
+                        f"recent {len(csv_recent_df)} vs {len(parquet_recent_df)})")
+    if abs(csv_df["amount"].sum() - parquet_df["amount"].sum()) > 1e-6 * max(1.0, abs(csv_df["amount"].sum())):
+        problems.append(f"{label}: amounts differ")
+    if csv_df["category"].value_counts().to_dict() != parquet_df["category"].astype(str).value_counts().to_dict():
+        problems.append(f"{label}: categories differ")
+    if str(parquet_df["category"].dtype) != "category" or str(parquet_df["date"].dtype).split("[")[0] != "datetime64":
+        problems.append(f"{label}: snapshot types not kept ({dict(parquet_df.dtypes.astype(str))})")
+    return results, problems
+
+
+def analytics_match(expense_analytics, expense_snapshot, username, tmp):
+    # Snapshot analytics == rollup analytics for the whole history
+    path = os.path.join(tmp, "analytics.parquet")
+    expense_snapshot.write_snapshot(username, path)
+    live = expense_analytics.SpendAnalytics(expense_analytics.get_daily_totals(username)).monthly_totals()
+    snap = expense_analytics.SpendAnalytics(expense_analytics.daily_from_snapshot(path)).monthly_totals()
+    live, snap = live.sort_index(axis=1), snap.sort_index(axis=1)
+    return live.shape == snap.shape and ((live - snap).abs().to_numpy().max(initial=0) < 1e-6)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--transactions", type=int, default=100000, help="per user")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--since-days", type=int, default=90, help="window read by the Analytics tab")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["EXPENSE_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+    os.environ["BUDGET_ALERT_SMS"] = "off"
+    import expense_analytics  # noqa: E402
+    import expense_db  # noqa: E402
+    import expense_snapshot  # noqa: E402
+    from benchmarks import seed_data  # noqa: E402
+
+    start = time.perf_counter()
+    seed_data.seed(args.users, args.transactions, years=args.years, end_date=END_DATE)
+    print(f"seeded {args.users} x {args.transactions} transactions over {args.years} years "
+          f"in {time.perf_counter() - start:.1f}s")
+    since = (END_DATE - timedelta(days=args.since_days)).isoformat()
+    users = [seed_data.username_for(i) for i in range(args.users)]
+
+    failures = []
+    for label, usernames in (("one user", users[:1]), ("all users", users)):
+        results, problems = compare(label.replace(" ", "_"), expense_db, expense_snapshot, usernames, tmp.name, since)
+        failures += problems
+        print(f"\n{label} ({len(usernames) * args.transactions} rows)")
+        print(f"{'':<22} {'csv':>10} {'csv.gz':>10} {'parquet':>10}")
+        for name, row in results.items():
+            if name == "size":
+                print(f"{'file size':<22} " + " ".join(f"{row[k] / 1e6:8.1f}MB" for k in ("csv", "csv.gz", "parquet")))
+            else:
+                title = f"load last {args.since_days} days" if name == "load recent" else name
+                print(f"{title:<22} " + " ".join(f"{row[k]:8.0f}ms" for k in ("csv", "csv.gz", "parquet")))
+    if not analytics_match(expense_analytics, expense_snapshot, users[0], tmp.name):
+        failures.append("snapshot analytics differ from the rollups")
+    tmp.cleanup()
+    for line in failures:
+        print(f"FAIL {line}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,144 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import Catalog, OutOfStock  # noqa: E402
+
+# --------------------------------------------------------------------------------
+# Stock reservation under contention
+# --------------------------------------------------------------------------------
+# --threads threads place orders against --instances Catalogs sharing one stock
+# database (as app.py and shop.py processes or replicas do) until the
+# contended item sells out. Each order wants 1-3 of it, and with --mixed also 1-3 of another
+# item. With --reload, another thread rewrites the catalog file (new prices,
+# same stock) every few milliseconds, so reloads happen during reservations.
+#
+# Checks that exactly the stock was sold, never more, and that every other
+# item's remaining count matches what its orders took, as seen by a Catalog
+# opened afresh afterwards (a restart). Reports orders/s and reserve() latency,
+# for one instance and for --instances. Exits non-zero if any check fails.
+#
+#   python benchmarks/bench_stock_contention.py --threads 64 --stock 20000 --mixed --reload --instances 4
+
+SECTION = "sweets"
+HOT = "Ras Malai"
+OTHERS = ["Gulab Jamun", "Jalebi", "Ladoo", "Barfi"]
+
+
+def write_catalog(path, stock, price_bump=0):
+    items = [{"name": HOT, "price": 60 + price_bump, "stock": stock}]
+    items += [{"name": name, "price": 40 + price_bump, "stock": stock} for name in OTHERS]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({SECTION: {"unit": "piece", "items": items}}, f)
+    os.replace(tmp_path, path)
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] if ordered else 0.0
+
+
+def run(path, stock_db, instances, args):
+    write_catalog(path, args.stock)
+    catalogs = [Catalog(path, check_interval=0.001 if args.reload else 1.0, stock_db=stock_db)
+                for _ in range(instances)]
+    barrier = threading.Barrier(args.threads + 1)
+    lock = threading.Lock()
+    taken = {name: 0 for name in [HOT] + OTHERS}
+    latencies, rejected = [], [0]
+    stop = threading.Event()
+
+    def buyer(seed):
+        rng = random.Random(seed)
+        catalog = catalogs[seed % instances]
+        mine, my_latencies, my_rejected = dict.fromkeys(taken, 0), [], 0
+        barrier.wait()
+        while catalog.remaining(SECTION)[HOT] > 0:
+            order = {HOT: rng.randint(1, 3)}
+            if args.mixed:
+                order[rng.choice(OTHERS)] = rng.randint(1, 3)
+            start = time.perf_counter()
+            try:
+                catalog.reserve(SECTION, order)
+            except OutOfStock:
+                my_rejected += 1
+                continue
+            finally:
+                my_latencies.append((time.perf_counter() - start) * 1e6)
+            for name, qty in order.items():
+                mine[name] += qty
+        with lock:
+            for name, qty in mine.items():
+                taken[name] += qty
+            latencies.extend(my_latencies)
+            rejected[0] += my_rejected
+
+    def reloader():
+        bump = 0
+        while not stop.wait(0.005):
+            bump += 1
+            write_catalog(path, args.stock, bump % 7)
+
+    threads = [threading.Thread(target=buyer, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    if args.reload:
+        threading.Thread(target=reloader, daemon=True).start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    remaining = Catalog(path, stock_db=stock_db).remaining(SECTION)
+    problems = []
+    if taken[HOT] != args.stock or remaining[HOT] != 0:
+        problems.append(f"{HOT}: sold {taken[HOT]} of {args.stock}, {remaining[HOT]} left")
+    for name in OTHERS:
+        if taken[name] + remaining[name] != args.stock:
+            problems.append(f"{name}: sold {taken[name]} + {remaining[name]} left != {args.stock}")
+    return {
+        "orders": len(latencies) - rejected[0],
+        "rejected": rejected[0],
+        "orders_per_s": (len(latencies) - rejected[0]) / elapsed,
+        "p50_us": percentile(latencies, 50),
+        "p99_us": percentile(latencies, 99),
+        "reloads": sum(catalog.reloads for catalog in catalogs),
+        "problems": problems,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=10000, help="units of each item")
+    parser.add_argument("--mixed", action="store_true", help="each order also takes another item")
+    parser.add_argument("--reload", action="store_true", help="rewrite the catalog file during the run")
+    parser.add_argument("--instances", type=int, default=4, help="Catalogs sharing the stock database")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.json")
+        print(f"{args.threads} threads, {args.stock} x {HOT}{', mixed orders' if args.mixed else ''}"
+              f"{', reloading' if args.reload else ''}")
+        print(f"{'catalogs':<12} {'orders':>8} {'rejected':>9} {'orders/s':>10} {'p50':>9} {'p99':>9} {'reloads':>8}")
+        for instances in (1, args.instances):
+            label = f"{instances} instance{'s' if instances != 1 else ''}"
+            r = run(path, os.path.join(tmp, f"stock-{instances}.db"), instances, args)
+            print(f"{label:<12} {r['orders']:8d} {r['rejected']:9d} {r['orders_per_s']:10.0f} "
+                  f"{r['p50_us']:7.1f}us {r['p99_us']:7.1f}us {r['reloads']:8d}")
+            failures += [f"{label}: {p}" for p in r["problems"]]
+    for line in failures:
+        print(f"FAIL {line}")
+    sys.exit(1 if failures else 0)
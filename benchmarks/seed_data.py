@@ -0,0 +1,99 @@
+import argparse
+import ast
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# --------------------------------------------------------------------------------
+# Deterministic synthetic data for the expense tracker
+# --------------------------------------------------------------------------------
+# N users x M transactions spread over MAIN_CATEGORIES (read from ex.py so the
+# two never drift). The same --seed and --end-date always give the same users,
+# profiles and transactions. Users are user00000, user00001, ... with password
+# "password"; users that already exist are left alone, so re-running tops up a
+# database instead of duplicating it.
+#
+#   python benchmarks/seed_data.py --users 100 --transactions 5000
+#   python benchmarks/seed_data.py --db /tmp/load.db --users 20 --transactions 100000
+
+PASSWORD = "password"
+BATCH_SIZE = 50000
+
+MERCHANTS = ["KFC", "Amazon", "Swiggy", "Zomato", "Uber", "Ola", "BigBasket", "Flipkart", "Netflix", "Apollo",
+             "Indian Oil", "Airtel", "Jio", "Myntra", "Dominos", "Starbucks", "IRCTC", "BookMyShow", "Decathlon"]
+ITEMS = ["meal", "purchase", "order", "ride", "groceries", "recharge", "subscription", "pharmacy", "fuel",
+         "tickets", "coffee", "pizza", "shoes", "books", "electricity bill", "monthly rent", "gym membership"]
+
+
+def main_categories():
+    # The MAIN_CATEGORIES literal from ex.py (importing ex.py would run the app)
+    with open(os.path.join(ROOT, "ex.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "MAIN_CATEGORIES" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("MAIN_CATEGORIES not found in ex.py")
+
+
+def username_for(i):
+    return f"user{i:05d}"
+
+
+def seed(users, transactions, seed=42, years=2, end_date=None):
+    # Writes through expense_db's public helpers (so rollups, alerts and the
+    # search index are maintained exactly as in the app). Returns the number
+    # of users created.
+    import expense_db
+    from expense_import import clean_category
+
+    expense_db.init_db()
+    categories = [clean_category(c) for c in main_categories()]
+    # A few categories dominate real spending
+    weights = [max(1, len(categories) - i) ** 2 for i in range(len(categories))]
+    end_date = end_date or date.today()
+    span = years * 365
+    created = 0
+    for i in range(users):
+        rng = random.Random(f"{seed}-{i}")
+        username = username_for(i)
+        if not expense_db.register_user_db(username, PASSWORD, f"Load User {i}", f"{username}@example.com",
+                                           f"+9190000{i:05d}", rng.choice(["₹ INR", "$ USD"]),
+                                           rng.randrange(10000, 100000, 500)):
+            continue
+        income = rng.randrange(20000, 200000, 1000)
+        expense_db.save_profile_db((username, rng.choice(["Student", "Engineer", "Teacher", "Freelancer"]),
+                                    income, income, income * rng.uniform(0.4, 0.8), income * 0.2,
+                                    rng.randrange(0, 500000, 1000), rng.randrange(0, 200000, 1000), 0))
+        for start in range(0, transactions, BATCH_SIZE):
+            batch = []
+            for _ in range(start, min(transactions, start + BATCH_SIZE)):
+                category = rng.choices(categories, weights)[0]
+                day = end_date - timedelta(days=int(rng.random() ** 1.5 * span))  # denser recently
+                batch.append((f"{rng.choice(MERCHANTS)} {rng.choice(ITEMS)}", round(rng.lognormvariate(5.5, 1.0), 2),
+                              category, day.isoformat()))
+            expense_db.add_expenses_bulk(username, batch)
+        created += 1
+    return created
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate the expense tracker database with synthetic users")
+    parser.add_argument("--db", help="SQLite file (default: EXPENSE_DB_PATH or expense_tracker_final.db)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transactions", type=int, default=2000, help="per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--end-date", type=date.fromisoformat, help="latest transaction date (default: today)")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["EXPENSE_DB_PATH"] = args.db
+    start = time.perf_counter()
+    created = seed(args.users, args.transactions, args.seed, args.years, args.end_date)
+    print(f"{created} users created ({args.users - created} already existed), "
+          f"{created * args.transactions} transactions in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,149 @@
+import threading
+from datetime import datetime
+
+# --------------------------------------------------------------------------------
+# BUDGET THRESHOLD ALERTS
+# --------------------------------------------------------------------------------
+# Evaluated only when a write changes a user's spend or limit (add_expense_db,
+# add_expenses_bulk, update_profile_db, save_profile_db), inside that write's
+# transaction. The result is stored in budget_status (what the notification bar
+# renders) and each threshold crossing is recorded in budget_events. New events
+# are handed to the registered notifiers (e.g. SMS) after the transaction
+# commits.
+#
+# Spend is month-to-date: the spend_rollups of the current month (by expense
+# date), compared with the monthly spendable limit. Events are recorded once per
+# (period, level), so each level alerts at most once a month; a write in a new
+# month starts from that month's spend, and get_budget_status() re-evaluates a
+# status left over from an earlier month.
+
+THRESHOLDS = (50, 75, 90)
+
+BUDGET_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS budget_status
+       (username TEXT PRIMARY KEY, period TEXT, level INTEGER, spent {real}, spend_limit {real}, updated_at TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS budget_events
+       (id {autoincrement_pk}, username TEXT, period TEXT, level INTEGER, spent {real},
+        spend_limit {real}, created_at TEXT, notified INTEGER DEFAULT 0, UNIQUE (username, period, level))''',
+]
+
+# Migration 7: budget_events unique per (username, level, spend_limit) instead of
+# per month (when spend was all-time). The earliest event of each key is kept;
+# ids are reassigned
+EVENTS_BY_LIMIT_SCHEMA = [
+    '''CREATE TABLE budget_events_by_limit
+       (id {autoincrement_pk}, username TEXT, period TEXT, level INTEGER, spent {real},
+        spend_limit {real}, created_at TEXT, notified INTEGER DEFAULT 0, UNIQUE (username, level, spend_limit))''',
+    '''INSERT INTO budget_events_by_limit (username, period, level, spent, spend_limit, created_at, notified)
+       SELECT username, period, level, spent, spend_limit, created_at, notified FROM budget_events
+       WHERE id IN (SELECT MIN(id) FROM budget_events GROUP BY username, level, spend_limit) ORDER BY id''',
+    'DROP TABLE budget_events',
+    'ALTER TABLE budget_events_by_limit RENAME TO budget_events',
+]
+
+# Migration 8: back to once per (username, period, level), with spend
+# month-to-date
+EVENTS_BY_PERIOD_SCHEMA = [
+    '''CREATE TABLE budget_events_by_period
+       (id {autoincrement_pk}, username TEXT, period TEXT, level INTEGER, spent {real},
+        spend_limit {real}, created_at TEXT, notified INTEGER DEFAULT 0, UNIQUE (username, period, level))''',
+    '''INSERT INTO budget_events_by_period (username, period, level, spent, spend_limit, created_at, notified)
+       SELECT username, period, level, spent, spend_limit, created_at, notified FROM budget_events
+       WHERE id IN (SELECT MIN(id) FROM budget_events GROUP BY username, period, level) ORDER BY id''',
+    'DROP TABLE budget_events',
+    'ALTER TABLE budget_events_by_period RENAME TO budget_events',
+]
+
+_notifiers = []
+_notifiers_lock = threading.Lock()
+
+
+def current_period():
+    return datetime.now().strftime("%Y-%m")
+
+
+def level_for(spent, spend_limit):
+    if not spend_limit or spend_limit <= 0:
+        return 0
+    percent = spent / spend_limit * 100
+    return max((t for t in THRESHOLDS if percent >= t), default=0)
+
+
+def evaluate(conn, username):
+    # Recomputes the user's level on `conn` (inside the caller's transaction).
+    # Returns the newly crossed events as dicts.
+    period = current_period()
+    row = conn.execute('''SELECT p.spendable, u.phone,
+                                 (SELECT COALESCE(SUM(total), 0) FROM spend_rollups r
+                                  WHERE r.username = p.username AND r.month = ?)
+                          FROM profiles p LEFT JOIN users u ON u.username = p.username
+                          WHERE p.username = ?''', (period, username)).fetchone()
+    if row is None:
+        return []
+    spend_limit, phone, spent = row
+    level = level_for(spent, spend_limit)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute('''INSERT INTO budget_status VALUES (?,?,?,?,?,?)
+                    ON CONFLICT (username) DO UPDATE SET period = excluded.period, level = excluded.level,
+                        spent = excluded.spent, spend_limit = excluded.spend_limit, updated_at = excluded.updated_at''',
+                 (username, period, level, spent, spend_limit, now))
+    events = []
+    for threshold in THRESHOLDS:
+        if threshold > level:
+            break
+        cur = conn.execute('INSERT INTO budget_events (username, period, level, spent, spend_limit, created_at) '
+                           'VALUES (?,?,?,?,?,?) ON CONFLICT (username, period, level) DO NOTHING',
+                           (username, period, threshold, spent, spend_limit, now))
+        if cur.rowcount == 1:
+            # lastrowid is SQLite-only; the unique key finds the row on any backend
+            event_id = conn.execute('SELECT id FROM budget_events WHERE username = ? AND period = ? AND level = ?',
+                                    (username, period, threshold)).fetchone()[0]
+            events.append({"id": event_id, "username": username, "period": period, "level": threshold,
+                           "spent": spent, "spend_limit": spend_limit, "phone": phone, "created_at": now})
+    return events
+
+
+def read_status(conn, username):
+    # (period, level, spent, spend_limit) or None
+    return conn.execute('SELECT period, level, spent, spend_limit FROM budget_status WHERE username = ?',
+                        (username,)).fetchone()
+
+
+def add_notifier(fn):
+    # fn(event) is called once per new event; only the highest new level of a write is sent
+    with _notifiers_lock:
+        if fn not in _notifiers:
+            _notifiers.append(fn)
+
+
+def dispatch(events):
+    # Returns the ids of events that every notifier accepted
+    if not events or not _notifiers:
+        return []
+    event = max(events, key=lambda e: e["level"])
+    with _notifiers_lock:
+        notifiers = list(_notifiers)
+    try:
+        for fn in notifiers:
+            fn(event)
+    except Exception:
+        return []
+    return [e["id"] for e in events]
+
+
+def format_alert(event, currency="₹"):
+    messages = {
+        90: "CRITICAL: 90% of your budget is used",
+        75: "WARNING: you have crossed 75% of your budget",
+        50: "REMINDER: 50% of your budget is used",
+    }
+    return (f"Expense Tracker: {messages[event['level']]} "
+            f"({currency}{event['spent']:.0f} of {currency}{event['spend_limit']:.0f}).")
+
+
+def sms_notifier(sms_queue, currency="Rs"):
+    # Pushes alerts through sms_queue.SmsQueue to the phone stored in users
+    def notify(event):
+        if event.get("phone"):
+            sms_queue.enqueue(format_alert(event, currency), event["phone"])
+    return notify
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --------------------------------------------------------------------------------
+# Menu catalog with stock
+# --------------------------------------------------------------------------------
+# catalog.json lists each shop's items with a price and, optionally, a stock
+# count:
+#
+#   {"sweets": {"unit": "piece", "items": [{"name": "Ras Malai", "price": 60, "stock": 25}, ...]}}
+#
+# One Catalog per process reads the file, and re-reads it when its modification
+# time or size changes (checked at most every `check_interval` seconds), so
+# prices and stock can be edited without a restart. A file that does not parse
+# (e.g. caught half-saved) is ignored until the next change.
+#
+# Remaining stock is kept in a small SQLite database next to the file
+# (catalog_stock.db for catalog.json), so it survives a restart and every
+# process using the catalog (app.py and shop.py, each replica) sells from the
+# same count. A row starts at the file's count and goes down as orders reserve
+# it. Loading the file keeps what has been sold unless the item's count in the
+# file changed (a restock or correction), which resets that item to the new
+# count; the reset happens once, whichever process sees the change first.
+# Items without "stock" never sell out.
+#
+# reserve() takes all items of an order or none: one BEGIN IMMEDIATE
+# transaction with a conditional UPDATE per item, rolled back if any item is
+# short.
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+STOCK_SCHEMA = '''CREATE TABLE IF NOT EXISTS stock
+                  (section TEXT, item TEXT, stock INTEGER, remaining INTEGER, PRIMARY KEY (section, item))'''
+CHECK_INTERVAL_SECONDS = 1.0
+
+
+class OutOfStock(Exception):
+    def __init__(self, shortages):
+        # shortages: {item: how many are left}
+        self.shortages = shortages
+        super().__init__(", ".join(f"{item}: {left} left" for item, left in shortages.items()))
+
+
+class _Item:
+    __slots__ = ("name", "price", "stock")
+
+    def __init__(self, name, price, stock):
+        self.name = name
+        self.price = price
+        self.stock = stock  # count in the file; None: not tracked
+
+
+def stock_db_path(path):
+    # catalog.json -> catalog_stock.db
+    return f"{os.path.splitext(path)[0]}_stock.db"
+
+
+class Catalog:
+    def __init__(self, path=DEFAULT_CATALOG, check_interval=CHECK_INTERVAL_SECONDS, stock_db=None):
+        self.path = path
+        self.check_interval = check_interval
+        self.stock_db = stock_db or stock_db_path(path)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(STOCK_SCHEMA)
+        self._sections = {}  # section -> (unit, {name: _Item}) in file order
+        self._signature = None
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+        with self._reload_lock:
+            self._load(self._stat())
+
+    # --- storage ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.stock_db, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # --- loading ---
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, signature):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        sections = {}
+        for section, spec in data.items():
+            items = {}
+            for entry in spec["items"]:
+                items[entry["name"]] = _Item(entry["name"], entry["price"], entry.get("stock"))
+            sections[section] = (spec.get("unit", "piece"), items)
+        with self._conn() as conn:
+            for section, (_, items) in sections.items():
+                # A new count in the file resets remaining; the same count keeps it
+                conn.executemany('INSERT INTO stock (section, item, stock, remaining) VALUES (?,?,?,?) '
+                                 'ON CONFLICT (section, item) DO UPDATE SET stock = excluded.stock, '
+                                 'remaining = excluded.stock WHERE stock.stock IS NOT excluded.stock',
+                                 [(section, item.name, item.stock, item.stock) for item in items.values()
+                                  if item.stock is not None])
+                conn.executemany('DELETE FROM stock WHERE section = ? AND item = ?',
+                                 [(section, item.name) for item in items.values() if item.stock is None])
+        self._sections = sections
+        self._signature = signature
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._reload_lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return  # another thread just checked
+            self._checked_at = time.monotonic()
+            try:
+                signature = self._stat()
+                if signature != self._signature:
+                    self._load(signature)
+                    self.reloads += 1
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # keep the last good catalog
+
+    # --- reading ---
+    def unit(self, section):
+        self._maybe_reload()
+        return self._sections[section][0]
+
+    def items(self, section):
+        # [{"name", "price", "stock", "remaining"}] in file order
+        left = self.remaining(section)
+        return [{"name": item.name, "price": item.price, "stock": item.stock, "remaining": left[item.name]}
+                for item in self._sections[section][1].values()]
+
+    def prices(self, section):
+        self._maybe_reload()
+        return {name: item.price for name, item in self._sections[section][1].items()}
+
+    def remaining(self, section):
+        # {item: units left, or None if not tracked}
+        self._maybe_reload()
+        items = self._sections[section][1]
+        rows = dict(self._conn().execute('SELECT item, remaining FROM stock WHERE section = ?', (section,)))
+        return {name: rows.get(name) if item.stock is not None else None for name, item in items.items()}
+
+    # --- stock ---
+    def reserve(self, section, quantities):
+        # Takes quantities ({item: qty}) from stock, all or nothing; raises
+        # OutOfStock naming every item that is short (an item no longer on
+        # the menu counts as 0 left)
+        self._maybe_reload()
+        items = self._sections[section][1]
+        wanted = sorted((name, qty) for name, qty in quantities.items() if qty > 0)
+        missing = {name: 0 for name, _ in wanted if name not in items}
+        if missing:
+            raise OutOfStock(missing)
+        tracked = [(name, qty) for name, qty in wanted if items[name].stock is not None]
+        if not tracked:
+            return dict(wanted)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            short = []
+            for name, qty in tracked:
+                cur = conn.execute('UPDATE stock SET remaining = remaining - ? '
+                                   'WHERE section = ? AND item = ? AND remaining >= ?', (qty, section, name, qty))
+                if cur.rowcount == 0:
+                    short.append(name)
+            if short:
+                left = dict(conn.execute('SELECT item, remaining FROM stock WHERE section = ? AND item IN (%s)'
+                                         % ",".join("?" * len(short)), [section] + short))
+                raise OutOfStock({name: left.get(name, 0) for name in short})
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return dict(wanted)
+
+    def release(self, section, quantities):
+        # Puts back a reservation whose order was not placed (never above the
+        # file's count, in case the item was restocked in between)
+        with self._conn() as conn:
+            conn.executemany('UPDATE stock SET remaining = MIN(stock, remaining + ?) WHERE section = ? AND item = ?',
+                             [(qty, section, name) for name, qty in quantities.items() if qty > 0])
@@ -1,11 +1,11 @@
 import streamlit as st
-import sqlite3
-import hashlib
+import csv
+import io
+import os
 import time
-from datetime import datetime
-from streamlit_option_menu import option_menu
-import pandas as pd
-import plotly.express as px
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from pathlib import Path
 
 # --------------------------------------------------------------------------------
 # 1. CONFIGURATION, CSS & DATA STRUCTURE
@@ -90,101 +90,34 @@ st.markdown("""
 # --------------------------------------------------------------------------------
 # 2. DATABASE FUNCTIONS
 # --------------------------------------------------------------------------------
-DB_NAME = "expense_tracker_final.db"
-
-def init_db():
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (username TEXT PRIMARY KEY, password TEXT, full_name TEXT, 
-                      email TEXT, phone TEXT, currency TEXT, budget REAL, signup_date TEXT)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS profiles
-                     (username TEXT PRIMARY KEY, occupation TEXT, monthly_income REAL, 
-                      salary REAL, spendable REAL, savings_goal REAL, current_savings REAL,
-                      emergency_fund REAL, other_income REAL)''')
-        
-        # Transactions table without subcategory
-        c.execute('''CREATE TABLE IF NOT EXISTS transactions
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, name TEXT, amount REAL, category TEXT, date TEXT)''')
-        conn.commit()
-
-def make_hash(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
-def register_user_db(username, password, fullname, email, phone, currency, budget):
-    try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            c.execute('INSERT INTO users VALUES (?,?,?,?,?,?,?,?)', 
-                      (username, make_hash(password), fullname, email, phone, currency, budget, date))
-            conn.commit()
-            return True
-    except sqlite3.IntegrityError:
-        return False
-
-def login_user_db(username, password):
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute('SELECT * FROM users WHERE username = ? AND password = ?', 
-                  (username, make_hash(password)))
-        return c.fetchone()
-    
-def update_profile_db(username, spendable, current_savings, emergency_fund, savings_goal=None):
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        
-        current_profile = get_profile_db(username)
-        if not current_profile:
-             return False
-
-        if savings_goal is None:
-            savings_goal = current_profile[5]
-
-        updated_data = list(current_profile)
-        updated_data[4] = spendable
-        updated_data[6] = current_savings
-        updated_data[7] = emergency_fund
-        updated_data[5] = savings_goal
-        
-        c.execute('INSERT OR REPLACE INTO profiles VALUES (?,?,?,?,?,?,?,?,?)', tuple(updated_data))
-        conn.commit()
-        return True
-
-def save_profile_db(data_tuple):
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute('INSERT OR REPLACE INTO profiles VALUES (?,?,?,?,?,?,?,?,?)', data_tuple)
-        conn.commit()
-
-def get_profile_db(username):
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute('SELECT * FROM profiles WHERE username = ?', (username,))
-        return c.fetchone()
-
-# Updated add_expense_db to remove subcategory
-def add_expense_db(username, name, amount, category, date):
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute('INSERT INTO transactions (username, name, amount, category, date) VALUES (?,?,?,?,?)', 
-                  (username, name, amount, category, date))
-        conn.commit()
-
-def get_total_expenses(username):
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute('SELECT SUM(amount) FROM transactions WHERE username = ?', (username,))
-        result = c.fetchone()[0]
-        return result if result else 0.0
-
-def get_recent_transactions(username):
-    # Query: date, name, category, amount
-    with sqlite3.connect(DB_NAME) as conn:
-        df = pd.read_sql_query(f"SELECT date, name, category, amount FROM transactions WHERE username='{username}' ORDER BY date DESC", conn)
-        return df
+# Pooled connections shared across reruns and sessions live in expense_db.py.
+# Heavy libraries (pandas, plotly, the option menu) are imported by the page or
+# tab that uses them, so the login page starts without them.
+from expense_db import (init_db, register_user_db, login_user_db, update_profile_db, save_profile_db,
+                        get_profile_db, add_expense_db, get_total_expenses, get_category_totals,
+                        get_transactions_page, export_transactions_tempfile, get_budget_status, search_transactions)
+from perf_trace import span, start_exporters, show_perf_panel
+import budget_alerts
 
 init_db()
+start_exporters()
+
+# Users who see the Performance tab (comma-separated usernames)
+PERF_ADMIN_USERS = {u.strip() for u in os.getenv('PERF_ADMIN_USERS', '').split(',') if u.strip()}
+
+# Budget alerts by SMS (same Twilio settings as app.py, read from the environment)
+BUDGET_ALERT_SMS = os.getenv('BUDGET_ALERT_SMS', 'off') == 'on'
+
+@st.cache_resource
+def enable_budget_alert_sms():
+    from sms_queue import SmsQueue
+    queue = SmsQueue(os.getenv('TWILIO_ACCOUNT_SID', ''), os.getenv('TWILIO_AUTH_TOKEN', ''),
+                     os.getenv('TWILIO_PHONE_NUMBER', ''), api_base=os.getenv('TWILIO_API_BASE')).start()
+    budget_alerts.add_notifier(budget_alerts.sms_notifier(queue))
+    return queue
+
+if BUDGET_ALERT_SMS:
+    enable_budget_alert_sms()
 
 # --------------------------------------------------------------------------------
 # 3. SESSION STATE
@@ -250,7 +183,8 @@ def show_auth():
                             st.session_state['user_info'] = {'username': u_name, 'name': f_name, 'currency': curr}
                             st.session_state['page'] = 'onboarding'
                             st.success("Registration Successful! Please complete your profile setup.")
-                            time.sleep(1) 
+                            with span("auth.register_pause"):
+                                time.sleep(1)
                             st.rerun()
                             # --- End New Logic ---
                         else:
@@ -284,36 +218,42 @@ def show_onboarding():
 # 5. DASHBOARD
 # --------------------------------------------------------------------------------
 
-def show_dashboard():
+def show_dashboard(spans):
     user_name = st.session_state['user_info']['name']
     u_curr = st.session_state['user_info']['currency'].split()[0]
     username = st.session_state['user_info']['username']
     
     today_date = datetime.now().strftime("%A, %B %d, %Y")
     
-    # --- STEP 1: GET DATA ---
+    # Message from the action that triggered this rerun
+    if st.session_state.get('flash'):
+        message, icon = st.session_state.pop('flash')
+        st.toast(message, icon=icon)
+
+    # --- STEP 1: GET DATA (served from the per-user cache on unchanged reruns) ---
     profile = get_profile_db(username)
     total_spent = get_total_expenses(username)
     
     # --- STEP 2: DISPLAY NOTIFICATION BAR (TOP HEADER) ---
+    # The level is computed when spend or limit changes (budget_alerts), not here
+    budget_status = get_budget_status(username)
+    budget_level = budget_status[1] if budget_status else 0
     if profile:
         spendable_limit = profile[4]
         if spendable_limit > 0:
-            percent_used = (total_spent / spendable_limit) * 100
-            
-            if percent_used >= 90:
+            if budget_level >= 90:
                 st.markdown(f"""
                     <div class="notification-bar notif-red">
-                        🚨 CRITICAL ALERT: Budget 90% Exhausted! ({u_curr}{total_spent} / {u_curr}{spendable_limit})
+                        🚨 CRITICAL ALERT: Budget 90% Exhausted! ({u_curr}{budget_status[2]} / {u_curr}{budget_status[3]})
                     </div>
                 """, unsafe_allow_html=True)
-            elif percent_used >= 75:
+            elif budget_level >= 75:
                 st.markdown(f"""
                     <div class="notification-bar notif-yellow">
                         ⚠ WARNING: You have crossed 75% of your budget. Spend wisely.
                     </div>
                 """, unsafe_allow_html=True)
-            elif percent_used >= 50:
+            elif budget_level >= 50:
                 st.markdown(f"""
                     <div class="notification-bar notif-blue">
                         ℹ REMINDER: 50% of budget utilized.
@@ -321,10 +261,17 @@ def show_dashboard():
                 """, unsafe_allow_html=True)
     
     # --- STEP 3: HEADER MENU ---
+    from streamlit_option_menu import option_menu
+    # Admins (PERF_ADMIN_USERS) also get the Performance tab
+    menu_options = ["Overview", "Add Expense", "Analytics", "Import"]
+    menu_icons = ["house", "wallet", "bar-chart-line", "upload"]
+    if username in PERF_ADMIN_USERS:
+        menu_options.append("Performance")
+        menu_icons.append("speedometer2")
     selected = option_menu(
         menu_title=None, 
-        options=["Overview", "Add Expense", "Analytics", "Logout"], 
-        icons=["house", "wallet", "bar-chart-line", "box-arrow-right"], 
+        options=menu_options + ["Logout"], 
+        icons=menu_icons + ["box-arrow-right"], 
         menu_icon="cast", 
         default_index=0, 
         orientation="horizontal",
@@ -338,6 +285,7 @@ def show_dashboard():
     
     if selected == "Logout":
         st.session_state['logged_in'] = False
+        st.session_state['tx_cursor'] = None
         st.session_state['page'] = 'auth'
         st.rerun()
 
@@ -346,7 +294,9 @@ def show_dashboard():
     if profile:
         spendable_limit = profile[4]
         remaining = spendable_limit - total_spent
-        
+
+        # Each tab's content is one span (PERF_TRACE=on), ended by the caller's ExitStack
+        spans.enter_context(span(f"tab.{selected.lower().replace(' ', '_')}"))
         # === TAB 1: OVERVIEW ===
         if selected == "Overview":
             st.markdown(f"### 👋 Welcome, *{user_name}*")
@@ -371,8 +321,8 @@ def show_dashboard():
                     
                     if st.form_submit_button("Update Profile"):
                         if update_profile_db(username, new_spendable, new_savings, new_emergency):
-                             st.success("Profile updated successfully!")
-                             time.sleep(0.5)
+                             # Cache is invalidated on write, so the rerun shows the new values at once
+                             st.session_state['flash'] = ("Profile updated successfully!", "✅")
                              st.rerun()
                         else:
                              st.error("Error updating profile.")
@@ -395,7 +345,7 @@ def show_dashboard():
             
             st.write("")
             
-            if spendable_limit > 0 and percent_used >= 90:
+            if spendable_limit > 0 and budget_level >= 90:
                  st.error("🚨 CRITICAL SPENDING ALERT: Your budget is almost exhausted! Immediate action needed.")
             
             st.subheader("📊 Budget vs Spent")
@@ -406,6 +356,7 @@ def show_dashboard():
 
         # === TAB 2: ADD EXPENSE (MAIN CATEGORY ONLY) ===
         elif selected == "Add Expense":
+            from expense_import import clean_category
             st.subheader("➕ Add Transaction")
             st.write("Add your daily spending here. Choose the most relevant category.")
             
@@ -440,64 +391,245 @@ def show_dashboard():
                         st.warning("Please enter a valid Amount and Description.")
                     else:
                         # Extract clean Main Category name for DB storage
-                        try:
-                            clean_main_category = main_category.split(". ")[1].split(" (")[0].strip()
-                        except IndexError:
-                            clean_main_category = main_category
+                        clean_main_category = clean_category(main_category)
                         
                         add_expense_db(username, name, amt, clean_main_category, str(date)) 
-                        st.toast(f"Expense added to '{clean_main_category}'!", icon="✅")
-                        time.sleep(0.5) 
+                        st.session_state['flash'] = (f"Expense added to '{clean_main_category}'!", "✅")
                         st.rerun() 
 
         # === TAB 3: ANALYTICS ===
         elif selected == "Analytics":
+            import plotly.express as px
+            from expense_analytics import SNAPSHOT_RANGES, TREND_RULES, get_snapshot_analytics, get_spend_analytics
+            from expense_snapshot import snapshot_info, snapshot_path, write_snapshot
+            snapshot_file = snapshot_path(username)
             st.subheader("📈 Detailed Analysis")
             
-            df_transactions = get_recent_transactions(username)
+            # Keyset cursor for Recent Activity: None, ('after', key) or ('before', key)
+            cursor = st.session_state.get('tx_cursor')
+            df_page, has_older, has_newer = get_transactions_page(
+                username,
+                after=cursor[1] if cursor and cursor[0] == 'after' else None,
+                before=cursor[1] if cursor and cursor[0] == 'before' else None,
+            )
+            if df_page.empty and cursor:
+                st.session_state['tx_cursor'] = None
+                st.rerun()
             
-            if not df_transactions.empty:
+            if not df_page.empty:
                 st.write("")
                 col_pie, col_recent = st.columns([1, 1])
 
                 # PIE CHART (Use Main Category for grouping)
                 with col_pie:
                     st.markdown("#### Category Spending Breakdown (Pie Chart)")
-                    df_category = df_transactions.groupby('category')['amount'].sum().reset_index()
-                    fig = px.pie(df_category, values='amount', names='category', title='Spending by Main Category', hole=0.3)
-                    fig.update_traces(textinfo='percent+label')
-                    st.plotly_chart(fig, use_container_width=True)
+                    # Pre-aggregated per category (spend_rollups), not grouped from raw rows
+                    df_category = get_category_totals(username)
+                    with span("chart.category_pie"):
+                        fig = px.pie(df_category, values='amount', names='category', title='Spending by Main Category', hole=0.3)
+                        fig.update_traces(textinfo='percent+label')
+                        st.plotly_chart(fig, use_container_width=True)
 
                 # RECENT ACTIVITY TABLE 
                 with col_recent:
                     st.markdown("#### Recent Activity (Downloadable)")
-                    # df_transactions columns: date, name, category, amount
-                    df_display = df_transactions[['date', 'name', 'category', 'amount']].head(10)
+                    # df_page columns: id, date, name, category, amount
+                    df_display = df_page[['date', 'name', 'category', 'amount']].copy()
                     df_display.columns = ['Date', 'Item/Description', 'Category', f'Amount ({u_curr})']
                     st.dataframe(df_display, use_container_width=True, hide_index=True)
+
+                    first_key = (df_page['date'].iloc[0], int(df_page['id'].iloc[0]))
+                    last_key = (df_page['date'].iloc[-1], int(df_page['id'].iloc[-1]))
+                    n1, n2 = st.columns(2)
+                    with n1:
+                        if st.button("◀ Newer", disabled=not has_newer, use_container_width=True):
+                            st.session_state['tx_cursor'] = ('before', first_key)
+                            st.rerun()
+                    with n2:
+                        if st.button("Older ▶", disabled=not has_older, use_container_width=True):
+                            st.session_state['tx_cursor'] = ('after', last_key)
+                            st.rerun()
                     
-                    # Option to Download Data
-                    csv = df_transactions.to_csv(index=False).encode('utf-8')
+                    # Option to Download Data (generated only when the button is clicked,
+                    # streamed from SQLite in chunks)
+                    with st.expander("Export options"):
+                        categories = st.multiselect("Categories", df_category['category'].tolist(), key='exp_cats')
+                        use_range = st.checkbox("Filter by date range", key='exp_use_range')
+                        if use_range:
+                            d1, d2 = st.columns(2)
+                            with d1:
+                                exp_start = st.date_input("From", key='exp_start')
+                            with d2:
+                                exp_end = st.date_input("To", key='exp_end')
+                        else:
+                            exp_start = exp_end = None
+                        compress = st.checkbox("Compress (gzip)", key='exp_gzip')
+                    export_filters = dict(start=exp_start, end=exp_end, categories=categories, compress=compress)
                     st.download_button(
                         label="Download All Data as CSV",
-                        data=csv,
-                        file_name='expense_activity.csv',
-                        mime='text/csv',
+                        data=lambda: export_transactions_tempfile(username, **export_filters),
+                        file_name='expense_activity.csv.gz' if compress else 'expense_activity.csv',
+                        mime='application/gzip' if compress else 'text/csv',
                         help='Download all your transaction data.'
                     )
+
+                    # Parquet snapshot: typed, columnar and much smaller than the CSV; also
+                    # what "Read from snapshot" under Spending Trends uses
+                    with st.expander("Snapshot (Parquet)"):
+                        current = snapshot_info(snapshot_file)
+                        if current:
+                            st.caption(f"{current['rows']} transactions, {current['size'] / 1e6:.1f} MB, "
+                                       f"taken {current['created_at']}")
+                        if st.button("Update snapshot" if current else "Create snapshot", use_container_width=True):
+                            with st.spinner("Writing snapshot..."):
+                                rows = write_snapshot(username, snapshot_file)
+                            st.session_state['flash'] = (f"Snapshot saved ({rows} transactions).", "✅")
+                            st.rerun()
+                        if current:
+                            st.download_button(
+                                label="Download Snapshot (.parquet)",
+                                data=Path(snapshot_file).read_bytes,
+                                file_name='expense_activity.parquet',
+                                mime='application/vnd.apache.parquet',
+                            )
+
+                # TRENDS (from daily rollups or the user's Parquet snapshot; cached per user
+                # until the next write)
+                st.markdown("#### 📉 Spending Trends")
+                snapshot = snapshot_info(snapshot_file)
+                use_snapshot = st.toggle("Read from snapshot", key='trend_snapshot', disabled=snapshot is None,
+                                         help="Use the Parquet snapshot (Export options) instead of live totals.")
+                if use_snapshot and snapshot:
+                    since_label = st.selectbox("History", list(SNAPSHOT_RANGES), key='trend_since')
+                    days = SNAPSHOT_RANGES[since_label]
+                    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d") if days else None
+                    analytics = get_snapshot_analytics(username, snapshot_file, snapshot['mtime'], since)
+                    st.caption(f"Snapshot of {snapshot['rows']} transactions taken {snapshot['created_at']}; "
+                               f"later expenses are not included.")
+                else:
+                    analytics = get_spend_analytics(username)
+                period = st.radio("Period", list(TREND_RULES), horizontal=True, key='trend_period')
+                with span("chart.trends"):
+                    fig_trend = px.bar(analytics.trend_long(period), x='period', y='amount', color='category',
+                                       labels={'period': '', 'amount': f'Spent ({u_curr})', 'category': 'Category'})
+                    st.plotly_chart(fig_trend, use_container_width=True)
+
+                col_proj, col_delta = st.columns([1, 2])
+                with col_proj:
+                    st.markdown("##### Month-End Projection")
+                    proj = analytics.projection(spendable_limit)
+                    st.metric("Spent this month", f"{u_curr}{proj['spent']:.0f}")
+                    st.metric("Projected by month end", f"{u_curr}{proj['projected']:.0f}",
+                              delta=f"{u_curr}{proj['over_by']:.0f} over limit" if proj['over_by'] else None,
+                              delta_color="inverse")
+                    st.caption(f"{u_curr}{proj['daily_rate']:.0f}/day, {proj['days_left']} days left, "
+                               f"limit {u_curr}{proj['limit']:.0f}")
+                with col_delta:
+                    st.markdown("##### Month-over-Month by Category")
+                    df_delta = analytics.category_deltas()
+                    if df_delta.empty:
+                        st.caption("No spending this month or last month.")
+                    else:
+                        df_delta = df_delta.copy()
+                        df_delta.columns = ['Category', 'This Month', 'Last Month', 'Change', 'Change %']
+                        st.dataframe(df_delta.round(1), use_container_width=True, hide_index=True)
+
+                # SEARCH (full-text index over descriptions)
+                st.markdown("#### 🔎 Search Transactions")
+                query = st.text_input("Search descriptions", key='search_q',
+                                      placeholder='e.g. kfc, "amazon purchase", groc*')
+                s1, s2, s3 = st.columns([2, 1, 1])
+                with s1:
+                    search_cats = st.multiselect("Categories", df_category['category'].tolist(), key='search_cats')
+                with s2:
+                    search_start = st.date_input("From", value=None, key='search_start')
+                with s3:
+                    search_end = st.date_input("To", value=None, key='search_end')
+                if query.strip():
+                    df_found = search_transactions(username, query, start=search_start, end=search_end,
+                                                   categories=search_cats)
+                    if df_found.empty:
+                        st.info("No matching transactions.")
+                    else:
+                        st.caption(f"{len(df_found)} found, best match first")
+                        df_found = df_found[['date', 'name', 'category', 'amount']]
+                        df_found.columns = ['Date', 'Item/Description', 'Category', f'Amount ({u_curr})']
+                        st.dataframe(df_found, use_container_width=True, hide_index=True)
             else:
                 st.info("No transactions recorded yet. Add expenses in the 'Add Expense' tab.")
 
+        # === TAB 4: BULK IMPORT ===
+        elif selected == "Import":
+            from expense_import import guess_mapping, iter_csv_rows, read_csv_header, import_expenses
+            st.subheader("📥 Import Expenses")
+            st.write("Upload a CSV or bank statement export. Map its columns, then import everything in one go.")
+
+            uploaded = st.file_uploader("CSV file", type=["csv"])
+            if uploaded is not None:
+                header = read_csv_header(uploaded)
+                guessed = guess_mapping(header)
+                columns = ["—"] + list(header)
+
+                st.markdown("##### 1. Map Columns")
+                c1, c2, c3, c4 = st.columns(4)
+                mapping = {}
+                for col, (field, label) in zip((c1, c2, c3, c4, c1), [
+                        ("date", "Date"), ("name", "Description"), ("amount", "Amount"),
+                        ("category", "Category (optional)"), ("debit", "Debit / Withdrawal (bank statements)")]):
+                    with col:
+                        default = columns.index(guessed[field]) if guessed[field] in columns else 0
+                        choice = st.selectbox(label, columns, index=default, key=f"imp_{field}")
+                        mapping[field] = None if choice == "—" else choice
+
+                st.markdown("##### 2. Options")
+                o1, o2 = st.columns(2)
+                with o1:
+                    date_format = st.selectbox("Date format", ["Auto-detect", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y"])
+                    negative_is_expense = st.checkbox("Spends are negative amounts (signed bank statement)")
+                with o2:
+                    unknown_to_misc = st.checkbox("File unrecognised categories under Miscellaneous", value=True)
+
+                if st.button("Import", use_container_width=True):
+                    if not mapping["date"] or not mapping["name"] or not (mapping["amount"] or mapping["debit"]):
+                        st.warning("Please map Date, Description and either Amount or Debit.")
+                    else:
+                        uploaded.seek(0)
+                        with st.spinner("Importing..."):
+                            result = import_expenses(
+                                username, iter_csv_rows(uploaded), mapping, MAIN_CATEGORIES,
+                                date_format=None if date_format == "Auto-detect" else date_format,
+                                negative_is_expense=negative_is_expense,
+                                unknown_category="Miscellaneous" if unknown_to_misc else None,
+                            )
+                        st.success(f"Imported {result.imported} expenses. Skipped {result.skipped} credit rows, "
+                                   f"rejected {result.rejected}.")
+                        if result.rejects:
+                            st.markdown("##### Rejected Rows")
+                            rejects = [{"Line": n, "Reason": reason, **row} for n, reason, row in result.rejects]
+                            st.dataframe(rejects[:200], use_container_width=True, hide_index=True)
+                            out = io.StringIO()
+                            writer = csv.DictWriter(out, fieldnames=list(rejects[0].keys()), extrasaction="ignore")
+                            writer.writeheader()
+                            writer.writerows(rejects)
+                            st.download_button("Download Rejected Rows", out.getvalue().encode("utf-8"),
+                                               file_name="import_rejects.csv", mime="text/csv")
+
+        elif selected == "Performance" and username in PERF_ADMIN_USERS:
+            show_perf_panel()
+
     else:
         st.error("Profile data missing. Please re-login.")
 
 # --------------------------------------------------------------------------------
 # 6. MAIN APP EXECUTION
 # --------------------------------------------------------------------------------
-if not st.session_state['logged_in']:
-    show_auth()
-else:
-    if st.session_state['page'] == 'onboarding':
-        show_onboarding()
-    elif st.session_state['page'] == 'dashboard':
-        show_dashboard()
+# One span per rerun, named after the page (PERF_TRACE=on); the dashboard adds
+# its tab's span to `spans`, which ends it when the dashboard returns
+with span(f"rerun.{st.session_state['page'] if st.session_state['logged_in'] else 'auth'}"), ExitStack() as spans:
+    if not st.session_state['logged_in']:
+        show_auth()
+    else:
+        if st.session_state['page'] == 'onboarding':
+            show_onboarding()
+        elif st.session_state['page'] == 'dashboard':
+            show_dashboard(spans)
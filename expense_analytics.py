@@ -0,0 +1,139 @@
+import calendar
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from expense_db import cache, get_daily_totals
+from perf_trace import traced
+
+# --------------------------------------------------------------------------------
+# SPEND ANALYTICS (TRENDS, MONTH-OVER-MONTH, PROJECTION)
+# --------------------------------------------------------------------------------
+# Built from spend_daily (one row per user, day and category) rather than the
+# raw history, so the work is bounded by days x categories, not transactions.
+# The daily rows are pivoted once into a dense day x category frame; every view
+# is a resample or slice of it. One SpendAnalytics per user lives in the shared
+# UserCache under "analytics" and is dropped by the next write, so switching
+# views is a dict lookup until the data changes.
+
+TREND_RULES = {
+    "Daily": "D",
+    "Weekly": "W-MON",  # weeks labelled by their Monday
+    "Monthly": "MS",
+}
+# Periods shown in a chart (None: whole history); keeps the figure small for
+# long histories
+TREND_WINDOWS = {"Daily": 90, "Weekly": 104, "Monthly": None}
+
+
+class SpendAnalytics:
+    def __init__(self, daily):
+        # daily: df[day, category, total]
+        days = pd.to_datetime(daily["day"], format="%Y-%m-%d", errors="coerce")
+        frame = daily.assign(day=days).dropna(subset=["day"])
+        if frame.empty:
+            self.by_day = pd.DataFrame(dtype=float, index=pd.DatetimeIndex([], freq="D"))
+        else:
+            by_day = frame.pivot_table(index="day", columns="category", values="total", aggfunc="sum", fill_value=0.0)
+            self.by_day = by_day.asfreq("D", fill_value=0.0)
+        self._memo = {}
+
+    @property
+    def empty(self):
+        return self.by_day.empty
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def trend(self, period="Daily"):
+        # Wide frame: one row per period, one column per category
+        rule = TREND_RULES[period]
+
+        def compute():
+            if rule == "D" or self.empty:
+                return self.by_day
+            return self.by_day.resample(rule, label="left", closed="left").sum()
+        return self._cached(("trend", period), compute)
+
+    def trend_long(self, period="Daily"):
+        # Long form for plotting (last TREND_WINDOWS[period] periods): period, category, amount
+        def compute():
+            wide = self.trend(period)
+            if TREND_WINDOWS[period]:
+                wide = wide.iloc[-TREND_WINDOWS[period]:]
+            long = wide.rename_axis(index="period", columns="category").stack().rename("amount").reset_index()
+            return long[long["amount"] != 0] if period == "Daily" else long
+        return self._cached(("trend_long", period), compute)
+
+    def monthly_totals(self):
+        return self.trend("Monthly")
+
+    def category_deltas(self, today=None):
+        # This month vs last month per category: category, this_month, last_month,
+        # change, change_pct (NaN where last month is 0)
+        today = today or date.today()
+
+        def compute():
+            monthly = self.monthly_totals()
+            this_start = pd.Timestamp(today.year, today.month, 1)
+            last_start = this_start - pd.offsets.MonthBegin(1)
+            current = monthly.reindex([this_start], fill_value=0.0).to_numpy()[0]
+            previous = monthly.reindex([last_start], fill_value=0.0).to_numpy()[0]
+            change = current - previous
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change_pct = np.where(previous > 0, change / previous * 100, np.nan)
+            deltas = pd.DataFrame({"category": monthly.columns, "this_month": current, "last_month": previous,
+                                   "change": change, "change_pct": change_pct})
+            deltas = deltas[(deltas["this_month"] != 0) | (deltas["last_month"] != 0)]
+            return deltas.sort_values("change", key=np.abs, ascending=False).reset_index(drop=True)
+        return self._cached(("deltas", today.year, today.month), compute)
+
+    def projection(self, spend_limit, today=None):
+        # Month-end projection from the month-to-date daily rate
+        today = today or date.today()
+
+        def compute():
+            days_in_month = calendar.monthrange(today.year, today.month)[1]
+            start = pd.Timestamp(today.year, today.month, 1)
+            month_to_date = self.by_day.loc[start:pd.Timestamp(today)].to_numpy().sum()
+            daily_rate = month_to_date / today.day
+            projected = month_to_date + daily_rate * (days_in_month - today.day)
+            return {
+                "spent": float(month_to_date),
+                "daily_rate": float(daily_rate),
+                "projected": float(projected),
+                "limit": float(spend_limit or 0),
+                "days_left": days_in_month - today.day,
+                "over_by": float(max(0.0, projected - (spend_limit or 0))) if spend_limit else 0.0,
+            }
+        return self._cached(("projection", today.isoformat(), spend_limit), compute)
+
+
+@traced("analytics.get_spend_analytics")
+def get_spend_analytics(username):
+    return cache.get(username, "analytics", lambda: SpendAnalytics(get_daily_totals(username)))
+
+
+# Parquet snapshot instead of the rollups (expense_snapshot): the same views,
+# as of the snapshot, from the date, category and amount columns only and,
+# with `since`, only the row groups from that day on. Cached per snapshot file
+# version, so a new snapshot is picked up on the next rerun.
+SNAPSHOT_RANGES = {"Last 90 days": 90, "Last year": 365, "Last 2 years": 730, "All history": None}
+
+
+def daily_from_snapshot(path, since=None, username=None):
+    # df[day, category, total] like get_daily_totals
+    from expense_snapshot import read_snapshot
+    df = read_snapshot(path, columns=["date", "category", "amount"], start=since, username=username)
+    daily = df.groupby(["date", "category"], observed=True, as_index=False)["amount"].sum()
+    return pd.DataFrame({"day": daily["date"], "category": daily["category"].astype(str), "total": daily["amount"]})
+
+
+@traced("analytics.get_snapshot_analytics")
+def get_snapshot_analytics(username, path, version, since=None):
+    # version: anything that changes when the file is rewritten (its mtime)
+    return cache.get(username, ("snapshot_analytics", path, version, since),
+                     lambda: SpendAnalytics(daily_from_snapshot(path, since, username)))
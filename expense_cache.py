@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --------------------------------------------------------------------------------
+# PER-USER READ CACHE
+# --------------------------------------------------------------------------------
+# Shared by every session in the process. Entries are keyed (username, key) and
+# bounded by count (LRU) and age (TTL). Each entry carries a data version that
+# write helpers bump through invalidate(): per (username, key) for the keys a
+# write names, or per user when it names none. A load that raced with a write
+# is not stored, so a reader never caches data older than the last write, and
+# a write only reloads the entries it affects.
+#
+# The cache is per process: with several app replicas, a write on one replica is
+# seen by the others after at most `ttl` seconds.
+
+CACHE_MAX_ENTRIES = 4096
+CACHE_TTL_SECONDS = 300
+
+
+class UserCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()   # (username, key) -> (version, expires_at, value)
+        self._versions = OrderedDict()  # username -> version (every key of the user)
+        self._key_versions = OrderedDict()  # (username, key) -> version
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _version(self, username, key):
+        # Both counters; callers hold the lock
+        return self._versions.get(username, 0), self._key_versions.get((username, key), 0)
+
+    def version(self, username, key=None):
+        with self._lock:
+            return self._version(username, key)
+
+    def get(self, username, key, loader):
+        now = self.clock()
+        with self._lock:
+            version = self._version(username, key)
+            entry = self._entries.get((username, key))
+            if entry and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end((username, key))
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            if self._version(username, key) == version:
+                self._entries[(username, key)] = (version, now + self.ttl, value)
+                self._entries.move_to_end((username, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, username, *keys):
+        # Bumps the version of `keys` for this user and drops them; with no keys,
+        # every entry of the user
+        with self._lock:
+            self._counter += 1
+            if keys:
+                for key in keys:
+                    self._key_versions[(username, key)] = self._counter
+                    self._key_versions.move_to_end((username, key))
+                    self._entries.pop((username, key), None)
+                while len(self._key_versions) > self.max_entries:
+                    # A forgotten version reads as 0 again; drop what it guarded
+                    evicted, _ = self._key_versions.popitem(last=False)
+                    self._entries.pop(evicted, None)
+            else:
+                self._versions[username] = self._counter
+                self._versions.move_to_end(username)
+                for cache_key in [k for k in self._entries if k[0] == username]:
+                    del self._entries[cache_key]
+                while len(self._versions) > self.max_entries:
+                    evicted, _ = self._versions.popitem(last=False)
+                    for cache_key in [k for k in self._entries if k[0] == evicted]:
+                        del self._entries[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._key_versions.clear()
@@ -0,0 +1,978 @@
+import csv
+import hashlib
+import heapq
+import io
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from urllib.parse import quote
+
+import budget_alerts
+from expense_cache import UserCache
+from expense_storage import create_backend
+from perf_trace import traced
+
+# --------------------------------------------------------------------------------
+# DATABASE LAYER FOR ex.py
+# --------------------------------------------------------------------------------
+# Connections are opened once per process and shared by every Streamlit session
+# and rerun through the storage backend's pool (see expense_storage.py). Each
+# helper checks a connection out for the duration of one call.
+#
+# By default the data lives in a local SQLite file (EXPENSE_DB_PATH). Setting
+# EXPENSE_DB_URL to a SQLAlchemy DSN, e.g.
+#   postgresql+psycopg2://tracker:secret@db:5432/expenses
+# moves it to a shared server so several app replicas can serve the same users.
+#
+# pandas is imported by the helpers that return DataFrames, not at import time,
+# so the login page of ex.py starts without it.
+
+DB_NAME = os.getenv("EXPENSE_DB_PATH", "expense_tracker_final.db")
+DB_URL = os.getenv("EXPENSE_DB_URL")
+
+# Archived months of transactions (SQLite only, see PARTITIONS below)
+ARCHIVE_PATH = os.getenv("EXPENSE_ARCHIVE_PATH", f"{os.path.splitext(DB_NAME)[0]}-archive.db")
+HOT_MONTHS = int(os.getenv("EXPENSE_HOT_MONTHS", "2"))
+
+# Pool tuning for EXPENSE_DB_URL (per replica; keep size * replicas under the
+# server's max_connections)
+DB_POOL_OPTIONS = {
+    "pool_size": int(os.getenv("EXPENSE_DB_POOL_SIZE", "8")),
+    "max_overflow": int(os.getenv("EXPENSE_DB_MAX_OVERFLOW", "4")),
+    "pool_timeout": int(os.getenv("EXPENSE_DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("EXPENSE_DB_POOL_RECYCLE", "1800")),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# Per-user read cache for profile and totals; write helpers invalidate it
+# after their transaction commits
+cache = UserCache()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(DB_NAME, DB_URL, **(DB_POOL_OPTIONS if DB_URL else {}))
+    return _backend
+
+
+def _read_df(cur):
+    # DataFrame from an executed cursor (any DBAPI driver, unlike pd.read_sql_query)
+    import pandas as pd
+    return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+
+# --------------------------------------------------------------------------------
+# SCHEMA MIGRATIONS
+# --------------------------------------------------------------------------------
+# Each migration runs once, in its own transaction, and is recorded in
+# schema_version. Steps are SQL strings or callables taking the connection.
+# SQL steps may use the backend's DDL placeholders ({autoincrement_pk}, {real},
+# {without_rowid}). Never edit a released migration; append a new one.
+
+MIGRATIONS = [
+    (1, "base schema", [
+        '''CREATE TABLE IF NOT EXISTS users
+           (username TEXT PRIMARY KEY, password TEXT, full_name TEXT,
+            email TEXT, phone TEXT, currency TEXT, budget {real}, signup_date TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS profiles
+           (username TEXT PRIMARY KEY, occupation TEXT, monthly_income {real},
+            salary {real}, spendable {real}, savings_goal {real}, current_savings {real},
+            emergency_fund {real}, other_income {real})''',
+        # Transactions table without subcategory
+        '''CREATE TABLE IF NOT EXISTS transactions
+           (id {autoincrement_pk}, username TEXT, name TEXT, amount {real}, category TEXT, date TEXT)''',
+    ]),
+    (2, "transactions (username, date) and (username, category) indexes", [
+        'CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (username, date)',
+        'CREATE INDEX IF NOT EXISTS idx_transactions_user_category ON transactions (username, category)',
+    ]),
+    (3, "spend_rollups per user, category and month", [
+        '''CREATE TABLE IF NOT EXISTS spend_rollups
+           (username TEXT, category TEXT, month TEXT, total {real}, tx_count INTEGER,
+            PRIMARY KEY (username, category, month)) {without_rowid}''',
+        '''INSERT INTO spend_rollups
+           SELECT username, category, substr(date, 1, 7), SUM(amount), COUNT(*)
+           FROM transactions GROUP BY username, category, substr(date, 1, 7)''',
+    ]),
+    (4, "budget_status and budget_events for threshold alerts", budget_alerts.BUDGET_SCHEMA),
+    (5, "transactions_fts full-text index on descriptions", [lambda conn: _create_search_index(conn)]),
+    (6, "spend_daily per user, day and category", [
+        '''CREATE TABLE IF NOT EXISTS spend_daily
+           (username TEXT, day TEXT, category TEXT, total {real}, tx_count INTEGER,
+            PRIMARY KEY (username, day, category)) {without_rowid}''',
+        '''INSERT INTO spend_daily
+           SELECT username, substr(date, 1, 10), category, SUM(amount), COUNT(*)
+           FROM transactions GROUP BY username, substr(date, 1, 10), category''',
+    ]),
+    (7, "budget_events once per level and spend limit, not per month", budget_alerts.EVENTS_BY_LIMIT_SCHEMA),
+    (8, "budget_events once per month and level, spend month-to-date", budget_alerts.EVENTS_BY_PERIOD_SCHEMA),
+]
+
+_migrated = False
+
+
+def schema_version(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                    (version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(conn):
+    backend = get_backend()
+    applied = []
+    current = schema_version(conn)
+    conn.commit()
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        backend.begin_exclusive(conn)
+        try:
+            # Another process may have applied it while we waited for the lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                step(conn) if callable(step) else conn.execute(backend.ddl(step))
+            conn.execute('INSERT INTO schema_version VALUES (?,?,?)',
+                         (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+def init_db():
+    global _migrated
+    if _migrated:
+        return
+    with get_backend().connection() as conn:
+        migrate(conn)
+    _migrated = True
+
+
+def make_hash(password):
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+@traced("db.register_user_db")
+def register_user_db(username, password, fullname, email, phone, currency, budget):
+    try:
+        with get_backend().connection() as conn, conn:
+            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            conn.execute('INSERT INTO users VALUES (?,?,?,?,?,?,?,?)',
+                         (username, make_hash(password), fullname, email, phone, currency, budget, date))
+            return True
+    except get_backend().IntegrityError:
+        return False
+
+@traced("db.login_user_db")
+def login_user_db(username, password):
+    with get_backend().connection() as conn:
+        return conn.execute('SELECT * FROM users WHERE username = ? AND password = ?',
+                            (username, make_hash(password))).fetchone()
+
+def _get_profile(conn, username):
+    return conn.execute('SELECT * FROM profiles WHERE username = ?', (username,)).fetchone()
+
+PROFILE_COLUMNS = ("username", "occupation", "monthly_income", "salary", "spendable", "savings_goal",
+                   "current_savings", "emergency_fund", "other_income")
+PROFILE_UPSERT = (f'INSERT INTO profiles VALUES ({",".join("?" * len(PROFILE_COLUMNS))}) '
+                  f'ON CONFLICT (username) DO UPDATE SET '
+                  + ", ".join(f"{c} = excluded.{c}" for c in PROFILE_COLUMNS[1:]))
+
+@traced("db.update_profile_db")
+def update_profile_db(username, spendable, current_savings, emergency_fund, savings_goal=None):
+    with get_backend().connection() as conn, conn:
+        # Read and write on the same connection/transaction
+        current_profile = _get_profile(conn, username)
+        if not current_profile:
+             return False
+
+        if savings_goal is None:
+            savings_goal = current_profile[5]
+
+        updated_data = list(current_profile)
+        updated_data[4] = spendable
+        updated_data[6] = current_savings
+        updated_data[7] = emergency_fund
+        updated_data[5] = savings_goal
+
+        conn.execute(PROFILE_UPSERT, tuple(updated_data))
+        events = budget_alerts.evaluate(conn, username)
+    _after_write(username, PROFILE_CACHE_KEYS, events)
+    return True
+
+@traced("db.save_profile_db")
+def save_profile_db(data_tuple):
+    with get_backend().connection() as conn, conn:
+        conn.execute(PROFILE_UPSERT, data_tuple)
+        events = budget_alerts.evaluate(conn, data_tuple[0])
+    _after_write(data_tuple[0], PROFILE_CACHE_KEYS, events)
+
+@traced("db.get_profile_db")
+def get_profile_db(username):
+    def load():
+        with get_backend().connection() as conn:
+            return _get_profile(conn, username)
+    return cache.get(username, "profile", load)
+
+# Cache entries affected by each kind of write
+SPEND_CACHE_KEYS = ("total", "category_totals", "budget_status", "analytics")
+PROFILE_CACHE_KEYS = ("profile", "budget_status")
+
+def _after_write(username, cache_keys, events=()):
+    # Runs after the write's transaction has committed
+    cache.invalidate(username, *cache_keys)
+    notified = budget_alerts.dispatch(events)
+    if notified:
+        with get_backend().connection() as conn, conn:
+            conn.executemany('UPDATE budget_events SET notified = 1 WHERE id = ?', [(i,) for i in notified])
+
+def _bump_rollups(conn, username, expenses):
+    # expenses: (amount, category, date); same transaction as the insert.
+    # Aggregated per (category, month) and (day, category) before the upserts
+    monthly, daily = {}, {}
+    for amount, category, date in expenses:
+        date = str(date)
+        for totals, key in ((monthly, (category, date[:7])), (daily, (date[:10], category))):
+            total, count = totals.get(key, (0.0, 0))
+            totals[key] = (total + amount, count + 1)
+    conn.executemany('''INSERT INTO spend_rollups (username, category, month, total, tx_count) VALUES (?,?,?,?,?)
+                        ON CONFLICT (username, category, month)
+                        DO UPDATE SET total = spend_rollups.total + excluded.total,
+                                      tx_count = spend_rollups.tx_count + excluded.tx_count''',
+                     [(username, c, m, t, n) for (c, m), (t, n) in monthly.items()])
+    conn.executemany('''INSERT INTO spend_daily (username, day, category, total, tx_count) VALUES (?,?,?,?,?)
+                        ON CONFLICT (username, day, category)
+                        DO UPDATE SET total = spend_daily.total + excluded.total,
+                                      tx_count = spend_daily.tx_count + excluded.tx_count''',
+                     [(username, d, c, t, n) for (d, c), (t, n) in daily.items()])
+
+@traced("db.add_expense_db")
+def add_expense_db(username, name, amount, category, date):
+    with get_backend().connection() as conn, conn:
+        conn.execute('INSERT INTO transactions (username, name, amount, category, date) VALUES (?,?,?,?,?)',
+                     (username, name, amount, category, date))
+        _bump_rollups(conn, username, [(amount, category, date)])
+        events = budget_alerts.evaluate(conn, username)
+    _after_write(username, SPEND_CACHE_KEYS, events)
+
+@traced("db.add_expenses_bulk")
+def add_expenses_bulk(username, rows):
+    # rows: (name, amount, category, date); one transaction, one executemany
+    with get_backend().connection() as conn, conn:
+        conn.executemany('INSERT INTO transactions (username, name, amount, category, date) VALUES (?,?,?,?,?)',
+                         [(username, name, amount, category, str(date)) for name, amount, category, date in rows])
+        _bump_rollups(conn, username, [(amount, category, date) for _, amount, category, date in rows])
+        events = budget_alerts.evaluate(conn, username)
+    _after_write(username, SPEND_CACHE_KEYS, events)
+    return len(rows)
+
+TOTAL_SQL = 'SELECT SUM(total) FROM spend_rollups WHERE username = ?'
+CATEGORY_TOTALS_SQL = 'SELECT category, SUM(total) AS amount FROM spend_rollups WHERE username = ? GROUP BY category'
+DAILY_TOTALS_SQL = 'SELECT day, category, total FROM spend_daily WHERE username = ?'
+
+@traced("db.get_total_expenses")
+def get_total_expenses(username):
+    # Reads the rollups (one row per category and month), not the raw history
+    def load():
+        with get_backend().connection() as conn:
+            result = conn.execute(TOTAL_SQL, (username,)).fetchone()[0]
+            return result if result else 0.0
+    return cache.get(username, "total", load)
+
+@traced("db.get_category_totals")
+def get_category_totals(username):
+    # Columns: category, amount (cached; treat the DataFrame as read-only)
+    def load():
+        with get_backend().connection() as conn:
+            return _read_df(conn.execute(CATEGORY_TOTALS_SQL, (username,)))
+    return cache.get(username, "category_totals", load)
+
+@traced("db.get_daily_totals")
+def get_daily_totals(username):
+    # Columns: day, category, total; one row per day and category with spend
+    # (not cached here, see expense_analytics)
+    with get_backend().connection() as conn:
+        return _read_df(conn.execute(DAILY_TOTALS_SQL, (username,)))
+
+@traced("db.get_budget_status")
+def get_budget_status(username):
+    # (period, level, spent, spend_limit) for this month, or None
+    def load():
+        with get_backend().connection() as conn:
+            return budget_alerts.read_status(conn, username)
+    status = cache.get(username, "budget_status", load)
+    if (status is None or status[0] != budget_alerts.current_period()) and get_profile_db(username):
+        # Profiles from before alerts existed, or no write yet this month: evaluate now
+        with get_backend().connection() as conn, conn:
+            events = budget_alerts.evaluate(conn, username)
+            status = budget_alerts.read_status(conn, username)
+        _after_write(username, ("budget_status",), events)
+    return status
+
+@traced("db.get_recent_transactions")
+def get_recent_transactions(username):
+    # Query: date, name, category, amount; the whole history, archived months included
+    import pandas as pd
+    rows = [row for chunk in iter_transactions(username) for row in chunk]
+    return pd.DataFrame.from_records(rows, columns=list(EXPORT_COLUMNS))
+
+TRANSACTION_PAGE_SIZE = 10
+PAGE_OLDER_SQL = ('SELECT id, date, name, category, amount FROM {table} WHERE username = ?{after} '
+                  'ORDER BY date DESC, id DESC LIMIT ?')
+PAGE_AFTER = ' AND (date, id) < (?, ?)'
+PAGE_NEWER_SQL = ('SELECT id, date, name, category, amount FROM {table} WHERE username = ? AND (date, id) > (?, ?) '
+                  'ORDER BY date ASC, id ASC LIMIT ?')
+
+@traced("db.get_transactions_page")
+def get_transactions_page(username, after=None, before=None, page_size=TRANSACTION_PAGE_SIZE):
+    # Keyset pagination on (date, id), newest first. `after` is the (date, id) of
+    # the last row on the current page (older page); `before` the first row
+    # (newer page). Each fetch is one index seek + page_size rows in the hot
+    # table, and in archived months only until the page is full with rows newer
+    # (older, for `before`) than anything left in them, so recent pages never
+    # open the archive. Returns (df[id, date, name, category, amount], has_older, has_newer).
+    import pandas as pd
+    newer = before is not None
+    params = [username]
+    if newer:
+        sql = PAGE_NEWER_SQL
+        params += [before[0], before[1]]
+    else:
+        sql = PAGE_OLDER_SQL.replace("{after}", PAGE_AFTER if after is not None else "")
+        if after is not None:
+            params += [after[0], after[1]]
+    limit = page_size + 1
+    params.append(limit)
+    with get_backend().connection() as conn:
+        rows = conn.execute(sql.format(table="transactions"), params).fetchall()
+        partitions = _archive_partitions(conn)  # newest first
+        if newer:
+            partitions = [p for p in reversed(partitions) if p[0] >= str(before[0])[:7]]
+        elif after is not None:
+            partitions = [p for p in partitions if p[0] <= str(after[0])[:7]]
+        for month, table in partitions:
+            if len(rows) >= limit:
+                edge = str(rows[limit - 1][1])
+                if (f"{month}-01" > edge) if newer else (_next_month(month) <= edge):
+                    break  # this month and the ones after it sort past the page
+            rows = sorted(rows + conn.execute(sql.format(table=table), params).fetchall(),
+                          key=lambda r: (r[1], r[0]), reverse=not newer)[:limit]
+    df = pd.DataFrame.from_records(rows, columns=["id", "date", "name", "category", "amount"])
+    more = len(df) > page_size
+    df = df.head(page_size)
+    if newer:
+        return df.iloc[::-1].reset_index(drop=True), True, more
+    return df, more, after is not None
+
+# --------------------------------------------------------------------------------
+# TRANSACTION SEARCH
+# --------------------------------------------------------------------------------
+# On SQLite, descriptions are indexed in an FTS5 table that shares rowids with
+# transactions (external content, so names are not stored twice) and is kept in
+# sync by triggers. The username is indexed too, so a search intersects the
+# user's postings with the terms' instead of filtering every match. Other
+# backends fall back to ILIKE over the user's rows.
+#
+# Every match is ranked with FTS5's bm25() (name only: the username column has
+# weight 0, so the username phrase narrows the lookup without changing scores)
+# and the best SEARCH_LIMIT are returned. Each archived month has its own index
+# and is ranked against its own rows; the per-table results are merged by score.
+# Scoring every match costs about 2-4 us per match (10-35 ms for a word in 5-10k
+# of a user's rows); rare terms and no-match queries stay in low milliseconds.
+SEARCH_LIMIT = 50
+SEARCH_SQL = '''SELECT bm25({fts}, 1.0, 0.0) AS score, t.date, t.id, t.name, t.category, t.amount
+                FROM {table}_fts JOIN {table} t ON t.id = {fts}.rowid
+                WHERE {fts} MATCH ? AND t.username = ?{filters}
+                ORDER BY score, t.date DESC, t.id DESC LIMIT ?'''
+
+SEARCH_SCHEMA = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5
+       (name, username, content='transactions', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+           INSERT INTO transactions_fts (rowid, name, username) VALUES (new.id, new.name, new.username);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+           INSERT INTO transactions_fts (transactions_fts, rowid, name, username)
+           VALUES ('delete', old.id, old.name, old.username);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF name, username ON transactions BEGIN
+           INSERT INTO transactions_fts (transactions_fts, rowid, name, username)
+           VALUES ('delete', old.id, old.name, old.username);
+           INSERT INTO transactions_fts (rowid, name, username) VALUES (new.id, new.name, new.username);
+       END''',
+    "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')",
+]
+
+def _create_search_index(conn):
+    if get_backend().dialect == "sqlite":
+        for step in SEARCH_SCHEMA:
+            conn.execute(step)
+
+def optimize_search_index(conn):
+    # Merges the FTS segments left by many small writes into one b-tree (a few
+    # times faster to query after a large import); no-op without FTS
+    if get_backend().dialect == "sqlite":
+        with conn:
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('optimize')")
+
+def parse_search(text):
+    # 'kfc "amazon purchase" groc*' -> [("kfc", False), ("amazon purchase", False), ("groc", True)]
+    # i.e. (phrase, is_prefix); terms are ANDed
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', text or ""):
+        term = " ".join(re.findall(r"\w+", phrase or word))
+        if term:
+            terms.append((term, bool(word) and word.endswith("*")))
+    return terms
+
+def _fts_match(username, terms):
+    # The username phrase only narrows the index lookup (the query also filters
+    # t.username = ?). A username with no letters or digits has no tokens and
+    # its phrase would match nothing, so it is left out
+    name_query = " ".join(f'"{term}"' + ("*" if prefix else "") for term, prefix in terms)
+    if not re.search(r"[^\W_]", username):
+        return f'name : ({name_query})'
+    quoted = username.replace('"', '""')
+    return f'username : "{quoted}" AND name : ({name_query})'
+
+@traced("db.search_transactions")
+def search_transactions(username, text, start=None, end=None, categories=None, limit=SEARCH_LIMIT):
+    # Returns df[id, date, name, category, amount], best match first (newest
+    # first on backends without FTS). Filters as in iter_transactions; terms
+    # from parse_search().
+    import pandas as pd
+    columns = ["id", "date", "name", "category", "amount"]
+    terms = parse_search(text)
+    if not terms:
+        return pd.DataFrame(columns=columns)
+    backend = get_backend()
+    filters, filter_params = _filter_sql(start, end, categories, "t.")
+    with backend.connection() as conn:
+        if backend.dialect == "sqlite":
+            # The best `limit` of the hot table and of each archived month in the
+            # date range, merged by score (lower bm25 is better)
+            scored = []
+            for table in _sources(conn, start, end):
+                fts = f"{table.split('.')[-1]}_fts"
+                scored += conn.execute(SEARCH_SQL.format(fts=fts, table=table, filters=filters),
+                                       [_fts_match(username, terms), username] + filter_params + [limit]).fetchall()
+            scored.sort(key=lambda r: (r[1], r[2]), reverse=True)  # newest first among equal scores
+            scored.sort(key=lambda r: r[0])
+            rows = [(i, d, name, category, amount) for _, d, i, name, category, amount in scored[:limit]]
+        else:
+            sql = 'SELECT t.id, t.date, t.name, t.category, t.amount FROM transactions t WHERE t.username = ?'
+            params = [username]
+            for term, _ in terms:
+                # Phrase -> words in order
+                sql += " AND t.name ILIKE ?"
+                params.append("%" + "%".join(term.split()) + "%")
+            rows = conn.execute(sql + filters + ' ORDER BY t.date DESC, t.id DESC LIMIT ?',
+                                params + filter_params + [limit]).fetchall()
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+# --------------------------------------------------------------------------------
+# STREAMING EXPORT
+# --------------------------------------------------------------------------------
+# Rows are pulled from the database `chunk_size` at a time (a server-side
+# cursor on PostgreSQL) and serialized chunk by chunk, so memory stays flat
+# however long the history is.
+EXPORT_COLUMNS = ("date", "name", "category", "amount")
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_SQL = ('SELECT date, name, category, amount{id} FROM {table} WHERE username = ?{filters}{cond} '
+              'ORDER BY date DESC, id DESC')
+
+def _filter_sql(start=None, end=None, categories=None, prefix=""):
+    # (" AND ..." clause, params) for the optional date range and categories
+    sql, params = "", []
+    if start:
+        sql += f' AND {prefix}date >= ?'
+        params.append(str(start))
+    if end:
+        sql += f' AND {prefix}date <= ?'
+        params.append(str(end))
+    if categories:
+        sql += f' AND {prefix}category IN ({",".join("?" * len(categories))})'
+        params += list(categories)
+    return sql, params
+
+def iter_transactions(username, start=None, end=None, categories=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Yields lists of (date, name, category, amount), newest first.
+    # start/end are inclusive "YYYY-MM-DD" strings; categories a list of names.
+    # Archived months in the range are streamed too, after the hot rows newer
+    # than all of them. Archived months do not overlap, so they follow one
+    # another; only hot rows dated inside them (backdated since the last
+    # archive run, usually none) are merged in row by row.
+    filters, params = _filter_sql(start, end, categories)
+    sql = EXPORT_SQL.replace("{filters}", filters)
+    params = [username] + params
+    backend = get_backend()
+    with backend.connection() as conn:
+        partitions = _partitions_in(conn, start, end)
+        if not partitions:
+            yield from backend.iter_rows(conn, sql.format(id="", table="transactions", cond=""), params, chunk_size)
+            return
+        boundary = _next_month(partitions[0][0])
+        yield from backend.iter_rows(conn, sql.format(id="", table="transactions", cond=" AND date >= ?"),
+                                     params + [boundary], chunk_size)
+        backdated = conn.execute(sql.format(id=", id", table="transactions", cond=" AND date < ?"),
+                                 params + [boundary]).fetchall()
+        if not backdated:
+            for _, table in partitions:
+                yield from backend.iter_rows(conn, sql.format(id="", table=table, cond=""), params, chunk_size)
+            return
+        archived = (row for _, table in partitions
+                    for rows in backend.iter_rows(conn, sql.format(id=", id", table=table, cond=""),
+                                                  params, chunk_size)
+                    for row in rows)
+        chunk = []
+        for row in heapq.merge(backdated, archived, key=lambda r: (r[0], r[4]), reverse=True):
+            chunk.append(row[:4])
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def iter_transactions_csv(username, start=None, end=None, categories=None, compress=False,
+                          chunk_size=EXPORT_CHUNK_SIZE):
+    # Yields the CSV (optionally gzip'd) as bytes chunks
+    gzipper = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+
+    def drain():
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return gzipper.compress(data) if gzipper else data
+
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in iter_transactions(username, start, end, categories, chunk_size):
+        writer.writerows(rows)
+        chunk = drain()
+        if chunk:
+            yield chunk
+    tail = drain()
+    if gzipper:
+        tail += gzipper.flush()
+    if tail:
+        yield tail
+
+def export_transactions_csv(username, fileobj, **filters):
+    # Streams the export into an open binary file; returns bytes written
+    written = 0
+    for chunk in iter_transactions_csv(username, **filters):
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
+
+def export_transactions_tempfile(username, **filters):
+    # The export in an anonymous temporary file, rewound, for st.download_button.
+    # Unbuffered (a raw io.FileIO), which download_button reads in one call;
+    # the export itself never holds more than a chunk
+    f = tempfile.TemporaryFile(buffering=0)
+    try:
+        export_transactions_csv(username, f, **filters)
+        f.seek(0)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+# --------------------------------------------------------------------------------
+# PARTITIONS: HOT TRANSACTIONS AND A MONTHLY ARCHIVE
+# --------------------------------------------------------------------------------
+# `transactions` is the hot partition. Every write goes there, and it is all
+# the dashboard reads: totals and trends come from the rollups, which keep
+# covering the whole history. archive_transactions() (`python expense_db.py
+# archive`) moves the rows dated before the last HOT_MONTHS months into one
+# table per month, transactions_YYYY_MM with its own (username, date) and
+# full-text indexes, in a separate SQLite file (ARCHIVE_PATH), then compacts
+# that file. The app attaches it read-only as `archive` on first use. Reads
+# that can reach old rows (older history pages, search, the CSV export) also
+# read the archived months overlapping their date range (_sources()).
+#
+# Rows are copied and committed in the archive before they are deleted from
+# the hot table, so an interrupted run loses nothing; it is safe to run again.
+# A backdated expense for an archived month stays hot until the next run
+# appends it to its month. SQLite only: with EXPENSE_DB_URL the transactions
+# table keeps every row (partition it on the server instead).
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_BATCH_SIZE = 5000
+MONTH = re.compile(r"^\d{4}-\d{2}$")
+
+_partitions = (None, [])  # (archive file signature, [(month, table)] newest first)
+
+def _archive_signature():
+    try:
+        stat = os.stat(ARCHIVE_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _archive_partitions(conn):
+    # [(month, "archive.transactions_YYYY_MM")], newest first; attaches the
+    # archive to this pooled connection the first time. [] without an archive
+    global _partitions
+    if get_backend().dialect != "sqlite":
+        return []
+    signature = _archive_signature()
+    if signature is None:
+        return []
+    try:
+        if not any(row[1] == ARCHIVE_SCHEMA for row in conn.execute("PRAGMA database_list")):
+            conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}",
+                         (f"file:{quote(os.path.abspath(ARCHIVE_PATH))}?mode=ro",))
+        cached, partitions = _partitions
+        if cached != signature:
+            partitions = [(month, f"{ARCHIVE_SCHEMA}.{table}") for month, table in conn.execute(
+                f"SELECT month, table_name FROM {ARCHIVE_SCHEMA}.partitions ORDER BY month DESC")]
+            _partitions = (signature, partitions)
+    except sqlite3.OperationalError:
+        return []  # archive still being created
+    return partitions
+
+def _partitions_in(conn, start=None, end=None):
+    # Archived (month, table) overlapping [start, end], newest first
+    return [(month, table) for month, table in _archive_partitions(conn)
+            if not (start and month < str(start)[:7]) and not (end and month > str(end)[:7])]
+
+def _sources(conn, start=None, end=None):
+    # Tables that can hold rows dated in [start, end]: the hot table, then the
+    # archived months overlapping the range, newest first
+    return ["transactions"] + [table for _, table in _partitions_in(conn, start, end)]
+
+def _next_month(month):
+    # "2024-12" -> "2025-01-01"
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+
+def hot_window_start(today=None, hot_months=HOT_MONTHS):
+    # First month kept in the hot table, "YYYY-MM"
+    today = today or datetime.now()
+    index = today.year * 12 + today.month - 1 - (hot_months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def _archive_table(archive, month, now):
+    # The month's table (created and registered on first use)
+    table = f"transactions_{month.replace('-', '_')}"
+    archive.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                       (id INTEGER PRIMARY KEY, username TEXT, name TEXT, amount REAL, category TEXT, date TEXT)''')
+    archive.execute(f'CREATE INDEX IF NOT EXISTS {table}_user_date ON {table} (username, date)')
+    # Same tokenizer as transactions_fts
+    archive.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5
+                       (name, username, content='{table}', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2', prefix='2 3')''')
+    archive.execute('INSERT OR IGNORE INTO partitions VALUES (?, ?, 0, ?)', (month, table, now))
+    return table
+
+def archive_transactions(before=None, archive_path=None, batch_size=ARCHIVE_BATCH_SIZE):
+    # Moves hot rows dated before `before` ("YYYY-MM", default: the start of
+    # the hot window) to their months' archive tables, `batch_size` rows per
+    # transaction, then compacts the archive. Returns {month: rows moved}
+    backend = get_backend()
+    if backend.dialect != "sqlite":
+        raise RuntimeError("Archiving needs the SQLite backend; partition the table on the server instead")
+    before = before or hot_window_start()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    archive = sqlite3.connect(archive_path or ARCHIVE_PATH, timeout=30)
+    moved, tables = {}, {}
+    try:
+        with archive:
+            archive.execute('''CREATE TABLE IF NOT EXISTS partitions
+                               (month TEXT PRIMARY KEY, table_name TEXT, tx_count INTEGER, archived_at TEXT)''')
+        last_id = 0
+        with backend.connection() as conn:
+            while True:
+                # One pass over the hot table in id order
+                rows = conn.execute('SELECT id, username, name, amount, category, date FROM transactions '
+                                    'WHERE id > ? AND date < ? ORDER BY id LIMIT ?',
+                                    (last_id, f"{before}-01", batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                by_month = {}
+                for row in rows:
+                    if MONTH.match(str(row[5])[:7]):  # a malformed date stays hot
+                        by_month.setdefault(str(row[5])[:7], []).append(row)
+                with archive:
+                    for month, month_rows in by_month.items():
+                        if month not in tables:
+                            tables[month] = _archive_table(archive, month, now)
+                        table = tables[month]
+                        archive.executemany(f'INSERT OR REPLACE INTO {table} VALUES (?,?,?,?,?,?)', month_rows)
+                        archive.executemany(f'INSERT INTO {table}_fts (rowid, name, username) VALUES (?,?,?)',
+                                            [(r[0], r[2], r[1]) for r in month_rows])
+                with conn:
+                    conn.executemany('DELETE FROM transactions WHERE id = ?',
+                                     [(r[0],) for month_rows in by_month.values() for r in month_rows])
+                for month, month_rows in by_month.items():
+                    moved[month] = moved.get(month, 0) + len(month_rows)
+
+        # Compact: rebuild each touched full-text index as one segment (also
+        # drops entries a re-run added twice), refresh counts, VACUUM
+        with archive:
+            for month, table in tables.items():
+                archive.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+                archive.execute(f'UPDATE partitions SET tx_count = (SELECT COUNT(*) FROM {table}), archived_at = ? '
+                                'WHERE month = ?', (now, month))
+        archive.execute("VACUUM")
+    finally:
+        archive.close()
+    return moved
+
+
+# --------------------------------------------------------------------------------
+# QUERY PLAN CHECK
+# --------------------------------------------------------------------------------
+# `python expense_db.py check-plans` runs EXPLAIN QUERY PLAN on the SQL the
+# per-render helpers run (the same constants, with sample parameters), so the
+# check follows the helpers. Each must be served by an index with no full scan
+# or temp sort; search ranks every match, so its sort by score is expected.
+HOT_QUERIES = {
+    # name: (sql, params, sorts)
+    "get_total_expenses": (TOTAL_SQL, ["user"], False),
+    "get_category_totals": (CATEGORY_TOTALS_SQL, ["user"], False),
+    "get_daily_totals": (DAILY_TOTALS_SQL, ["user"], False),
+    "get_transactions_page (first)": (PAGE_OLDER_SQL.format(table="transactions", after=""), ["user", 11], False),
+    "get_transactions_page (older)": (PAGE_OLDER_SQL.format(table="transactions", after=PAGE_AFTER),
+                                      ["user", "2026-01-01", 1, 11], False),
+    "get_transactions_page (newer)": (PAGE_NEWER_SQL.format(table="transactions"),
+                                      ["user", "2026-01-01", 1, 11], False),
+    "iter_transactions": (EXPORT_SQL.format(id="", table="transactions", filters="", cond=""), ["user"], False),
+    "iter_transactions (range)": (EXPORT_SQL.format(id="", table="transactions", filters=_filter_sql("a", "b")[0],
+                                                    cond=""), ["user", "2026-01-01", "2026-01-31"], False),
+    "search_transactions": (SEARCH_SQL.format(fts="transactions_fts", table="transactions", filters=""),
+                            [_fts_match("user", [("kfc", False)]), "user", SEARCH_LIMIT], True),
+}
+
+
+def explain_hot_queries(conn):
+    # Returns {name: (plan_lines, uses_index)}; a full scan or temp sort fails the check
+    results = {}
+    for name, (sql, params, sorts) in HOT_QUERIES.items():
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        # An FTS5 MATCH shows as "SCAN <fts> VIRTUAL TABLE INDEX 0:M..."
+        fts_match = [p for p in plan if re.search(r'VIRTUAL TABLE INDEX \d+:M', p)]
+        indexed = ('USING INDEX', 'USING COVERING INDEX', 'USING PRIMARY KEY', 'USING INTEGER PRIMARY KEY')
+        ok = (fts_match or any(k in p for p in plan for k in indexed)) and \
+            not any((p.startswith('SCAN') and p not in fts_match) or ('TEMP B-TREE' in p and not sorts)
+                    for p in plan)
+        results[name] = (plan, ok)
+    return results
+
+
+# --------------------------------------------------------------------------------
+# ROLLUP CONSISTENCY CHECK
+# --------------------------------------------------------------------------------
+# Each rollup table: (name, key columns, the same keys computed from transactions)
+ROLLUP_TABLES = (
+    ("spend_rollups", "category, month", "category, substr(date, 1, 7)"),
+    ("spend_daily", "day, category", "substr(date, 1, 10), category"),
+)
+
+def check_rollups(conn, repair=False):
+    # Rebuilds the rollups from raw rows (hot and archived) and returns the differences as
+    # (table, username, key1, key2, expected_total, stored_total). With
+    # repair=True each differing table is replaced by the rebuilt rows in one
+    # transaction.
+    diffs = []
+    for table, columns, keys in ROLLUP_TABLES:
+        expected = {}
+        for source in _sources(conn):
+            for u, a, b, t, n in conn.execute(
+                    f'SELECT username, {keys}, SUM(amount), COUNT(*) FROM {source} GROUP BY username, {keys}'):
+                total, count = expected.get((u, a, b), (0.0, 0))
+                expected[(u, a, b)] = (total + t, count + n)
+        stored = {(u, a, b): (t, n) for u, a, b, t, n in conn.execute(
+            f'SELECT username, {columns}, total, tx_count FROM {table}')}
+        table_diffs = []
+        for key in sorted(set(expected) | set(stored), key=lambda k: tuple(str(x) for x in k)):
+            exp_total, exp_count = expected.get(key, (0.0, 0))
+            got_total, got_count = stored.get(key, (0.0, 0))
+            if exp_count != got_count or abs((exp_total or 0) - (got_total or 0)) > 1e-6:
+                table_diffs.append((table,) + key + (exp_total, got_total))
+        if repair and table_diffs:
+            with conn:
+                conn.execute(f'DELETE FROM {table}')
+                conn.executemany(f'INSERT INTO {table} (username, {columns}, total, tx_count) VALUES (?,?,?,?,?)',
+                                 [k + v for k, v in expected.items()])
+            for username in {d[1] for d in table_diffs}:
+                cache.invalidate(username, *SPEND_CACHE_KEYS)
+        diffs += table_diffs
+    return diffs
+
+
+# --------------------------------------------------------------------------------
+# BACKEND CHECK
+# --------------------------------------------------------------------------------
+# `python expense_db.py check-backends` runs the same checks of the write and
+# read helpers (register/login, profile, single and bulk expenses, totals,
+# pages, export, search, budget level, rollups) against a scratch SQLite file
+# and, when one is reachable, a PostgreSQL instance (CHECK_DB_URL, by default
+# the local server). Postgres runs in a throwaway schema that is dropped
+# afterwards; it is reported as SKIP if the driver or server is missing.
+CHECK_DB_URL = os.getenv("EXPENSE_CHECK_DB_URL", "postgresql+psycopg2:///postgres")
+
+def check_backend(backend):
+    # Returns [(check, ok, detail)]. The helpers use `backend` (an empty scratch
+    # database) for the duration of the call
+    global _backend, _migrated, ARCHIVE_PATH, _partitions
+    saved = _backend, _migrated, ARCHIVE_PATH, _partitions
+    _backend, _migrated, _partitions = backend, False, (None, [])
+    ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), f".check-{os.getpid()}-no-archive.db")
+    cache.clear()
+    results = []
+
+    def check(name, got, expected):
+        results.append((name, got == expected, f"got {got!r}, expected {expected!r}"))
+
+    user = "check-user"
+    try:
+        init_db()
+        check("register", register_user_db(user, "pw", "Check User", "c@example.com", "+910000000000", "₹ INR", 1000),
+              True)
+        check("register duplicate", register_user_db(user, "pw", "Again", "c@example.com", "", "₹ INR", 0), False)
+        check("login", login_user_db(user, "pw")[0], user)
+        check("login wrong password", login_user_db(user, "nope"), None)
+        save_profile_db((user, "Job", 50000, 40000, 1000, 5000, 0, 0, ""))
+        check("profile limit", get_profile_db(user)[4], 1000)
+        add_expense_db(user, "KFC meal", 300, "Food & Beverages", "2026-01-05")
+        add_expenses_bulk(user, [("Uber ride", 200, "Travel", "2026-01-06"),
+                                 ("Electricity bill", 250, "Bills & Utilities", "2026-02-01")])
+        check("total", get_total_expenses(user), 750)
+        totals = get_category_totals(user)
+        check("category totals", dict(zip(totals["category"], totals["amount"])),
+              {"Food & Beverages": 300, "Travel": 200, "Bills & Utilities": 250})
+        first, has_older, has_newer = get_transactions_page(user, page_size=2)
+        check("first page", (list(first["name"]), has_older, has_newer), (["Electricity bill", "Uber ride"], True, False))
+        older, has_older, has_newer = get_transactions_page(
+            user, after=(first["date"].iloc[-1], int(first["id"].iloc[-1])), page_size=2)
+        check("older page", (list(older["name"]), has_older, has_newer), (["KFC meal"], False, True))
+        check("export", [row[1] for rows in iter_transactions(user, start="2026-01-01", end="2026-01-31")
+                         for row in rows], ["Uber ride", "KFC meal"])
+        check("search", list(search_transactions(user, "kfc")["name"]), ["KFC meal"])
+        check("budget level (earlier months only)", get_budget_status(user)[1], 0)
+        add_expense_db(user, "Groceries", 800, "Groceries", datetime.now().strftime("%Y-%m-%d"))
+        check("budget level (this month)", get_budget_status(user)[1], 75)
+        with backend.connection() as conn:
+            check("rollups", check_rollups(conn), [])
+    except Exception as e:
+        results.append(("error", False, f"{type(e).__name__}: {e}"))
+    finally:
+        _backend, _migrated, ARCHIVE_PATH, _partitions = saved
+        cache.clear()
+    return results
+
+def _postgres_check_backend(dsn):
+    # (backend in a fresh schema, drop function), or (None, reason) if no
+    # server or driver is available
+    try:
+        from sqlalchemy import create_engine
+        schema = f"expense_check_{os.getpid()}"
+        admin = create_engine(dsn)
+        with admin.begin() as conn:
+            conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    except Exception as e:
+        return None, f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+    separator = "&" if "?" in dsn else "?"
+    backend = create_backend(None, f"{dsn}{separator}options=-csearch_path%3D{schema}")
+
+    def drop():
+        backend.close()
+        with admin.begin() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA {schema} CASCADE")
+        admin.dispose()
+    return backend, drop
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Expense tracker database tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="apply pending schema migrations")
+    sub.add_parser("check-plans", help="fail if a hot query does not use an index")
+    backends = sub.add_parser("check-backends", help="run the storage checks on SQLite and, if reachable, PostgreSQL")
+    backends.add_argument("--postgres", default=CHECK_DB_URL, help="PostgreSQL DSN (default: EXPENSE_CHECK_DB_URL)")
+    rollups = sub.add_parser("check-rollups", help="rebuild rollups from raw rows and report differences")
+    rollups.add_argument("--repair", action="store_true", help="replace the stored rollups with the rebuilt ones")
+    sub.add_parser("optimize-search", help="merge the transaction search index after large imports")
+    archive = sub.add_parser("archive", help=f"move transactions older than the last {HOT_MONTHS} months "
+                                             f"to {ARCHIVE_PATH}")
+    archive.add_argument("--before", help='first month to keep hot, "YYYY-MM" (default: from EXPENSE_HOT_MONTHS)')
+    archive.add_argument("--vacuum", action="store_true", help="then VACUUM the main database to free the space")
+    args = parser.parse_args()
+
+    if args.command == "check-backends":
+        failed = False
+        with tempfile.TemporaryDirectory() as tmp:
+            runs = [("sqlite", create_backend(os.path.join(tmp, "check.db")), None)]
+            backend, drop = _postgres_check_backend(args.postgres)
+            if backend is None:
+                print(f"SKIP postgresql: not available ({drop})")
+            else:
+                runs.append(("postgresql", backend, drop))
+            for name, backend, cleanup in runs:
+                try:
+                    for check, ok, detail in check_backend(backend):
+                        print(f"{'OK  ' if ok else 'FAIL'} {name} {check}" + ("" if ok else f": {detail}"))
+                        failed = failed or not ok
+                finally:
+                    cleanup() if cleanup else backend.close()
+        sys.exit(1 if failed else 0)
+
+    with get_backend().connection() as conn:
+        if args.command == "migrate":
+            applied = migrate(conn)
+            print(f"Applied migrations: {applied or 'none'} (schema version {schema_version(conn)})")
+        elif args.command == "check-plans":
+            if get_backend().dialect != "sqlite":
+                sys.exit("check-plans reads SQLite's EXPLAIN QUERY PLAN; run it against the SQLite file")
+            migrate(conn)
+            failed = False
+            for name, (plan, ok) in explain_hot_queries(conn).items():
+                print(f"{'OK  ' if ok else 'FAIL'} {name}: {' | '.join(plan)}")
+                failed = failed or not ok
+            sys.exit(1 if failed else 0)
+        elif args.command == "check-rollups":
+            migrate(conn)
+            diffs = check_rollups(conn, repair=args.repair)
+            for table, username, key1, key2, expected, stored in diffs:
+                print(f"{table}: {username} | {key1} | {key2}: expected {expected}, stored {stored}")
+            print(f"{len(diffs)} rollup rows differ" + (" (repaired)" if diffs and args.repair else ""))
+            sys.exit(1 if diffs and not args.repair else 0)
+        elif args.command == "optimize-search":
+            migrate(conn)
+            optimize_search_index(conn)
+            print("Search index optimized")
+        elif args.command == "archive":
+            if get_backend().dialect != "sqlite":
+                sys.exit("archive moves rows into a SQLite file; partition the table on the server instead")
+            if args.before and not MONTH.match(args.before):
+                sys.exit('--before must be a month, "YYYY-MM"')
+            migrate(conn)
+            moved = archive_transactions(args.before)
+            for month, count in sorted(moved.items()):
+                print(f"{month}: {count} transactions archived")
+            print(f"{sum(moved.values())} transactions moved to {ARCHIVE_PATH}")
+            if args.vacuum:
+                optimize_search_index(conn)
+                conn.execute("VACUUM")
+                print("Main database compacted")
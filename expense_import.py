@@ -0,0 +1,233 @@
+import csv
+import io
+import re
+from datetime import datetime
+
+from expense_db import add_expenses_bulk
+
+# --------------------------------------------------------------------------------
+# BULK IMPORT (CSV / BANK STATEMENTS)
+# --------------------------------------------------------------------------------
+# An uploaded file is read row by row: mapped columns -> validated values ->
+# category normalized against MAIN_CATEGORIES. Good rows are written in large
+# batches (one executemany + rollup update per transaction); bad rows are
+# reported back with their line number and reason.
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_REJECTS = 10000
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%d %b %Y", "%d-%b-%Y",
+                "%d %B %Y", "%d/%m/%y", "%d-%m-%y", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S")
+
+# Header names we recognise for each field (lower-case, compared after stripping)
+COLUMN_ALIASES = {
+    "date": ("date", "transaction date", "txn date", "value date", "posting date"),
+    "name": ("name", "description", "narration", "particulars", "details", "remarks", "item", "merchant"),
+    "amount": ("amount", "amt", "value", "transaction amount"),
+    "debit": ("debit", "withdrawal", "withdrawal amt.", "withdrawal amount", "debit amount", "dr"),
+    "category": ("category", "main category", "type"),
+}
+
+# Keywords that map free-text categories/descriptions onto a main category.
+# Matched as whole words (an optional plural "s" allowed), so "bus" does not
+# match "business" nor "ola" "chocolate"
+CATEGORY_KEYWORDS = {
+    "Food & Beverages": ("food", "restaurant", "cafe", "swiggy", "zomato", "dining", "meal", "drink"),
+    "Travel": ("travel", "uber", "ola", "fuel", "petrol", "bus", "train", "flight", "taxi", "metro"),
+    "Bills & Utilities": ("bill", "utility", "utilities", "electricity", "water", "gas", "internet", "mobile",
+                          "recharge"),
+    "Shopping": ("shopping", "amazon", "flipkart", "myntra", "clothes", "apparel"),
+    "Groceries": ("grocer", "grocery", "groceries", "ration", "supermarket", "bigbasket", "blinkit", "vegetable"),
+    "Entertainment": ("entertainment", "movie", "netflix", "spotify", "game", "concert"),
+    "Health & Fitness": ("health", "fitness", "medical", "pharmacy", "doctor", "gym", "hospital"),
+    "Education": ("education", "school", "college", "course", "tuition", "book"),
+    "Rent & EMIs": ("rent", "emi", "loan", "mortgage"),
+    "Personal Care": ("personal", "salon", "spa", "cosmetic", "grooming"),
+    "Savings & Investments": ("saving", "investment", "mutual fund", "sip", "stock", "deposit"),
+    "Miscellaneous": ("misc", "miscellaneous", "other"),
+}
+
+
+def clean_category(label):
+    # "1. Food & Beverages (खाना–पीना)" -> "Food & Beverages"
+    try:
+        return label.split(". ")[1].split(" (")[0].strip()
+    except IndexError:
+        return label
+
+
+def guess_mapping(header):
+    # {field: column name or None} from a CSV header row
+    normalized = {h.strip().lower(): h for h in header}
+    return {field: next((normalized[a] for a in aliases if a in normalized), None)
+            for field, aliases in COLUMN_ALIASES.items()}
+
+
+class CategoryNormalizer:
+    def __init__(self, main_categories, unknown="Miscellaneous"):
+        self.clean = [clean_category(c) for c in main_categories]
+        self.unknown = unknown
+        self._lookup = {}
+        for label, clean in zip(main_categories, self.clean):
+            number = label.split(".")[0].strip()
+            for key in (label, clean, number):
+                self._lookup[key.strip().lower()] = clean
+        self._memo = {}
+        self._names = [(clean, re.compile(r"(?<!\w)%s(?!\w)" % re.escape(clean.lower()))) for clean in self.clean]
+        self._keywords = [(clean, re.compile(r"\b(?:%s)s?\b" % "|".join(re.escape(k) for k in keywords)))
+                          for clean, keywords in CATEGORY_KEYWORDS.items() if clean in self.clean]
+
+    def __call__(self, value, description=""):
+        # Returns a clean main category, or None if nothing matches and unknown is None
+        key = (value or "").strip().lower()
+        if not key:
+            # No category given: go by the description
+            return self._match(description.lower())
+        if key in self._lookup:
+            return self._lookup[key]
+        if key not in self._memo:
+            self._memo[key] = self._match(key)
+        return self._memo[key]
+
+    def _match(self, text):
+        for clean, pattern in self._names:
+            if pattern.search(text):
+                return clean
+        for clean, pattern in self._keywords:
+            if pattern.search(text):
+                return clean
+        return self.unknown
+
+
+class DateParser:
+    # Without a date_format, the first format in DATE_FORMATS that parses the
+    # file's first date is used for every row: a file has one format, and
+    # trying others per row would read "03/04/2024" day-first but "12/25/2024"
+    # month-first. Dates not in that format are rejected.
+    def __init__(self, date_format=None):
+        self.format = date_format
+        self._seen = {}
+
+    def __call__(self, value):
+        value = value.strip()
+        # A statement has few distinct dates; strptime is the slow part
+        if value in self._seen:
+            return self._seen[value]
+        for fmt in (self.format,) if self.format else DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            self.format = fmt
+            if len(self._seen) < 100000:
+                self._seen[value] = parsed.strftime("%Y-%m-%d")
+            return parsed.strftime("%Y-%m-%d")
+        if self.format:
+            raise ValueError(f"date '{value}' is not in this file's format ({self.format}); "
+                             f"pick the date format if it was guessed wrong")
+        raise ValueError(f"unrecognised date '{value}'")
+
+
+def parse_amount(value):
+    # "₹1,234.50", "(250.00)", "-99" -> float (sign kept); a "Dr" suffix is a
+    # debit (negative) and "Cr" a credit (positive): "1234.50 Dr" -> -1234.5
+    text = (value or "").strip()
+    if not text:
+        return None
+    suffix = re.search(r"\s*(?<![a-z])(dr|cr)\.?$", text, re.IGNORECASE)
+    if suffix:
+        text = text[:suffix.start()].strip()
+        negative = suffix.group(1).lower() == "dr"
+    else:
+        negative = text.startswith("(") and text.endswith(")") or text.startswith("-")
+    number = re.sub(r"[^\d.]", "", text)
+    if not number or number.count(".") > 1:
+        raise ValueError(f"invalid amount '{value}'")
+    amount = float(number)
+    return -amount if negative else amount
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.rejects = []  # (line number, reason, raw row), capped at MAX_REPORTED_REJECTS
+
+    def reject(self, line_no, reason, row):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append((line_no, reason, row))
+
+
+def iter_csv_rows(fileobj, encoding="utf-8-sig"):
+    # Accepts a binary (uploaded file) or text file; yields (line_no, dict)
+    wrapped = isinstance(fileobj.read(0), bytes)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline="") if wrapped else fileobj
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    finally:
+        if wrapped:
+            text.detach()  # leave the caller's file open
+
+
+def read_csv_header(fileobj, encoding="utf-8-sig"):
+    rows = iter_csv_rows(fileobj, encoding)
+    try:
+        _, first = next(rows)
+        header = list(first.keys())
+    except StopIteration:
+        header = []
+    rows.close()
+    fileobj.seek(0)
+    return header
+
+
+def import_expenses(username, rows, mapping, main_categories, date_format=None, negative_is_expense=False,
+                    unknown_category="Miscellaneous", batch_size=IMPORT_BATCH_SIZE):
+    # rows: iterable of (line_no, {column: value}) e.g. from iter_csv_rows().
+    # mapping: {"date", "name", "amount" or "debit", "category" (optional)} -> column.
+    # negative_is_expense: signed bank statements where spends are negative and
+    # credits positive (credits are skipped). Otherwise amounts must be positive.
+    result = ImportResult()
+    parse_date = DateParser(date_format)
+    normalize = CategoryNormalizer(main_categories, unknown_category)
+    batch = []
+    for line_no, row in rows:
+        try:
+            name = (row.get(mapping["name"]) or "").strip()
+            if not name:
+                raise ValueError("missing description")
+            date = parse_date(row.get(mapping["date"]) or "")
+            if mapping.get("debit"):
+                amount = parse_amount(row.get(mapping["debit"]))
+                if not amount:
+                    result.skipped += 1  # credit row
+                    continue
+                amount = abs(amount)
+            else:
+                amount = parse_amount(row.get(mapping["amount"]))
+                if amount is None:
+                    raise ValueError("missing amount")
+                if negative_is_expense:
+                    if amount >= 0:
+                        result.skipped += 1
+                        continue
+                    amount = -amount
+            if amount <= 0:
+                raise ValueError("amount must be greater than zero")
+            category = normalize(row.get(mapping["category"]) if mapping.get("category") else "", name)
+            if category is None:
+                raise ValueError(f"unknown category '{row.get(mapping['category'])}'")
+        except (ValueError, KeyError, TypeError) as e:
+            result.reject(line_no, str(e), row)
+            continue
+        batch.append((name, amount, category, date))
+        if len(batch) >= batch_size:
+            result.imported += add_expenses_bulk(username, batch)
+            batch = []
+    if batch:
+        result.imported += add_expenses_bulk(username, batch)
+    return result
@@ -0,0 +1,144 @@
+import argparse
+import os
+from datetime import date, datetime
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from expense_db import EXPORT_CHUNK_SIZE, get_backend, iter_transactions
+
+# --------------------------------------------------------------------------------
+# COLUMNAR SNAPSHOTS (PARQUET)
+# --------------------------------------------------------------------------------
+# A snapshot is one Parquet file with the transactions of one user, or of every
+# user, streamed from the database in EXPORT_CHUNK_SIZE batches (archived
+# months included, see iter_transactions) and written in row groups of
+# SNAPSHOT_ROW_GROUP rows. Unlike the CSV export it keeps types: date is a
+# date, amount a float, and category (and username) are dictionary columns,
+# stored once per row group and loaded as pandas Categoricals.
+#
+# Rows are written newest first per user, so each row group covers a narrow
+# date range and its min/max statistics let read_snapshot() skip row groups
+# outside the requested dates without decompressing them; only the requested
+# columns are read at all. A snapshot is a point-in-time copy: it is written
+# to a temporary file and renamed into place, and is not updated by later
+# writes. Needs pyarrow (requirements.txt).
+#
+#   python expense_snapshot.py                  # every user -> snapshots/all.parquet
+#   python expense_snapshot.py --user alice     # one user  -> snapshots/users/alice.parquet
+
+SNAPSHOT_DIR = os.getenv("EXPENSE_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_ROW_GROUP = 64 * 1024
+SNAPSHOT_COMPRESSION = "zstd"
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("username", pa.dictionary(pa.int32(), pa.string())),
+    ("date", pa.date32()),
+    ("name", pa.string()),
+    ("category", pa.dictionary(pa.int32(), pa.string())),
+    ("amount", pa.float64()),
+])
+
+
+def snapshot_path(username=None):
+    # snapshots/users/<username>.parquet, or snapshots/all.parquet for every
+    # user. Usernames are quoted (no "/") and kept in their own directory, so
+    # no username can name the all-users file
+    if username:
+        return os.path.join(SNAPSHOT_DIR, "users", f"{quote(username, safe='')}.parquet")
+    return os.path.join(SNAPSHOT_DIR, "all.parquet")
+
+
+def _batch(username, rows):
+    # iter_transactions rows (date, name, category, amount) -> RecordBatch.
+    # A date that is not YYYY-MM-DD becomes null rather than failing the export
+    dates, names, categories, amounts = zip(*rows)
+    parsed = pc.strptime(pa.array(dates, pa.string()), format="%Y-%m-%d", unit="s", error_is_null=True)
+    return pa.RecordBatch.from_arrays([
+        pa.DictionaryArray.from_arrays(pa.array([0] * len(rows), pa.int32()), pa.array([username], pa.string())),
+        parsed.cast(pa.date32()),
+        pa.array(names, pa.string()),
+        pa.array(categories, pa.string()).dictionary_encode(),
+        pa.array(amounts, pa.float64()),
+    ], schema=SNAPSHOT_SCHEMA)
+
+
+def _usernames():
+    with get_backend().connection() as conn:
+        return [row[0] for row in conn.execute('SELECT username FROM users ORDER BY username')]
+
+
+def write_snapshot(username=None, path=None, chunk_size=EXPORT_CHUNK_SIZE, row_group_size=SNAPSHOT_ROW_GROUP):
+    # Writes the snapshot of `username` (every user if None); returns the number
+    # of transactions written
+    path = path or snapshot_path(username)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    schema = SNAPSHOT_SCHEMA.with_metadata({
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "username": username or "",
+    })
+    tmp_path = f"{path}.tmp"
+    written, pending, pending_rows = 0, [], 0
+    with pq.ParquetWriter(tmp_path, schema, compression=SNAPSHOT_COMPRESSION) as writer:
+        def flush():
+            # Batches carry their own category dictionaries; one per row group
+            writer.write_table(pa.Table.from_batches(pending, schema).unify_dictionaries(),
+                               row_group_size=row_group_size)
+            pending.clear()
+
+        for user in [username] if username else _usernames():
+            for rows in iter_transactions(user, chunk_size=chunk_size):
+                pending.append(_batch(user, rows))
+                pending_rows += len(rows)
+                written += len(rows)
+                if pending_rows >= row_group_size:
+                    flush()
+                    pending_rows = 0
+        if pending:
+            flush()
+    os.replace(tmp_path, path)
+    return written
+
+
+def snapshot_info(path):
+    # {"created_at", "rows", "size", "mtime"} from the file footer; None if there
+    # is no readable snapshot
+    try:
+        meta = pq.read_metadata(path)
+        stat = os.stat(path)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    extra = meta.metadata or {}
+    return {
+        "created_at": extra.get(b"created_at", b"").decode(),
+        "rows": meta.num_rows,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+
+
+def read_snapshot(path, columns=None, start=None, end=None, username=None):
+    # DataFrame of `columns` (all if None) for dates in [start, end] (inclusive
+    # "YYYY-MM-DD" or date). Row groups outside the range are skipped
+    filters = []
+    if start:
+        filters.append(("date", ">=", date.fromisoformat(str(start)[:10])))
+    if end:
+        filters.append(("date", "<=", date.fromisoformat(str(end)[:10])))
+    if username:
+        filters.append(("username", "=", username))
+    table = pq.read_table(path, columns=columns, filters=filters or None)
+    return table.to_pandas(date_as_object=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a Parquet snapshot of transactions")
+    parser.add_argument("--user", help="one user's transactions (default: every user)")
+    parser.add_argument("--out", help=f"output file (default: under {SNAPSHOT_DIR}/)")
+    args = parser.parse_args()
+
+    path = args.out or snapshot_path(args.user)
+    rows = write_snapshot(args.user, path)
+    print(f"{rows} transactions written to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
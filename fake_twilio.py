@@ -0,0 +1,151 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# --------------------------------------------------------------------------------
+# Local stand-in for the Twilio Messages API
+# --------------------------------------------------------------------------------
+# Run:  python fake_twilio.py --port 8099
+# Then: TWILIO_API_BASE=http://127.0.0.1:8099 streamlit run app.py
+#
+# For load tests it can behave like a slow or struggling API:
+#   --latency-ms 150 --jitter-ms 50   delay every response
+#   --error-rate 0.05                 answer that fraction of sends with 500
+#   --rate-limit 10                   allow 10 sends/second, then 429 + Retry-After
+
+MESSAGES_PATH = re.compile(r"^/2010-04-01/Accounts/([^/]+)/Messages(?:/([^/]+))?\.json$")
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        server = self.server
+        if server.latency_ms or server.jitter_ms:
+            with server.lock:
+                jitter = server.rng.uniform(-server.jitter_ms, server.jitter_ms)
+            time.sleep(max(0.0, server.latency_ms + jitter) / 1000)
+
+    def _rejected(self):
+        # 429 when over the rate limit, 500 for the configured error fraction
+        server = self.server
+        with server.lock:
+            if server.rate_limit:
+                now = time.monotonic()
+                server.tokens = min(server.rate_limit, server.tokens + (now - server.refilled_at) * server.rate_limit)
+                server.refilled_at = now
+                if server.tokens < 1:
+                    server.stats["rate_limited"] += 1
+                    return 429
+                server.tokens -= 1
+            if server.error_rate and server.rng.random() < server.error_rate:
+                server.stats["errors"] += 1
+                return 500
+        return None
+
+    def do_POST(self):
+        match = MESSAGES_PATH.match(self.path)
+        if not match or match.group(2):
+            self._send_json(404, {"code": 20404, "message": "Not found", "status": 404})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        self._delay()
+        rejected = self._rejected()
+        if rejected == 429:
+            self._send_json(429, {"code": 20429, "message": "Too Many Requests", "status": 429}, {"Retry-After": "1"})
+            return
+        if rejected == 500:
+            self._send_json(500, {"code": 20500, "message": "Internal Server Error", "status": 500})
+            return
+        message = {
+            "sid": "SM" + uuid.uuid4().hex,
+            "account_sid": match.group(1),
+            "from": form.get("From"),
+            "to": form.get("To"),
+            "body": form.get("Body"),
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+            "date_created": formatdate(usegmt=True),
+            "date_updated": formatdate(usegmt=True),
+        }
+        with self.server.lock:
+            self.server.messages.append(message)
+            self.server.stats["accepted"] += 1
+        self._send_json(201, message)
+
+    def do_GET(self):
+        match = MESSAGES_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"code": 20404, "message": "Not found", "status": 404})
+            return
+        with self.server.lock:
+            if match.group(2):
+                found = [m for m in self.server.messages if m["sid"] == match.group(2)]
+                if not found:
+                    self._send_json(404, {"code": 20404, "message": "Not found", "status": 404})
+                    return
+                self._send_json(200, found[0])
+            else:
+                self._send_json(200, {"messages": list(self.server.messages)})
+
+
+def start_fake_twilio(host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit=0.0,
+                      seed=None):
+    # Starts the server on a background thread; port=0 picks a free port.
+    # rate_limit is sends per second (0: unlimited); server.stats counts
+    # accepted, errors and rate_limited sends
+    server = ThreadingHTTPServer((host, port), FakeTwilioHandler)
+    server.daemon_threads = True
+    server.messages = []
+    server.lock = threading.Lock()
+    server.latency_ms = latency_ms
+    server.jitter_ms = jitter_ms
+    server.error_rate = error_rate
+    server.rate_limit = rate_limit
+    server.tokens = rate_limit
+    server.refilled_at = time.monotonic()
+    server.rng = random.Random(seed)
+    server.stats = {"accepted": 0, "errors": 0, "rate_limited": 0}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Twilio Messages API for offline testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before each response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- variation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of sends answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="sends per second before 429 (0: no limit)")
+    parser.add_argument("--seed", type=int, help="seed for latency jitter and errors")
+    args = parser.parse_args()
+    server = start_fake_twilio(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                               args.rate_limit, args.seed)
+    print(f"Fake Twilio listening on {server.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,492 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# --------------------------------------------------------------------------------
+# Append-only order log with an on-disk index
+# --------------------------------------------------------------------------------
+# Orders are appended to `orders.log` as one JSON object per line and never
+# rewritten. A small SQLite index (`orders.idx`) maps order id, timestamp, phone
+# and name to the byte offset of each record, so lookups are B-tree seeks and a
+# time-range scan starts right at the first order in the window.
+#
+# Writes from concurrent sessions should go through OrderWriter (below), which
+# batches them into one fsync'd write.
+#
+# Record fields: order_id, timestamp ("%Y-%m-%d %H:%M:%S"), name, phone, address,
+# special_notes, items ([{"name", "qty", "price"}]), total, and fingerprint
+# (order_fingerprint(), for duplicate detection).
+
+ORDER_LOG = "orders.log"
+ORDER_INDEX = "orders.idx"
+LEGACY_ORDERS_TXT = "customer_orders.txt"
+
+
+def normalize_phone(phone):
+    return re.sub(r"\D", "", phone or "")
+
+
+def order_fingerprint(record):
+    # Hash of what was ordered, by whom and where to: the same order typed or
+    # resubmitted again gives the same fingerprint (case, spacing and phone
+    # formatting aside)
+    def norm(value):
+        return " ".join(str(value or "").split()).lower()
+    items = sorted((item["name"], int(item["qty"])) for item in record.get("items", []) if item["qty"] > 0)
+    canonical = json.dumps([norm(record.get("name")), normalize_phone(record.get("phone")),
+                            norm(record.get("address")), norm(record.get("special_notes")), items,
+                            record.get("total")], ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def new_order_id(timestamp, fingerprint=None):
+    # "<yymmddHHMMSS>-<10 hex>": from the fingerprint when given (so the same
+    # order at the same time always gets the same id), else random
+    compact = re.sub(r"\D", "", timestamp)[2:]
+    return f"{compact}-{fingerprint[:10] if fingerprint else uuid.uuid4().hex[:10]}"
+
+
+class OrderStore:
+    def __init__(self, log_path=ORDER_LOG, index_path=ORDER_INDEX):
+        self.log_path = log_path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tail_checked = False
+        self._init_index()
+        self.catch_up()
+
+    # --- index ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_index(self):
+        with self._conn() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS orders
+                            (order_id TEXT PRIMARY KEY, ts TEXT, phone TEXT, name_key TEXT,
+                             offset INTEGER, length INTEGER)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS orders_ts ON orders (ts)')
+            conn.execute('CREATE INDEX IF NOT EXISTS orders_phone ON orders (phone, ts)')
+            conn.execute('CREATE INDEX IF NOT EXISTS orders_name ON orders (name_key, ts)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)')
+            # Added with duplicate detection; older rows have no fingerprint
+            if 'fingerprint' not in [r[1] for r in conn.execute('PRAGMA table_info(orders)')]:
+                conn.execute('ALTER TABLE orders ADD COLUMN fingerprint TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS orders_fingerprint ON orders (fingerprint, ts)')
+
+    def _indexed_upto(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'indexed_upto'").fetchone()
+        return row[0] if row else 0
+
+    def _index_rows(self, conn, rows, end_offset):
+        conn.executemany('INSERT OR REPLACE INTO orders (order_id, ts, phone, name_key, offset, length, fingerprint) '
+                         'VALUES (?,?,?,?,?,?,?)', rows)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('indexed_upto', ?)", (end_offset,))
+
+    @staticmethod
+    def _index_row(record, offset, length):
+        return (record["order_id"], record["timestamp"], normalize_phone(record.get("phone")),
+                (record.get("name") or "").strip().lower(), offset, length, record.get("fingerprint"))
+
+    def catch_up(self):
+        # Index any records appended after the index was last updated (crash, copied log, ...)
+        if not os.path.exists(self.log_path):
+            return 0
+        with self._lock, self._conn() as conn:
+            offset = self._indexed_upto(conn)
+            rows = []
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write, cut off by the first append (_drop_torn_tail)
+                    try:
+                        rows.append(self._index_row(json.loads(line), offset, len(line)))
+                    except (ValueError, KeyError):
+                        pass
+                    offset += len(line)
+            self._index_rows(conn, rows, offset)
+        return len(rows)
+
+    # --- writes ---
+    def _drop_torn_tail(self, f):
+        # A crash mid-write can leave a final line without its "\n"; appending
+        # after it would run two records together. Cut the log back to the end
+        # of its last complete line (that record was never acknowledged)
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 65536)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            if pos == end and chunk.endswith(b"\n"):
+                return
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+    def _encode(self, record):
+        record = dict(record)
+        record.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        record.setdefault("order_id", new_order_id(record["timestamp"]))
+        return record, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def append(self, record):
+        return self.append_batch([record])[0]
+
+    def append_batch(self, records):
+        # One write and one fsync for the whole batch, then one index transaction
+        encoded = [self._encode(r) for r in records]
+        with self._lock:
+            if not self._tail_checked:
+                if os.path.exists(self.log_path):
+                    with open(self.log_path, "r+b") as f:
+                        self._drop_torn_tail(f)
+                self._tail_checked = True
+            with open(self.log_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(b"".join(line for _, line in encoded))
+                f.flush()
+                os.fsync(f.fileno())
+            rows = []
+            for record, line in encoded:
+                rows.append(self._index_row(record, offset, len(line)))
+                offset += len(line)
+            with self._conn() as conn:
+                self._index_rows(conn, rows, offset)
+        return [record["order_id"] for record, _ in encoded]
+
+    # --- reads ---
+    def _read(self, rows):
+        if not rows:
+            return []  # the log may not exist yet
+        records = []
+        with open(self.log_path, "rb") as f:
+            for offset, length in rows:
+                f.seek(offset)
+                records.append(json.loads(f.read(length)))
+        return records
+
+    def get(self, order_id):
+        rows = self._conn().execute('SELECT offset, length FROM orders WHERE order_id = ?', (order_id,)).fetchall()
+        records = self._read(rows)
+        return records[0] if records else None
+
+    def find_by_phone(self, phone):
+        rows = self._conn().execute('SELECT offset, length FROM orders WHERE phone = ? ORDER BY ts',
+                                    (normalize_phone(phone),)).fetchall()
+        return self._read(rows)
+
+    def find_by_name(self, name):
+        rows = self._conn().execute('SELECT offset, length FROM orders WHERE name_key = ? ORDER BY ts',
+                                    (name.strip().lower(),)).fetchall()
+        return self._read(rows)
+
+    def range(self, start=None, end=None, limit=None):
+        # Orders with start <= timestamp < end (timestamps compare as strings)
+        sql, args = 'SELECT offset, length FROM orders WHERE ts >= ?', [start or ""]
+        if end:
+            sql += ' AND ts < ?'
+            args.append(end)
+        sql += ' ORDER BY ts'
+        if limit:
+            sql += ' LIMIT ?'
+            args.append(limit)
+        return self._read(self._conn().execute(sql, args).fetchall())
+
+    def find_by_fingerprint(self, fingerprint, since=None):
+        # Most recent order with this fingerprint placed at or after `since`, or None
+        rows = self._conn().execute('SELECT offset, length FROM orders WHERE fingerprint = ? AND ts >= ? '
+                                    'ORDER BY ts DESC LIMIT 1', (fingerprint, since or "")).fetchall()
+        records = self._read(rows)
+        return records[0] if records else None
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+
+
+# --------------------------------------------------------------------------------
+# Group-commit writer
+# --------------------------------------------------------------------------------
+# All sessions hand orders to one writer thread over a queue. The writer takes
+# whatever has queued up (up to `max_batch`) and commits it with append_batch(),
+# so concurrent orders share a single write + fsync. submit() returns only after
+# the batch holding the order is on disk. If it times out, the order is taken
+# out of the queue first, so a TimeoutError means it was not and will not be
+# written; once the writer has picked an order up, submit() waits for its batch
+# whatever the timeout.
+
+class _PendingOrder:
+    def __init__(self, record):
+        self.record = record
+        self.done = threading.Event()
+        self.order_id = None
+        self.error = None
+        self.claimed = False    # picked up by the writer
+        self.cancelled = False  # given up by submit() before that
+
+
+class OrderWriter:
+    def __init__(self, store, max_batch=256, linger=0.0):
+        self.store = store
+        self.max_batch = max_batch
+        self.linger = linger  # optional extra wait to let a batch fill up
+        self._queue = queue.Queue()
+        self._claim_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record, timeout=30):
+        pending = _PendingOrder(record)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            with self._claim_lock:
+                if not pending.claimed:
+                    pending.cancelled = True
+                    raise TimeoutError("Order was not committed in time")
+            pending.done.wait()  # already being written
+        if pending.error:
+            raise pending.error
+        return pending.order_id
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            if self.linger:
+                time.sleep(self.linger)
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        with self._claim_lock:
+            batch = [p for p in batch if not p.cancelled]
+            for p in batch:
+                p.claimed = True
+        if not batch:
+            return
+        try:
+            order_ids = self.store.append_batch([p.record for p in batch])
+        except Exception as e:
+            for p in batch:
+                p.error = e
+                p.done.set()
+            return
+        for p, order_id in zip(batch, order_ids):
+            p.order_id = order_id
+            p.done.set()
+
+
+# --------------------------------------------------------------------------------
+# Idempotent submission
+# --------------------------------------------------------------------------------
+# A double-click or a reconnect that resubmits the form must not store or notify
+# an order twice. IdempotencyCache.run(key, place) calls place() once per key
+# within `ttl` seconds and hands every repeat the first call's result; repeats
+# that arrive while place() is still running wait for it. Entries are bounded
+# by count (LRU) and age (TTL) and shared by every session in the process.
+# With a `store`, a key missing from the cache (evicted, or the app restarted)
+# is looked up in the order log by fingerprint before place() runs.
+#
+# place() returns a dict with at least "order_id"; an answer found in the store
+# has only that key.
+
+IDEMPOTENCY_TTL_SECONDS = 300
+IDEMPOTENCY_MAX_ENTRIES = 4096
+
+
+class _Placement:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires_at = None
+
+
+class IdempotencyCache:
+    def __init__(self, store=None, ttl=IDEMPOTENCY_TTL_SECONDS, max_entries=IDEMPOTENCY_MAX_ENTRIES,
+                 clock=time.time):
+        self.store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> _Placement
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def run(self, key, place, timeout=30):
+        # Returns (result, first): first is False for an answer from the cache or store
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (entry.expires_at is None or entry.expires_at > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                owner = False
+            else:
+                entry = self._entries[key] = _Placement()
+                self._entries.move_to_end(key)
+                self.misses += 1
+                owner = True
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        if not owner:
+            if not entry.done.wait(timeout):
+                raise TimeoutError("The same order is still being placed")
+            if entry.error:
+                raise entry.error
+            return entry.result, False
+
+        first = False
+        try:
+            entry.result = self._from_store(key, now)
+            if entry.result is None:
+                entry.result = place()
+                first = True
+        except Exception as e:
+            entry.error = e
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]  # let the next attempt try again
+            raise
+        finally:
+            entry.expires_at = self.clock() + self.ttl
+            entry.done.set()
+        return entry.result, first
+
+    def _from_store(self, key, now):
+        if self.store is None:
+            return None
+        since = (datetime.fromtimestamp(now) - timedelta(seconds=self.ttl)).strftime("%Y-%m-%d %H:%M:%S")
+        record = self.store.find_by_fingerprint(key, since)
+        return {"order_id": record["order_id"]} if record else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# --------------------------------------------------------------------------------
+# One-time migration from customer_orders.txt
+# --------------------------------------------------------------------------------
+ITEM_LINE = re.compile(r"^- (.+): (\d+) pcs$")
+
+
+def parse_text_orders(text):
+    # Parses the blocks app.py used to append: "[ts]\nName: ..\nPhone: ..\nAddress: ..
+    # \nSpecial Notes: ..\nOrder:\n- item: n pcs\nTotal: ₹n". Address and notes may span lines.
+    for block in re.split(r"\n(?=\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\]\n)", text):
+        block = block.strip("\n")
+        header = re.match(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]\n", block)
+        if not header:
+            continue
+        fields = {"timestamp": header.group(1), "name": "", "phone": "", "address": "", "special_notes": "",
+                  "items": [], "total": 0}
+        current = None
+        for line in block[header.end():].split("\n"):
+            for label, key in (("Name: ", "name"), ("Phone: ", "phone"), ("Address: ", "address"),
+                               ("Special Notes: ", "special_notes")):
+                if line.startswith(label):
+                    fields[key], current = line[len(label):], key
+                    break
+            else:
+                if line == "Order:":
+                    current = "items"
+                elif line.startswith("Total: "):
+                    fields["total"] = int(float(re.sub(r"[^\d.]", "", line) or 0))
+                    current = None
+                elif current == "items":
+                    item = ITEM_LINE.match(line)
+                    if item:
+                        fields["items"].append({"name": item.group(1), "qty": int(item.group(2)), "price": None})
+                elif current in ("address", "special_notes"):
+                    fields[current] += "\n" + line
+        yield fields
+
+
+def migrate_text_orders(store, text_path=LEGACY_ORDERS_TXT, prices=None):
+    # Returns the number of orders added. Ids come from the timestamp and the
+    # fingerprint (plus a counter for identical orders in the same second), so
+    # running the migration again finds every order already stored and adds none
+    with open(text_path, encoding="utf-8") as f:
+        text = f.read()
+    records, seen = [], {}
+    for record in parse_text_orders(text):
+        if prices:
+            for item in record["items"]:
+                item["price"] = prices.get(item["name"])
+        record["fingerprint"] = order_fingerprint(record)
+        same = (record["timestamp"], record["fingerprint"])
+        seen[same] = repeat = seen.get(same, -1) + 1
+        key = record["fingerprint"] if not repeat else hashlib.sha256(
+            f"{record['fingerprint']}:{repeat}".encode()).hexdigest()
+        record["order_id"] = new_order_id(record["timestamp"], key)
+        if store.get(record["order_id"]) is None:
+            records.append(record)
+    if records:
+        store.append_batch(records)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order log tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help=f"import a legacy {LEGACY_ORDERS_TXT}")
+    migrate.add_argument("path", nargs="?", default=LEGACY_ORDERS_TXT)
+    find = sub.add_parser("find", help="look up orders")
+    find.add_argument("--id")
+    find.add_argument("--phone")
+    find.add_argument("--name")
+    find.add_argument("--start")
+    find.add_argument("--end")
+    args = parser.parse_args()
+
+    store = OrderStore()
+    if args.command == "migrate":
+        print(f"Migrated {migrate_text_orders(store, args.path)} orders into {store.log_path}")
+    else:
+        if args.id:
+            found = [o for o in [store.get(args.id)] if o]
+        elif args.phone:
+            found = store.find_by_phone(args.phone)
+        elif args.name:
+            found = store.find_by_name(args.name)
+        else:
+            found = store.range(args.start, args.end)
+        for order in found:
+            print(json.dumps(order, ensure_ascii=False))
@@ -0,0 +1,291 @@
+import bisect
+import functools
+import heapq
+import os
+import threading
+import time
+
+# --------------------------------------------------------------------------------
+# TIMED SPANS AND IN-PROCESS HISTOGRAMS
+# --------------------------------------------------------------------------------
+# PERF_TRACE=on turns tracing on for the process (default off). Code marks hot
+# paths with
+#
+#   with span("chart.pie"): ...          # a block
+#   @traced("db.get_total_expenses")     # a function
+#
+# Spans nest per thread: every span is added to its name's latency histogram,
+# and each outermost span (normally one Streamlit rerun) keeps the time spent
+# in its direct children, so the slowest reruns can be broken down. While
+# tracing is off, span() returns a shared no-op context and traced() wrappers
+# call straight through after one attribute check.
+#
+# Export: tracer.prometheus_text() in the Prometheus text format, written to
+# PERF_TRACE_FILE (at most every PERF_TRACE_FILE_INTERVAL seconds) and/or served
+# on http://127.0.0.1:PERF_TRACE_PORT/metrics.
+
+BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SLOWEST_KEEP = 20
+METRIC_NAME = "perf_span_duration_ms"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "started", "children")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.children = {}
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.started) * 1000
+        stack = self.tracer._stack()
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            parent.children[self.name] = parent.children.get(self.name, 0.0) + ms
+        self.tracer._record(self, ms, parent is None)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled=False, slowest_keep=SLOWEST_KEEP):
+        self.enabled = enabled
+        self.slowest_keep = slowest_keep
+        self._histograms = {}
+        self._slowest = []  # min-heap of (ms, seq, name, finished_at, children)
+        self._seq = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_interval = 0.0
+        self._file_written_at = 0.0
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NOOP
+
+    def traced(self, name=None):
+        def decorate(fn):
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _record(self, span, ms, outermost):
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = Histogram()
+            histogram.observe(ms)
+            if outermost:
+                self._seq += 1
+                entry = (ms, self._seq, span.name, time.time(), span.children)
+                if len(self._slowest) < self.slowest_keep:
+                    heapq.heappush(self._slowest, entry)
+                elif ms > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+        if outermost and self._file:
+            self._maybe_write_file()
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slowest.clear()
+
+    def summary(self):
+        # One dict per span name, slowest total time first
+        with self._lock:
+            rows = [{"span": name, "count": h.count, "total_ms": round(h.sum, 2),
+                     "mean_ms": round(h.sum / h.count, 2), "p50_ms": round(h.quantile(0.5), 2),
+                     "p95_ms": round(h.quantile(0.95), 2), "p99_ms": round(h.quantile(0.99), 2),
+                     "max_ms": round(h.max, 2)}
+                    for name, h in self._histograms.items()]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def slowest(self):
+        # Slowest outermost spans, each with its time per direct child and
+        # the part not covered by any child ("self")
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        result = []
+        for ms, _, name, finished_at, children in entries:
+            breakdown = sorted(children.items(), key=lambda c: c[1], reverse=True)
+            breakdown.append(("self", max(0.0, ms - sum(children.values()))))
+            result.append({"span": name, "ms": round(ms, 2), "finished_at": finished_at,
+                           "breakdown": [(child, round(child_ms, 2)) for child, child_ms in breakdown]})
+        return result
+
+    def prometheus_text(self):
+        lines = [f"# HELP {METRIC_NAME} Duration of traced spans in milliseconds.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for name in sorted(self._histograms):
+                h = self._histograms[name]
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, n in zip(h.buckets + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f'{METRIC_NAME}_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_sum{{span="{label}"}} {h.sum:.3f}')
+                lines.append(f'{METRIC_NAME}_count{{span="{label}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        # Written to a temporary file first so scrapers never read half a file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def export_to_file(self, path, interval=10.0):
+        # Rewrite `path` after outermost spans, at most every `interval` seconds
+        self._file = path
+        self._file_interval = interval
+
+    def _maybe_write_file(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._file_written_at < self._file_interval:
+                return
+            self._file_written_at = now
+        self.write_file(self._file)
+
+    def serve(self, port, host="127.0.0.1"):
+        # /metrics endpoint on a background thread; returns the server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="perf-metrics", daemon=True).start()
+        return server
+
+
+tracer = Tracer(enabled=os.getenv("PERF_TRACE", "off") == "on")
+span = tracer.span
+traced = tracer.traced
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    # Starts the file/endpoint exports configured in the environment, once per
+    # process (safe to call on every Streamlit rerun)
+    global _exporters_started
+    if _exporters_started or not tracer.enabled:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if os.getenv("PERF_TRACE_FILE"):
+            tracer.export_to_file(os.getenv("PERF_TRACE_FILE"),
+                                  float(os.getenv("PERF_TRACE_FILE_INTERVAL", "10")))
+        if os.getenv("PERF_TRACE_PORT"):
+            tracer.serve(int(os.getenv("PERF_TRACE_PORT")))
+
+
+def show_perf_panel():
+    # Streamlit panel shared by app.py and ex.py (callers check who may see it)
+    import streamlit as st
+
+    st.subheader("⏱ Performance")
+    if not tracer.enabled:
+        st.info("Tracing is off. Start the app with PERF_TRACE=on to collect timings.")
+        return
+    rows = tracer.summary()
+    if not rows:
+        st.info("No spans recorded yet.")
+        return
+    st.caption("Per span, since the process started or the last reset (percentiles from histogram buckets)")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    st.markdown("##### Slowest reruns")
+    for entry in tracer.slowest()[:10]:
+        when = time.strftime("%H:%M:%S", time.localtime(entry["finished_at"]))
+        with st.expander(f"{entry['span']}: {entry['ms']:.1f} ms at {when}"):
+            st.dataframe([{"Part": part, "ms": ms, "Share": f"{ms / entry['ms']:.0%}" if entry["ms"] else ""}
+                          for part, ms in entry["breakdown"]], use_container_width=True, hide_index=True)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button("Download Prometheus metrics", tracer.prometheus_text(), file_name="perf_metrics.prom",
+                           mime="text/plain", use_container_width=True)
+    with c2:
+        if st.button("Reset timings", use_container_width=True):
+            tracer.reset()
+            st.rerun()
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from order_store import ORDER_LOG, normalize_phone
+
+# --------------------------------------------------------------------------------
+# Live sales figures from the order log
+# --------------------------------------------------------------------------------
+# SalesTail follows orders.log like `tail -f`: it remembers the byte offset it
+# has read up to, and refresh() parses only the records appended since then,
+# adding them to running totals (orders and revenue per hour, quantity and
+# revenue per item, spend per customer). A refresh costs the new records, not
+# the size of the log. A long log is read at most `max_bytes` per refresh, so
+# the page stays responsive while the first refreshes catch up.
+#
+# Hours more than `keep_hours` before the newest order are dropped. A
+# customer's spend only grows, so the top `top_n` customers are kept exactly
+# by checking each updated customer against the smallest of the current top.
+# If the log shrinks or is replaced (a new inode), it is read again from the
+# start.
+
+KEEP_HOURS = 7 * 24
+TOP_CUSTOMERS = 10
+MAX_BYTES_PER_REFRESH = 8 * 1024 * 1024
+
+
+class SalesTail:
+    def __init__(self, log_path=ORDER_LOG, keep_hours=KEEP_HOURS, top_n=TOP_CUSTOMERS,
+                 max_bytes=MAX_BYTES_PER_REFRESH):
+        self.log_path = log_path
+        self.keep_hours = keep_hours
+        self.top_n = top_n
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inode = None
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.size = 0
+        self.orders = 0
+        self.revenue = 0
+        self.skipped = 0  # lines that were not valid JSON
+        self._hours = {}  # "YYYY-MM-DD HH" -> [orders, revenue]
+        self._newest_hour = ""
+        self._items = {}  # item -> [qty, revenue]
+        self._customers = {}  # phone digits (or name) -> [name, phone, orders, spent]
+        self._top = {}  # customer key -> spent, at most top_n
+
+    def refresh(self, prices=None):
+        # Reads what was appended since the last call; `prices` ({item: price})
+        # fills in items recorded without a price. Returns the new order count
+        with self._lock:
+            try:
+                stat = os.stat(self.log_path)
+            except FileNotFoundError:
+                return 0
+            if stat.st_ino != self._inode or stat.st_size < self.offset:
+                self._reset()
+                self._inode = stat.st_ino
+            self.size = stat.st_size
+            if self.size == self.offset:
+                return 0
+            with open(self.log_path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read(self.max_bytes)
+                if b"\n" not in chunk and len(chunk) == self.max_bytes:
+                    chunk += f.readline()  # a single record longer than max_bytes
+            end = chunk.rfind(b"\n") + 1  # a torn final line is read once it is complete
+            added = 0
+            for line in chunk[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    self.skipped += 1
+                    continue
+                self._add(record, prices or {})
+                added += 1
+            self.offset += end
+            return added
+
+    def _add(self, record, prices):
+        total = record.get("total") or 0
+        self.orders += 1
+        self.revenue += total
+
+        hour = (record.get("timestamp") or "")[:13]
+        bucket = self._hours.setdefault(hour, [0, 0])
+        bucket[0] += 1
+        bucket[1] += total
+        if hour > self._newest_hour:
+            self._newest_hour = hour
+            self._drop_old_hours()
+
+        for item in record.get("items", []):
+            price = item.get("price")
+            if price is None:
+                price = prices.get(item["name"], 0)
+            sold = self._items.setdefault(item["name"], [0, 0])
+            sold[0] += item["qty"]
+            sold[1] += item["qty"] * price
+
+        key = normalize_phone(record.get("phone")) or (record.get("name") or "").strip().lower()
+        customer = self._customers.setdefault(key, ["", "", 0, 0])
+        customer[0] = record.get("name") or customer[0]
+        customer[1] = record.get("phone") or customer[1]
+        customer[2] += 1
+        customer[3] += total
+        self._update_top(key, customer[3])
+
+    def _drop_old_hours(self):
+        try:
+            newest = datetime.strptime(self._newest_hour, "%Y-%m-%d %H")
+        except ValueError:
+            return
+        cutoff = (newest - timedelta(hours=self.keep_hours)).strftime("%Y-%m-%d %H")
+        for hour in [h for h in self._hours if h < cutoff]:
+            del self._hours[hour]
+
+    def _update_top(self, key, spent):
+        if key in self._top or len(self._top) < self.top_n:
+            self._top[key] = spent
+            return
+        smallest = min(self._top, key=self._top.get)
+        if spent > self._top[smallest]:
+            del self._top[smallest]
+            self._top[key] = spent
+
+    def snapshot(self, menu=None, hours=24, now=None):
+        # Figures for the dashboard. per_hour covers the `hours` hours up to
+        # `now` (zeros included); every item of `menu` is listed even unsold
+        end = (now or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            per_hour = []
+            for i in range(hours - 1, -1, -1):
+                hour = end - timedelta(hours=i)
+                orders, revenue = self._hours.get(hour.strftime("%Y-%m-%d %H"), (0, 0))
+                per_hour.append({"hour": hour.strftime("%Y-%m-%d %H:00"), "orders": orders, "revenue": revenue})
+            items = {name: (0, 0) for name in menu or {}}
+            items.update({name: tuple(sold) for name, sold in self._items.items()})
+            top = sorted(self._top.items(), key=lambda c: c[1], reverse=True)
+            return {
+                "orders": self.orders,
+                "revenue": self.revenue,
+                "per_hour": per_hour,
+                "items": sorted(({"item": name, "qty": qty, "revenue": revenue}
+                                 for name, (qty, revenue) in items.items()),
+                                key=lambda r: r["revenue"], reverse=True),
+                "top_customers": [{"name": self._customers[key][0], "phone": self._customers[key][1],
+                                   "orders": self._customers[key][2], "spent": spent} for key, spent in top],
+                "behind_bytes": self.size - self.offset,
+                "skipped": self.skipped,
+            }
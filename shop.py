@@ -1,4 +1,14 @@
+import html
+import os
 import streamlit as st
+from catalog import DEFAULT_CATALOG, Catalog
+
+# Menu and stock come from the shared catalog (catalog.json, "golgappa" section)
+CATALOG_PATH = os.getenv('CATALOG_PATH', DEFAULT_CATALOG)
+
+@st.cache_resource
+def get_catalog():
+    return Catalog(CATALOG_PATH)
 
 # Page Config
 st.set_page_config(page_title="Waveside Golgappa", page_icon="🌊", layout="centered")
@@ -28,6 +38,9 @@ st.markdown("""
         box-shadow: 0 4px 8px rgba(0,0,0,0.1);
         text-align: center;
     }
+    .sold-out {
+        opacity: 0.5;
+    }
     </style>
 """, unsafe_allow_html=True)
 
@@ -57,16 +70,19 @@ st.write("---")
 # Menu Section
 st.header("Our Menu")
 
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.markdown("<div class='menu-box'><h4>Classic Golgappa</h4><p>₹30 per plate</p></div>", unsafe_allow_html=True)
-
-with col2:
-    st.markdown("<div class='menu-box'><h4>Spicy Mint Golgappa</h4><p>₹40 per plate</p></div>", unsafe_allow_html=True)
-
-with col3:
-    st.markdown("<div class='menu-box'><h4>Sweet & Tangy Golgappa</h4><p>₹40 per plate</p></div>", unsafe_allow_html=True)
+unit = get_catalog().unit("golgappa")
+cols = st.columns(3)
+for i, entry in enumerate(get_catalog().items("golgappa")):
+    left = entry["remaining"]
+    if left is None:
+        stock_line, box_class = "", "menu-box"
+    elif left <= 0:
+        stock_line, box_class = "<p><b>Sold out</b></p>", "menu-box sold-out"
+    else:
+        stock_line, box_class = f"<p>{left} {unit}s left</p>", "menu-box"
+    with cols[i % 3]:
+        st.markdown(f"<div class='{box_class}'><h4>{html.escape(entry['name'])}</h4>"
+                    f"<p>₹{entry['price']} per {unit}</p>{stock_line}</div>", unsafe_allow_html=True)
 
 st.write("---")
 
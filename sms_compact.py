@@ -0,0 +1,163 @@
+import math
+import re
+import unicodedata
+
+# --------------------------------------------------------------------------------
+# Compact order SMS within a segment budget
+# --------------------------------------------------------------------------------
+# A single character outside the GSM-7 alphabet (e.g. ₹ or a curly quote) makes
+# the whole message UCS-2: 70 characters per message instead of 160, or 67
+# instead of 153 per segment once it is split. compact_order_sms() builds the
+# order notification as GSM-7 (currency as "Rs", long menu names abbreviated,
+# punctuation folded to ASCII, long names capped) and shortens the address, then
+# the notes, until it fits `max_segments`. A shortened field ends with "..", and
+# `link`, if given, is then appended so the full order is one tap away. The
+# first two lines (order ID, name, phone; items and total) are never cut: if
+# they alone exceed the budget, the message takes more segments.
+#
+# Text that cannot be written in GSM-7 without losing letters (e.g. a name in
+# Devanagari) is kept as is, and the budget is applied in UCS-2 instead.
+
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("\f^{}\\[~]|€")  # two septets each (escape + char)
+
+GSM7_SINGLE, GSM7_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+REPLACEMENTS = {
+    "₹": "Rs", "‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-",
+    "…": "...", "\u00a0": " ", "•": "-", "\t": " ",
+}
+
+ABBREVIATE_OVER = 6  # menu names longer than this are abbreviated
+NAME_MAX = 24
+TRUNCATED = ".."
+
+
+def is_gsm7(text):
+    return all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in text)
+
+
+def segment_count(text):
+    # (encoding, segments, units): units are septets for GSM-7 and UTF-16
+    # code units for UCS-2 (emoji count twice)
+    if is_gsm7(text):
+        units = sum(2 if c in GSM7_EXTENDED else 1 for c in text)
+        single, multi, encoding = GSM7_SINGLE, GSM7_MULTI, "GSM-7"
+    else:
+        units = len(text.encode("utf-16-le")) // 2
+        single, multi, encoding = UCS2_SINGLE, UCS2_MULTI, "UCS-2"
+    return encoding, (1 if units <= single else math.ceil(units / multi)), units
+
+
+def capacity(encoding, max_segments):
+    if encoding == "GSM-7":
+        return GSM7_SINGLE if max_segments == 1 else GSM7_MULTI * max_segments
+    return UCS2_SINGLE if max_segments == 1 else UCS2_MULTI * max_segments
+
+
+def to_gsm7(text):
+    # (text, lost): GSM-7 text, and how many characters had to be dropped
+    # because they have no GSM-7 equivalent
+    out, lost = [], 0
+    for c in text:
+        c = REPLACEMENTS.get(c, c)
+        if all(ch in GSM7_BASIC or ch in GSM7_EXTENDED for ch in c):
+            out.append(c)
+            continue
+        # Accented letters without a GSM-7 form lose the accent (ā -> a)
+        base = "".join(ch for ch in unicodedata.normalize("NFKD", c) if not unicodedata.combining(ch))
+        if base and all(ch in GSM7_BASIC for ch in base):
+            out.append(base)
+        elif unicodedata.category(c).startswith(("L", "N")):
+            lost += 1
+        # Emoji, symbols and marks are dropped without counting as lost
+    return re.sub(" {2,}", " ", "".join(out)).strip(), lost
+
+
+def gsm7_if_lossless(text):
+    # GSM-7 version of `text` when no letters are lost, else `text` unchanged
+    converted, lost = to_gsm7(text)
+    return text if lost else converted
+
+
+def _units(text, encoding):
+    if encoding == "GSM-7":
+        return sum(2 if c in GSM7_EXTENDED else 1 for c in text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def abbreviations(menu, max_len=ABBREVIATE_OVER):
+    # {item: short name}: initials for long multi-word names ("Gulab Jamun" ->
+    # "GJ"), a prefix for long single words; extended until unique
+    short = {}
+    for item in menu:
+        words = item.split()
+        if len(item) <= max_len:
+            candidate = item
+        elif len(words) > 1:
+            candidate = "".join(w[0] for w in words).upper()
+        else:
+            candidate = item[:max_len]
+        n = len(candidate)
+        while candidate in short.values():
+            n += 1
+            candidate = item.replace(" ", "")[:n]
+        short[item] = candidate
+    return short
+
+
+def _render(fields):
+    return "\n".join(f"{label}{value}" for label, value, _ in fields if value)
+
+
+def _fit(fields, encoding, limit):
+    # fields: [(label, value, shrink_priority or None)], one line each. Shortens
+    # the values with a priority (lowest first), dropping a line that would
+    # keep fewer than 4 characters, until the text fits `limit` units
+    fields = [list(f) for f in fields]
+    for field in sorted((f for f in fields if f[2] is not None), key=lambda f: f[2]):
+        while field[1] and _units(_render(fields), encoding) > limit:
+            keep = len(field[1]) - (_units(_render(fields), encoding) - limit) - len(TRUNCATED)
+            field[1] = f"{field[1][:keep].rstrip()}{TRUNCATED}" if keep >= 4 else ""
+    return _render(fields)
+
+
+def _fit_with_link(fields, encoding, max_segments, link):
+    limit = capacity(encoding, max_segments)
+    body = _fit(fields, encoding, limit)
+    if link and body != _render(fields):
+        body = _fit(fields, encoding, limit - _units(link, encoding) - 1) + f"\n{link}"
+    return body
+
+
+def compact_order_sms(order_id, name, phone, address, notes, items, total, menu=None, max_segments=1, link=None):
+    # items: {item: qty}. Returns the message body
+    short = abbreviations(menu or items)
+    order_line = " ".join(f"{qty}x{short.get(item, item)}" for item, qty in items.items() if qty > 0)
+    name = " ".join(str(name or "").split())
+    if len(name) > NAME_MAX:
+        name = name[:NAME_MAX - len(TRUNCATED)].rstrip() + TRUNCATED
+    raw = [("", f"{order_id} {name} {phone}".strip(), None), ("", f"{order_line} =Rs{total:g}", None),
+           ("Addr: ", " ".join(str(address or "").split()), 1), ("Note: ", " ".join(str(notes or "").split()), 2)]
+
+    converted, lossy = [], set()
+    for i, (label, value, priority) in enumerate(raw):
+        gsm_value, lost = to_gsm7(value)
+        if lost:
+            lossy.add(i)
+        converted.append((label, gsm_value, priority))
+    if not lossy:
+        return _fit_with_link(converted, "GSM-7", max_segments, link)
+
+    # Keep the letters GSM-7 cannot carry and pay for UCS-2, unless fitting the
+    # budget drops those fields anyway: then the rest can be GSM-7
+    body = _fit_with_link([(label, value, priority) if i in lossy else converted[i]
+                           for i, (label, value, priority) in enumerate(raw)], "UCS-2", max_segments, link)
+    if is_gsm7(body):
+        body = _fit_with_link([(label, "" if i in lossy else value, priority)
+                               for i, (label, value, priority) in enumerate(converted)], "GSM-7", max_segments, link)
+    return body
@@ -0,0 +1,236 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+# --------------------------------------------------------------------------------
+# Coalesced order digests
+# --------------------------------------------------------------------------------
+# Orders are buffered and sent as ONE message once `max_orders` are waiting or the
+# oldest has waited `window_seconds`. Urgent orders (e.g. allergy notes) skip the
+# buffer and are sent on their own straight away. Urgent keywords match whole
+# words ("nut" or "nuts", not "minutes" or "donut").
+#
+# With a `db_path` (app.py uses the SMS outbox database) buffered orders are also
+# kept in a `digest_pending` table and only deleted once their digest has been
+# handed to send(). Each row is claimed by the digest holding it (owner,
+# claimed_at), like SmsQueue's outbox leases. A digest refreshes its claim when
+# a send fails, and rows whose claim is older than LEASE_WINDOWS windows (their
+# process stopped) are taken over in one BEGIN IMMEDIATE transaction by
+# whichever digest looks first, at start and then every window. So a buffered
+# order goes out in one digest even with several processes sharing the outbox;
+# after a restart, orders left behind go out within LEASE_WINDOWS + 1 windows.
+#
+# A failed send keeps the orders, in memory and in the table, for another try
+# after a window, whether the send ran on the timer or inline in add().
+#
+# send(body, orders) is called with the message text and the orders it covers.
+# An order is a dict with: timestamp, name, phone, items ({item: qty}), total,
+# special_notes.
+
+URGENT_KEYWORDS = ("allergy", "allergies", "allergic", "nut", "peanut", "gluten", "lactose", "dairy",
+                   "diabetic", "diabetes", "urgent", "asap")
+LEASE_WINDOWS = 3
+
+
+def _keyword_pattern(keywords):
+    # Whole words, optional plural "s"
+    return re.compile(r"\b(?:%s)s?\b" % "|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+
+URGENT_PATTERN = _keyword_pattern(URGENT_KEYWORDS)
+
+
+def is_urgent_order(order, keywords=URGENT_KEYWORDS):
+    pattern = URGENT_PATTERN if keywords is URGENT_KEYWORDS else _keyword_pattern(keywords)
+    return bool(pattern.search(order.get("special_notes") or ""))
+
+
+def format_order_line(order):
+    items = ", ".join(f"{item} x{qty}" for item, qty in order["items"].items() if qty > 0)
+    when = order["timestamp"][11:16] if len(order.get("timestamp", "")) >= 16 else order.get("timestamp", "")
+    return f"{when} {order['name']} ({order['phone']}): {items} = ₹{order['total']}"
+
+
+def format_digest(orders, total_fn, header="Sweet Waveside SK Shop"):
+    combined = {}
+    for order in orders:
+        for item, qty in order["items"].items():
+            if qty > 0:
+                combined[item] = combined.get(item, 0) + qty
+    lines = [f"{header}: {len(orders)} new order{'s' if len(orders) != 1 else ''}"]
+    lines += [f"{i}. {format_order_line(o)}" for i, o in enumerate(orders, 1)]
+    lines.append(f"Total: ₹{total_fn(combined)}")
+    return "\n".join(lines)
+
+
+class OrderDigest:
+    def __init__(self, send, total_fn, window_seconds=60.0, max_orders=10, is_urgent=is_urgent_order,
+                 header="Sweet Waveside SK Shop", clock=time.monotonic, db_path=None):
+        self.send = send
+        self.total_fn = total_fn
+        self.window_seconds = window_seconds
+        self.max_orders = max_orders
+        self.is_urgent = is_urgent
+        self.header = header
+        self.clock = clock
+        self.db_path = db_path
+        self.lease = window_seconds * LEASE_WINDOWS
+        self.owner = uuid.uuid4().hex
+
+        self._local = threading.local()
+        self._pending = []
+        self._pending_ids = []
+        self._oldest_at = None
+        self._next_reclaim = None
+        self._cond = threading.Condition()
+        self._closed = False
+        if db_path:
+            with self._conn() as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS digest_pending '
+                             '(id INTEGER PRIMARY KEY AUTOINCREMENT, order_json TEXT, created_at REAL, '
+                             'owner TEXT, claimed_at REAL)')
+                # Added with claims; rows from before are free to take
+                if 'owner' not in [r[1] for r in conn.execute('PRAGMA table_info(digest_pending)')]:
+                    conn.execute('ALTER TABLE digest_pending ADD COLUMN owner TEXT')
+                    conn.execute('ALTER TABLE digest_pending ADD COLUMN claimed_at REAL DEFAULT 0')
+            self._reclaim()
+        self._timer = threading.Thread(target=self._run, name="sms-digest", daemon=True)
+        self._timer.start()
+
+    def add(self, order):
+        # Returns the send() result if the order went out now, else None (batched)
+        if self.is_urgent and self.is_urgent(order):
+            return self.send(format_digest([order], self.total_fn, f"URGENT {self.header}"), [order])
+        with self._cond:
+            self._pending.append(order)
+            self._pending_ids.append(self._save(order))
+            if self._oldest_at is None:
+                self._oldest_at = self.clock()
+                self._cond.notify()
+            if len(self._pending) < self.max_orders:
+                return None
+            batch = self._take()
+        try:
+            return self._send(batch)
+        except Exception:
+            self._keep(batch)  # the timer tries again after a window
+            return None
+
+    # --- storage ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _save(self, order):
+        if not self.db_path:
+            return None
+        with self._conn() as conn:
+            return conn.execute('INSERT INTO digest_pending (order_json, created_at, owner, claimed_at) '
+                                'VALUES (?,?,?,?)', (json.dumps(order, ensure_ascii=False), time.time(),
+                                                     self.owner, time.time())).lastrowid
+
+    def _touch(self, ids):
+        # Renews the claim on rows still being retried
+        if self.db_path and ids:
+            with self._conn() as conn:
+                conn.executemany('UPDATE digest_pending SET claimed_at = ? WHERE id = ? AND owner = ?',
+                                 [(time.time(), i, self.owner) for i in ids])
+
+    def _forget(self, ids):
+        if self.db_path and ids:
+            with self._conn() as conn:
+                conn.executemany('DELETE FROM digest_pending WHERE id = ?', [(i,) for i in ids])
+
+    def _reclaim(self):
+        # Takes over rows whose claim ran out and adds them ahead of the buffer
+        self._next_reclaim = self.clock() + self.window_seconds
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute('SELECT id, order_json FROM digest_pending WHERE claimed_at < ? ORDER BY id',
+                                (now - self.lease,)).fetchall()
+            conn.executemany('UPDATE digest_pending SET owner = ?, claimed_at = ? WHERE id = ? AND claimed_at < ?',
+                             [(self.owner, now, row_id, now - self.lease) for row_id, _ in rows])
+        if rows:
+            with self._cond:
+                self._pending[:0] = [json.loads(order_json) for _, order_json in rows]
+                self._pending_ids[:0] = [row_id for row_id, _ in rows]
+                if self._oldest_at is None:
+                    self._oldest_at = self.clock()
+                    self._cond.notify()
+
+    # --- public API ---
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self):
+        with self._cond:
+            batch = self._take()
+        try:
+            return self._send(batch)
+        except Exception:
+            self._keep(batch)
+            raise
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._timer.join()
+        return self.flush()
+
+    def _take(self):
+        # (orders, their digest_pending ids)
+        batch = (self._pending, self._pending_ids)
+        self._pending, self._pending_ids, self._oldest_at = [], [], None
+        return batch
+
+    def _keep(self, batch):
+        # Puts a batch whose send failed back in front of the buffer
+        with self._cond:
+            self._pending[:0], self._pending_ids[:0] = batch
+            self._oldest_at = self.clock()
+            self._cond.notify()
+        self._touch(batch[1])
+
+    def _send(self, batch):
+        orders, ids = batch
+        if not orders:
+            return None
+        result = self.send(format_digest(orders, self.total_fn, self.header), orders)
+        self._forget(ids)
+        return result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = self.clock()
+                    due = [self._oldest_at + self.window_seconds] if self._oldest_at is not None else []
+                    due += [self._next_reclaim] if self.db_path else []
+                    if due and min(due) <= now:
+                        break
+                    self._cond.wait(min(due) - now if due else None)
+                send_due = self._oldest_at is not None and self._oldest_at + self.window_seconds <= now
+                batch = self._take() if send_due else None
+            if batch:
+                try:
+                    self._send(batch)
+                except Exception:
+                    self._keep(batch)  # try again after another window
+            if self.db_path and self._next_reclaim <= self.clock():
+                try:
+                    self._reclaim()
+                except sqlite3.Error:
+                    self._next_reclaim = self.clock() + self.window_seconds
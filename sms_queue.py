@@ -0,0 +1,255 @@
+import email.utils
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# --------------------------------------------------------------------------------
+# Persistent outbound SMS queue
+# --------------------------------------------------------------------------------
+# Orders only insert a row into the outbox; a small pool of worker threads drains
+# it through ONE long-lived Twilio client (one pooled HTTP session), retrying with
+# exponential backoff (never sooner than a 429's Retry-After). Message status can be
+# looked up by id at any time.
+#
+# twilio is imported by the first delivery, not by importing this module, so
+# pages that only queue or look up messages do not pay for it.
+#
+# A claimed row is "sending" under a lease of LEASE_TIMEOUTS send timeouts. Rows
+# whose lease ran out (their process died mid-send) go back to "queued"; rows
+# another live worker is sending, in this process or another one sharing the
+# outbox, are left alone. Starting a queue stops any queue this process
+# started earlier on the same outbox (e.g. after a Streamlit cache rebuild), so
+# its workers are not left running alongside the new ones.
+
+OUTBOX_DB = "sms_outbox.db"
+TWILIO_API_HOST = "https://api.twilio.com"
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+LEASE_TIMEOUTS = 3
+
+_started = {}  # outbox path -> the SmsQueue whose workers are running in this process
+_started_lock = threading.Lock()
+
+
+def _http_client(api_base=None, **kwargs):
+    # A TwilioHttpClient that keeps each thread's last response (the workers share
+    # one client, and TwilioRestException does not carry the response headers),
+    # sending every request to `api_base` instead of api.twilio.com if given
+    # (fake_twilio.py)
+    from twilio.http.http_client import TwilioHttpClient
+
+    class RecordingHttpClient(TwilioHttpClient):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.responses = threading.local()
+
+        def request(self, method, url, *args, **kwargs):
+            if api_base and url.startswith(TWILIO_API_HOST):
+                url = api_base.rstrip("/") + url[len(TWILIO_API_HOST):]
+            self.responses.last = None
+            self.responses.last = super().request(method, url, *args, **kwargs)
+            return self.responses.last
+
+    return RecordingHttpClient(**kwargs)
+
+
+def _retry_after(response):
+    # Seconds to wait from a Retry-After header (delta-seconds or an HTTP date)
+    value = (response.headers or {}).get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class SmsQueue:
+    def __init__(self, account_sid, auth_token, from_number, db_path=OUTBOX_DB, workers=2,
+                 max_attempts=5, backoff_base=2.0, backoff_max=300.0, api_base=None, timeout=10):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.api_base = api_base
+        self.timeout = timeout
+        self.lease = timeout * LEASE_TIMEOUTS
+
+        self._local = threading.local()
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._next_reclaim = 0.0
+        self._init_db()
+
+    # --- storage ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        with self._conn() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS outbox
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, to_number TEXT, body TEXT,
+                             status TEXT, attempts INTEGER DEFAULT 0, next_attempt_at REAL,
+                             last_error TEXT, sid TEXT, created_at REAL, updated_at REAL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)')
+
+    # --- public API ---
+    def enqueue(self, body, to_number):
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute('INSERT INTO outbox (to_number, body, status, next_attempt_at, created_at, updated_at) '
+                               'VALUES (?,?,?,?,?,?)', (to_number, body, QUEUED, now, now, now))
+        with self._wakeup:
+            self._wakeup.notify()
+        return cur.lastrowid
+
+    def status(self, message_id):
+        row = self._conn().execute('SELECT id, to_number, status, attempts, last_error, sid, created_at, updated_at '
+                                   'FROM outbox WHERE id = ?', (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def statuses(self, message_ids):
+        return [s for s in (self.status(i) for i in message_ids) if s]
+
+    def pending_count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM outbox WHERE status IN (?,?)',
+                                    (QUEUED, SENDING)).fetchone()[0]
+
+    def start(self):
+        if self._threads:
+            return self
+        key = os.path.abspath(self.db_path)
+        with _started_lock:
+            previous = _started.get(key)
+            _started[key] = self
+        if previous is not None and previous is not self:
+            previous.stop()
+        self._reclaim()
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"sms-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=5):
+        with _started_lock:
+            if _started.get(os.path.abspath(self.db_path)) is self:
+                del _started[os.path.abspath(self.db_path)]
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    # --- worker ---
+    def _get_client(self):
+        with self._client_lock:
+            if self._client is None:
+                from twilio.rest import Client
+                http_client = _http_client(self.api_base, pool_connections=True, timeout=self.timeout)
+                self._client = Client(self.account_sid, self.auth_token, http_client=http_client)
+            return self._client
+
+    def _claim(self):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            row = conn.execute('SELECT id, to_number, body, attempts FROM outbox WHERE status = ? AND next_attempt_at <= ? '
+                               'ORDER BY next_attempt_at, id LIMIT 1', (QUEUED, now)).fetchone()
+            if row is None:
+                return None
+            # Conditional update so two workers (or processes) never claim the same row
+            cur = conn.execute('UPDATE outbox SET status = ?, attempts = attempts + 1, updated_at = ? '
+                               'WHERE id = ? AND status = ?', (SENDING, now, row["id"], QUEUED))
+            if cur.rowcount == 0:
+                return None
+        return row
+
+    def _reclaim(self):
+        # Messages left "sending" past their lease (a crashed process) are retried
+        now = time.time()
+        self._next_reclaim = now + self.lease
+        with self._conn() as conn:
+            conn.execute('UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?',
+                         (QUEUED, now, SENDING, now - self.lease))
+
+    def _next_wait(self):
+        row = self._conn().execute('SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?', (QUEUED,)).fetchone()
+        if row[0] is None:
+            return 1.0
+        return min(1.0, max(0.0, row[0] - time.time()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.time() >= self._next_reclaim:
+                    self._reclaim()
+                row = self._claim()
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                with self._wakeup:
+                    self._wakeup.wait(self._next_wait())
+                continue
+            self._deliver(row)
+
+    def _deliver(self, row):
+        from twilio.base.exceptions import TwilioRestException
+        attempts = row["attempts"] + 1
+        client = self._get_client()
+        try:
+            msg = client.messages.create(body=row["body"], from_=self.from_number, to=row["to_number"])
+            self._finish(row["id"], SENT, sid=msg.sid)
+        except TwilioRestException as e:
+            # 4xx (other than rate limiting) will not succeed on retry; a 429
+            # waits at least as long as the server's Retry-After asks
+            permanent = 400 <= (e.status or 0) < 500 and e.status != 429
+            wait = None
+            if e.status == 429:
+                wait = _retry_after(getattr(client.http_client.responses, "last", None))
+            self._retry_or_fail(row["id"], attempts, str(e), permanent, wait)
+        except Exception as e:
+            self._retry_or_fail(row["id"], attempts, str(e), False)
+
+    def _retry_or_fail(self, message_id, attempts, error, permanent, min_delay=None):
+        if permanent or attempts >= self.max_attempts:
+            self._finish(message_id, FAILED, error=error)
+            return
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.5, 1.0)
+        if min_delay is not None:
+            delay = max(delay, min_delay)
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute('UPDATE outbox SET status = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?',
+                         (QUEUED, now + delay, error, now, message_id))
+
+    def _finish(self, message_id, status, sid=None, error=None):
+        with self._conn() as conn:
+            conn.execute('UPDATE outbox SET status = ?, sid = ?, last_error = ?, updated_at = ? WHERE id = ?',
+                         (status, sid, error, time.time(), message_id))